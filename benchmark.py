@@ -0,0 +1,250 @@
+"""
+benchmark.py
+Scaling benchmarks for every stage of the pipeline.
+
+Generates deterministic synthetic files (utils/data_generator.py) of the
+requested sizes and times each stage on them: read, parse, validate, the
+fused ingest, aggregation and the analytics views per backend, enrichment,
+saving the enriched file and the report. For every stage it records wall
+time, CPU time, rows/sec and peak RSS, prints a table and writes the results
+as JSON so runs can be compared:
+
+    python benchmark.py --rows 10000,100000,1000000 --backends python,numpy,sqlite
+    python benchmark.py --compare output/benchmarks/before.json output/benchmarks/after.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from utils.api_handler import create_product_mapping, enrich_sales_data, save_enriched_data
+from utils.data_generator import ENCODINGS, generate_sales_file
+from utils.data_processor import BACKENDS, build_aggregate, generate_sales_report
+from utils.file_handler import (
+    read_sales_data, parse_transactions, validate_and_filter, ingest_transactions
+)
+from utils.metrics import peak_rss, reset_peak_rss
+from utils.mock_product_api import make_products
+
+DEFAULT_ROWS = '10000,100000'
+RESULTS_DIR = 'output/benchmarks'
+
+
+# ----------------------------------------------------------------------
+# Stages
+# ----------------------------------------------------------------------
+
+def _analytics(aggregate):
+    aggregate.region_wise_sales()
+    aggregate.top_selling_products(5)
+    aggregate.customer_analysis()
+    aggregate.daily_sales_trend()
+    aggregate.find_peak_sales_day()
+    aggregate.low_performing_products(10)
+
+
+def _stages(backends, workdir):
+    """
+    (name, backend, function) in pipeline order. Each function takes the
+    context of earlier stage outputs and returns its own output.
+    """
+    stages = [
+        ('read', None, lambda ctx: read_sales_data(ctx['file'])),
+        ('parse', None, lambda ctx: parse_transactions(ctx['read'])),
+        ('validate', None, lambda ctx: validate_and_filter(ctx['parse'])[0]),
+        ('ingest', None, lambda ctx: ingest_transactions(ctx['read'])[0]),
+    ]
+    for backend in backends:
+        options = {'db_path': os.path.join(workdir, 'sales.sqlite')} if backend == 'sqlite' else {}
+        stages.append(('aggregate', backend,
+                       lambda ctx, b=backend, o=options: build_aggregate(ctx['validate'], backend=b, **o)))
+        stages.append(('analytics', backend,
+                       lambda ctx, b=backend: _analytics(ctx[('aggregate', b)])))
+    stages += [
+        ('enrich', None, lambda ctx: enrich_sales_data(ctx['validate'], ctx['mapping'])),
+        ('save_enriched', None,
+         lambda ctx: save_enriched_data(ctx['enrich'], os.path.join(workdir, 'enriched.txt'))),
+        ('report', None,
+         lambda ctx: generate_sales_report(ctx[('aggregate', backends[0])], ctx['enrich'],
+                                           os.path.join(workdir, 'report.txt'))),
+    ]
+    return stages
+
+
+def measure(function, repeat=1):
+    """
+    Runs function `repeat` times with its output suppressed.
+    Returns (last result, best wall seconds, CPU seconds of that run, peak RSS).
+    """
+    best_wall = best_cpu = None
+    peak = None
+    result = None
+    for _ in range(repeat):
+        result = None
+        reset_peak_rss()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = function()
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        run_peak = peak_rss()
+        if best_wall is None or wall < best_wall:
+            best_wall, best_cpu = wall, cpu
+        if run_peak is not None:
+            peak = max(peak or 0, run_peak)
+    return result, best_wall, best_cpu, peak
+
+
+def run_benchmarks(sizes, backends, seed=0, encoding='utf-8', repeat=1, data_dir=None):
+    """Generates (or reuses) one file per size and times every stage on it."""
+    if data_dir is None:
+        with tempfile.TemporaryDirectory(prefix='sales_bench_') as temp_dir:
+            return run_benchmarks(sizes, backends, seed, encoding, repeat, temp_dir)
+    os.makedirs(data_dir, exist_ok=True)
+    mapping = create_product_mapping(make_products(100))
+    results = []
+
+    for rows in sizes:
+        filename = os.path.join(data_dir, f"sales_{rows}_{seed}_{encoding}.txt")
+        if not os.path.exists(filename):
+            print(f"Generating {rows:,} rows -> {filename}")
+            generate_sales_file(filename, rows, seed, encoding)
+
+        ctx = {'file': filename, 'mapping': mapping}
+        with tempfile.TemporaryDirectory() as workdir:
+            for name, backend, function in _stages(backends, workdir):
+                output, wall, cpu, peak = measure(lambda: function(ctx), repeat)
+                ctx[(name, backend) if backend else name] = output
+                result = {
+                    'rows': rows,
+                    'stage': name,
+                    'backend': backend,
+                    'wall_s': round(wall, 6),
+                    'cpu_s': round(cpu, 6),
+                    'rows_per_s': round(rows / wall) if wall else None,
+                    'peak_rss_mb': round(peak / 2 ** 20, 1) if peak else None
+                }
+                results.append(result)
+                _print_result(result)
+        ctx.clear()
+
+    return results
+
+
+# ----------------------------------------------------------------------
+# Output and comparison
+# ----------------------------------------------------------------------
+
+def _label(result):
+    return f"{result['stage']}[{result['backend']}]" if result['backend'] else result['stage']
+
+
+def _print_result(r):
+    peak = f"{r['peak_rss_mb']:>9.1f}" if r['peak_rss_mb'] is not None else f"{'n/a':>9}"
+    print(f"{r['rows']:>11,} {_label(r):<22} {r['wall_s']:>9.3f}s {r['cpu_s']:>9.3f}s "
+          f"{r['rows_per_s'] or 0:>12,} rows/s {peak} MB")
+
+
+def save_results(results, output, meta):
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+def compare_results(old_file, new_file, threshold=0.10):
+    """
+    Prints wall-time changes per (rows, stage, backend) between two result
+    files. Returns the entries that got slower by more than threshold.
+    """
+    with open(old_file, encoding='utf-8') as f:
+        old = {(r['rows'], r['stage'], r['backend']): r for r in json.load(f)['results']}
+    with open(new_file, encoding='utf-8') as f:
+        new = json.load(f)['results']
+
+    regressions = []
+    print(f"{'Rows':>11} {'Stage':<22} {'Old':>10} {'New':>10} {'Change':>8}")
+    for r in new:
+        before = old.get((r['rows'], r['stage'], r['backend']))
+        if before is None or not before['wall_s']:
+            continue
+        change = r['wall_s'] / before['wall_s'] - 1
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append((r, before, change))
+        print(f"{r['rows']:>11,} {_label(r):<22} {before['wall_s']:>9.3f}s {r['wall_s']:>9.3f}s "
+              f"{change:>+7.1%}{flag}")
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark every stage of the sales pipeline")
+    parser.add_argument("--rows", default=DEFAULT_ROWS,
+                        help="Comma-separated dataset sizes (e.g. 10000,1000000)")
+    parser.add_argument("--backends", default="python",
+                        help=f"Comma-separated aggregation backends ({', '.join(BACKENDS)})")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--encoding", choices=ENCODINGS, default="utf-8")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per stage; the best is kept")
+    parser.add_argument("--data-dir", default=None,
+                        help="Where generated files are kept and reused (default: a temp dir)")
+    parser.add_argument("--output", default=None,
+                        help=f"Results JSON (default: {RESULTS_DIR}/bench-<timestamp>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="Compare two result files instead of running")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Slowdown reported as a regression by --compare")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.compare:
+        regressions = compare_results(*args.compare, threshold=args.threshold)
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+        sys.exit(1 if regressions else 0)
+
+    sizes = [int(size) for size in args.rows.split(',') if size]
+    backends = [b for b in args.backends.split(',') if b]
+    unknown = [b for b in backends if b not in BACKENDS]
+    if unknown:
+        sys.exit(f"Unknown backend(s): {', '.join(unknown)}")
+    if 'numpy' in backends:
+        from utils.vectorized import np
+        if np is None:
+            print("numpy is not installed; skipping the numpy backend")
+            backends.remove('numpy')
+    if not backends:
+        sys.exit("No backend to benchmark")
+
+    print(f"{'Rows':>11} {'Stage':<22} {'Wall':>10} {'CPU':>10} {'Throughput':>19} {'Peak RSS':>12}")
+    results = run_benchmarks(sizes, backends, args.seed, args.encoding, args.repeat, args.data_dir)
+
+    meta = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'encoding': args.encoding,
+        'repeat': args.repeat,
+        'per_stage_peak_rss': reset_peak_rss()
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"bench-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    save_results(results, output, meta)
+
+
+if __name__ == "__main__":
+    main()
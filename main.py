@@ -37,10 +37,14 @@
 #     main()
 # main.py
 
+import argparse
+from datetime import date
+
 from utils.file_handler import (
     read_sales_data,
-    parse_transactions,
-    validate_and_filter
+    iter_sales_data,
+    iter_ingest,
+    ingest_transactions
 )
 
 # --- NEW: Import Question 3 functions ---
@@ -50,92 +54,508 @@ from utils.data_processor import (
     top_selling_products,
     customer_analysis,
     find_peak_sales_day,
-    generate_sales_report
+    build_aggregate,
+    set_backend,
+    enable_result_cache,
+    BACKENDS
 )
-from utils.api_handler import (
-    fetch_all_products, 
-    create_product_mapping, 
-    enrich_sales_data, 
-    save_enriched_data
+from utils.metrics import Metrics
+from utils.report import (
+    build_report_data,
+    save_snapshot,
+    load_snapshot,
+    write_report,
+    report_filename,
+    REPORT_FORMATS,
+    DEFAULT_REPORT_FILE,
+    DEFAULT_SNAPSHOT_FILE
 )
-def main():
+
+# Everything else (requests, NumPy, SQLite, multiprocessing, http.server) is
+# imported by the stage that uses it, so a run only pays for what it selects.
+STAGES = ('ingest', 'analytics', 'enrich', 'report')
+
+
+def _choices(value, allowed, option):
+    """Splits a comma-separated option and checks every item is allowed."""
+    items = [item.strip() for item in value.split(',') if item.strip()]
+    unknown = [item for item in items if item not in allowed]
+    if unknown or not items:
+        raise argparse.ArgumentTypeError(
+            f"{option} takes a comma-separated subset of: {', '.join(allowed)}"
+        )
+    return items
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Sales Analytics System")
+    parser.add_argument("--input", default="data/sales_data.txt",
+                        help="Raw sales data file, or a directory / glob of "
+                             "per-day or per-region partition files")
+    parser.add_argument("--start-date", default=None,
+                        help="Only include sales on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--end-date", default=None,
+                        help="Only include sales on or before this date (YYYY-MM-DD)")
+    parser.add_argument("--regions", default=None,
+                        help="Only include these comma-separated regions")
+    parser.add_argument("--stream", action="store_true",
+                        help="Read, parse and validate the file as a stream "
+                             "instead of loading it into memory")
+    parser.add_argument("--columnar", action="store_true",
+                        help="Hold valid transactions in a compact columnar "
+                             "TransactionTable instead of a list of dicts")
+    parser.add_argument("--backend", choices=BACKENDS, default="python",
+                        help="Analytics engine: pure Python, NumPy-vectorized or "
+                             "SQL over a local SQLite database")
+    parser.add_argument("--sqlite-db", default=None,
+                        help="Database file loaded by --backend sqlite "
+                             "(default: data/.sales_cache/sales.sqlite)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Parse, validate and aggregate the file in "
+                             "parallel byte ranges on this many processes")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only process lines appended since the last run, "
+                             "resuming from the saved checkpoint")
+    parser.add_argument("--checkpoint", default="output/checkpoint.json",
+                        help="Checkpoint file used by --incremental")
+    parser.add_argument("--cache", action="store_true",
+                        help="Reuse parsed, validated transactions from the "
+                             "binary cache next to the input file")
+    parser.add_argument("--result-cache", nargs="?", const="data/.sales_cache/results",
+                        default=None, metavar="DIR",
+                        help="With --cache, also keep the built aggregate in DIR "
+                             "(default: data/.sales_cache/results), keyed by the source "
+                             "file's content hash, so an unchanged file skips aggregation")
+    parser.add_argument("--approx-top-k", type=int, default=None,
+                        help="Also track approximate top products/customers "
+                             "with Space-Saving sketches of this many counters")
+    parser.add_argument("--distinct-precision", type=int, default=None,
+                        help="Estimate unique customers/products with HyperLogLog "
+                             "sketches of 2**N registers (4-16) instead of exact sets")
+    parser.add_argument("--dedup", action="store_true",
+                        help="Drop rows whose TransactionID was already seen "
+                             "(Bloom filter plus exact on-disk check)")
+    parser.add_argument("--dedup-memory", type=float, default=16,
+                        help="Megabytes of Bloom filter used by --dedup")
+    parser.add_argument("--cube", default=None, metavar="FILE",
+                        help="Also build a date x region x product cube and save it "
+                             "to FILE for drill-down queries (python -m utils.cube FILE)")
+    parser.add_argument("--metrics", default=None, metavar="FILE",
+                        help="Time every pipeline stage and write the metrics as JSON to FILE")
+    parser.add_argument("--profile", default=None, metavar="FILE",
+                        help="Run the stages under cProfile and dump the slowest one to FILE")
+    parser.add_argument("--watch", nargs="?", const="data", default=None, metavar="SOURCE",
+                        help="Run as a daemon: watch SOURCE (default: data/) for new or "
+                             "appended files, keep the aggregates in memory, rewrite the "
+                             "report after changes and serve metrics over HTTP")
+    parser.add_argument("--port", type=int, default=None,
+                        help="Local port of the --watch metrics endpoint (default: 8770)")
+    parser.add_argument("--debounce", type=float, default=None,
+                        help="Quiet seconds before --watch rewrites the report (default: 5)")
+    parser.add_argument("--poll-interval", type=float, default=None,
+                        help="Seconds between --watch scans of the source (default: 1)")
+    parser.add_argument("--api-url", default=None,
+                        help="Product catalog endpoint (DummyJSON-compatible)")
+    parser.add_argument("--api-workers", type=int, default=4,
+                        help="Concurrent page requests when fetching the catalog")
+    parser.add_argument("--catalog-ttl", type=float, default=None,
+                        help="Seconds a cached product catalog counts as fresh (default: 3600)")
+    parser.add_argument("--no-catalog-cache", action="store_true",
+                        help="Always fetch the product catalog from the API")
+    parser.add_argument("--stages", default=list(STAGES),
+                        type=lambda value: _choices(value, STAGES, "--stages"),
+                        help="Comma-separated stages to run (default: all): ingest, "
+                             "analytics, enrich, report. Without ingest the report is "
+                             "rendered from the saved --snapshot")
+    parser.add_argument("--snapshot", default=DEFAULT_SNAPSHOT_FILE, metavar="FILE",
+                        help="Report snapshot written after ingest and read by "
+                             "--stages report")
+    parser.add_argument("--format", default=['text'],
+                        type=lambda value: _choices(value, REPORT_FORMATS, "--format"),
+                        help="Comma-separated report formats: text, json, csv (default: text)")
+    parser.add_argument("--report-file", default=DEFAULT_REPORT_FILE,
+                        help="Text report path; the JSON and CSV reports take its "
+                             "name with their own extension")
+    args = parser.parse_args()
+
+    # Dates are compared as YYYY-MM-DD strings, so a malformed one would
+    # silently filter out everything
+    for name in ('start_date', 'end_date'):
+        value = getattr(args, name)
+        if value is not None:
+            try:
+                setattr(args, name, date.fromisoformat(value).isoformat())
+            except ValueError:
+                parser.error(f"--{name.replace('_', '-')} must be a YYYY-MM-DD date, not {value!r}")
+    if args.start_date and args.end_date and args.start_date > args.end_date:
+        parser.error("--start-date is after --end-date")
+
+    # Modes that fold rows straight into a SalesAggregator (in other
+    # processes, from a checkpoint or as a daemon) have no dedup pass and no
+    # other backend
+    from utils.partitions import is_partitioned_source
+    folded = [name for name, on in (
+        ("--watch", args.watch),
+        ("--incremental", args.incremental),
+        ("--workers", args.workers > 1),
+        ("a partitioned --input or --start-date/--end-date/--regions",
+         is_partitioned_source(args.input) or args.start_date or args.end_date or args.regions)
+    ) if on]
+    if folded and args.dedup:
+        parser.error(f"--dedup cannot be combined with {folded[0]}")
+    if folded and args.backend != 'python':
+        parser.error(f"--backend {args.backend} cannot be combined with {folded[0]}")
+    # Space-Saving and HyperLogLog sketches only exist in SalesAggregator
+    if args.approx_top_k and args.backend != 'python':
+        parser.error(f"--approx-top-k needs --backend python, not {args.backend}")
+    if args.distinct_precision and args.backend != 'python':
+        parser.error(f"--distinct-precision needs --backend python, not {args.backend}")
+    if args.sqlite_db and args.backend != 'sqlite':
+        parser.error("--sqlite-db needs --backend sqlite")
+    if args.result_cache and (not args.cache or folded or args.stream):
+        parser.error("--result-cache needs --cache, without --stream or " +
+                     (folded[0] if folded else "a folding mode"))
+    if args.result_cache and args.backend == 'sqlite':
+        parser.error("--result-cache cannot store a --backend sqlite database")
+    return args
+
+
+def load_transactions(filename):
     print("Reading sales data file...\n")
-    raw_lines = read_sales_data("data/sales_data.txt")
+    raw_lines = read_sales_data(filename)
     print("Total raw records read:", len(raw_lines))
 
-    print("\nParsing and cleaning data...\n")
-    parsed_transactions = parse_transactions(raw_lines)
-    print("Total parsed records:", len(parsed_transactions))
-
-    print("\nValidating and filtering transactions...\n")
-    valid_transactions, invalid_count, summary = validate_and_filter(
-        parsed_transactions,
+    print("\nParsing, validating and filtering transactions...\n")
+    valid_transactions, invalid_count, summary = ingest_transactions(
+        raw_lines,
         region=None,
         min_amount=None,
         max_amount=None
     )
+    return valid_transactions, summary
+
+
+def stream_transactions(filename, summary=None):
+    """Generator of valid transactions; nothing is held in memory."""
+    return iter_ingest(
+        iter_sales_data(filename),
+        region=None,
+        min_amount=None,
+        max_amount=None,
+        summary=summary
+    )
+
+
+def tap(rows, *sinks):
+    """Passes rows through, adding each one to every sink (e.g. a SalesCube) on the way."""
+    sinks = [sink.add for sink in sinks if sink is not None]
+    if not sinks:
+        yield from rows
+        return
+    for t in rows:
+        for add in sinks:
+            add(t)
+        yield t
+
+
+def _or_default(value, default):
+    return default if value is None else value
+
+
+def render_reports(data, args):
+    """Writes the report data in every --format."""
+    for fmt in args.format:
+        output_file = args.report_file if fmt == 'text' else report_filename(args.report_file, fmt)
+        write_report(data, output_file, fmt)
+
+
+def main():
+    args = parse_args()
+    set_backend(args.backend)
+    metrics = Metrics(enabled=bool(args.metrics), profile=bool(args.profile))
+    # Written on every way out, including --stages report and failures
+    try:
+        run_pipeline(args, metrics)
+    finally:
+        if args.metrics:
+            metrics.write(args.metrics)
+        if args.profile:
+            metrics.dump_profile(args.profile)
+
+
+def run_pipeline(args, metrics):
+    """Runs the selected stages, recording each one in metrics."""
+    options = {}
+    if args.approx_top_k:
+        options['approx_top_k'] = args.approx_top_k
+    if args.distinct_precision:
+        options['distinct_precision'] = args.distinct_precision
+    # Per-backend options for build_aggregate; the partitioned, parallel and
+    # incremental modes always use SalesAggregator with `options` (parse_args
+    # rejects another --backend there)
+    build_options = dict(options)
+    if args.backend == 'sqlite':
+        from utils.sqlite_backend import DEFAULT_DB_PATH
+        build_options['db_path'] = _or_default(args.sqlite_db, DEFAULT_DB_PATH)
+
+    def catalog_cache(fetcher):
+        from utils.catalog_cache import CatalogCache, DEFAULT_TTL
+        return CatalogCache(ttl=_or_default(args.catalog_ttl, DEFAULT_TTL), fetcher=fetcher)
+
+    def fetch_products(latencies=None, strict=True):
+        """Catalog fetch; strict raises on missing pages so partial catalogs are not cached."""
+        from utils.api_handler import fetch_all_products, API_URL
+        return fetch_all_products(_or_default(args.api_url, API_URL), max_workers=args.api_workers,
+                                  latencies=latencies, strict=strict)
+
+    if args.watch:
+        from utils.watch import (SalesWatcher, serve, DEFAULT_PORT, DEFAULT_DEBOUNCE,
+                                 DEFAULT_POLL_INTERVAL)
+        watcher = SalesWatcher(args.watch, report_file=args.report_file,
+                               debounce=_or_default(args.debounce, DEFAULT_DEBOUNCE),
+                               poll_interval=_or_default(args.poll_interval, DEFAULT_POLL_INTERVAL),
+                               aggregator_options=options, catalog=catalog_cache(fetch_products))
+        serve(watcher, port=_or_default(args.port, DEFAULT_PORT))
+        return
+
+    stages = set(args.stages)
+    if 'ingest' not in stages:
+        # Report from the snapshot of an earlier run; the data is not read
+        skipped = sorted(stages & {'analytics', 'enrich'}, key=STAGES.index)
+        if skipped:
+            print(f"Note: skipping {', '.join(skipped)} (needs the ingest stage).\n")
+        if 'report' in stages:
+            data = load_snapshot(args.snapshot)
+            if data is None:
+                return
+            print(f"Rendering report from snapshot {args.snapshot} ({data['created']})...")
+            with metrics.stage("report") as stage:
+                render_reports(data, args)
+                stage.rows_in = data['records']
+        return
+
+    from utils.partitions import is_partitioned_source
+
+    # A directory, glob or date/region filter goes through partition pruning
+    partitioned = (is_partitioned_source(args.input) or
+                   bool(args.start_date or args.end_date or args.regions))
+    regions = args.regions.split(',') if args.regions else None
+
+    def deduplicate(rows, summary=None):
+        """Drops repeated TransactionIDs when --dedup is on."""
+        if not args.dedup:
+            return rows
+        from utils.dedup import iter_deduplicate
+        return iter_deduplicate(rows, summary=summary,
+                                memory_bytes=int(args.dedup_memory * 2 ** 20))
+
+    # The cube is folded in during ingest; modes that keep the rows in memory
+    # fill it from them afterwards
+    cube = None
+    if args.cube:
+        from utils.cube import SalesCube
+        cube = SalesCube()
+
+    def product_mapping():
+        """Fetches the catalog (or reads the on-disk cache); the mapping or None."""
+        from utils.api_handler import create_product_mapping
+
+        # 1. Fetch from API (or the on-disk catalog cache)
+        with metrics.stage("fetch_catalog") as stage:
+            def fetch_catalog(strict=True):
+                return fetch_products(latencies=stage.latencies, strict=strict)
+
+            if args.no_catalog_cache:
+                api_products = fetch_catalog(strict=False)
+            else:
+                catalog = catalog_cache(fetch_catalog)
+                api_products = catalog.get_products()
+                print("Catalog cache:", catalog.stats)
+            stage.rows_out = len(api_products)
+
+        # 2. Create lookup mapping
+        return create_product_mapping(api_products) if api_products else None
+
+    # Modes that do not keep the rows enrich them during ingest, in the same
+    # pass (and worker processes) as the aggregation, so they need the
+    # catalog first
+    enrich_in_fold = 'enrich' in stages and \
+        (partitioned or args.incremental or args.workers > 1 or args.stream)
+    mapping = enricher = None
+    if enrich_in_fold:
+        from utils.api_handler import EnrichedWriter
+        mapping = product_mapping()
+        if mapping:
+            enricher = EnrichedWriter(mapping)
+
+    with metrics.stage("load") as stage:
+        if partitioned:
+            from utils.partitions import partitioned_aggregate
+            print("Aggregating partition files...\n")
+            valid_transactions = None
+            aggregate, summary = partitioned_aggregate(
+                args.input, args.start_date, args.end_date, regions,
+                workers=args.workers if args.workers > 1 else None,
+                aggregator_options=options, cube=cube, enricher=enricher
+            )
+        elif args.incremental:
+            from utils.checkpoint import incremental_aggregate
+            print("Updating sales aggregates from checkpoint...\n")
+            valid_transactions = None
+            aggregate, summary, _ = incremental_aggregate(
+                args.input, args.checkpoint, aggregator_options=options,
+                cube=cube, enricher=enricher
+            )
+        elif args.workers > 1:
+            from utils.parallel import parallel_aggregate
+            print(f"Processing sales data file on {args.workers} worker processes...\n")
+            valid_transactions = None
+            aggregate, summary = parallel_aggregate(
+                args.input, workers=args.workers, aggregator_options=options,
+                cube=cube, enricher=enricher
+            )
+        elif args.stream:
+            # Fold the stream straight into the aggregator, cube and enriched file
+            print("Streaming, parsing and validating sales data file...\n")
+            summary = {}
+            valid_transactions = None
+            aggregate = build_aggregate(
+                tap(deduplicate(stream_transactions(args.input, summary), summary), cube, enricher),
+                **build_options
+            )
+        elif args.cache:
+            from utils.parse_cache import cached_transactions
+            valid_transactions, summary = cached_transactions(args.input)
+            if args.dedup:
+                from utils.transaction_table import TransactionTable
+                summary = dict(summary)
+                valid_transactions = TransactionTable.from_transactions(
+                    deduplicate(valid_transactions, summary)
+                )
+            if args.result_cache:
+                # The aggregate itself is memoized, keyed by the table's source hash
+                results = enable_result_cache(disk_dir=args.result_cache)
+                aggregate = results.call(build_aggregate, valid_transactions,
+                                         kwargs=dict(build_options, backend=args.backend))
+                print("Result cache:", results.stats)
+            else:
+                aggregate = build_aggregate(valid_transactions, **build_options)
+        elif args.columnar:
+            from utils.transaction_table import TransactionTable
+            print("Loading sales data into a columnar table...\n")
+            summary = {}
+            valid_transactions = TransactionTable.from_transactions(
+                deduplicate(stream_transactions(args.input, summary), summary)
+            )
+            aggregate = build_aggregate(valid_transactions, **build_options)
+        else:
+            valid_transactions, summary = load_transactions(args.input)
+            if args.dedup:
+                valid_transactions = list(deduplicate(valid_transactions, summary))
+            aggregate = build_aggregate(valid_transactions, **build_options)
+        stage.rows_in = summary.get('total_input')
+        stage.rows_out = summary.get('final_count')
 
     print("\nValidation Summary:")
     for key, value in summary.items():
         print(f"{key}: {value}")
 
+    if cube is not None:
+        with metrics.stage("cube") as stage:
+            if valid_transactions is not None:
+                cube.update(valid_transactions)
+            cube.save(args.cube)
+            print(f"\nSaved sales cube ({len(cube)} cells) to {args.cube}")
+            stage.rows_out = len(cube)
+
     # --- NEW: Question 3 Reporting Section ---
-    if valid_transactions:
-        print("\n" + "="*30)
-        print(" SALES ANALYTICS REPORT ")
-        print("="*30)
-
-        # 1. Total Revenue
-        total_rev = calculate_total_revenue(valid_transactions)
-        print(f"Total Revenue: ${total_rev:,.2f}")
-
-        # 2. Regional Breakdown
-        print("\nRegion-wise Sales Analysis:")
-        regions = region_wise_sales(valid_transactions)
-        for reg, stats in regions.items():
-            print(f"- {reg}: {stats['percentage']}% (${stats['total_sales']:,.2f})")
-
-        # 3. Top Selling Products
-        print("\nTop 5 Selling Products:")
-        top_5 = top_selling_products(valid_transactions, n=5)
-        for name, qty, rev in top_5:
-            print(f"- {name}: {qty} units sold (${rev:,.2f})")
-
-        # 4. Peak Sale Day
-        peak_day = find_peak_sales_day(valid_transactions)
-        print(f"\nPeak Sales Day: {peak_day[0]} (${peak_day[1]:,.2f})")
-
-        # 5. Top Customer
-        print("\nTop Spender Details:")
-        all_customers = customer_analysis(valid_transactions)
-        top_id = list(all_customers.keys())[0]
-        top_data = all_customers[top_id]
-        print(f"- Customer ID: {top_id}")
-        print(f"- Total Spent: ${top_data['total_spent']:,.2f}")
-        print(f"- Products: {', '.join(top_data['products_bought'])}")
-    else:
+    if 'analytics' in stages and aggregate.count:
+        with metrics.stage("analytics"):
+            print("\n" + "="*30)
+            print(" SALES ANALYTICS REPORT ")
+            print("="*30)
+
+            # 1. Total Revenue
+            total_rev = calculate_total_revenue(aggregate)
+            print(f"Total Revenue: ${total_rev:,.2f}")
+
+            # 2. Regional Breakdown
+            print("\nRegion-wise Sales Analysis:")
+            regions = region_wise_sales(aggregate)
+            for reg, stats in regions.items():
+                print(f"- {reg}: {stats['percentage']}% (${stats['total_sales']:,.2f})")
+
+            # 3. Top Selling Products
+            print("\nTop 5 Selling Products:")
+            top_5 = top_selling_products(aggregate, n=5)
+            for name, qty, rev in top_5:
+                print(f"- {name}: {qty} units sold (${rev:,.2f})")
+
+            # 4. Peak Sale Day
+            peak_day = find_peak_sales_day(aggregate)
+            print(f"\nPeak Sales Day: {peak_day[0]} (${peak_day[1]:,.2f})")
+
+            # 5. Top Customer
+            print("\nTop Spender Details:")
+            all_customers = customer_analysis(aggregate, n=1)
+            top_id = list(all_customers.keys())[0]
+            top_data = all_customers[top_id]
+            print(f"- Customer ID: {top_id}")
+            print(f"- Total Spent: ${top_data['total_spent']:,.2f}")
+            if 'products_bought' in top_data:
+                print(f"- Products: {', '.join(top_data['products_bought'])}")
+            else:
+                print(f"- Distinct Products: ~{top_data['distinct_products']}")
+
+            # 6. Approximate heavy hitters (bounded-memory sketches)
+            if args.approx_top_k:
+                print("\nApproximate Top Products (qty, +/- max error):")
+                for name, qty, err, _ in aggregate.approx_top_products(5):
+                    print(f"- {name}: ~{qty} units (+/- {err})")
+                print("\nApproximate Top Customers (spend, +/- max error):")
+                for cid, spent, err, _ in aggregate.approx_top_customers(5):
+                    print(f"- {cid}: ~${spent:,.2f} (+/- ${err:,.2f})")
+
+    elif 'analytics' in stages:
         print("\nNo valid transactions found for analysis.")
 
-    # 1. Fetch from API
-    api_products = fetch_all_products()
-    
-    if api_products:
-        # 2. Create lookup mapping
-        mapping = create_product_mapping(api_products)
-        
-        # 3. Enrich the sales data
-        enriched_data = enrich_sales_data(valid_transactions, mapping)
-        
-        # 4. Save to file
-        save_enriched_data(enriched_data)
-        
-        # Sample print to verify
-        print("\nSample Enriched Row:")
-        print(enriched_data[0])
-    else:
-        print("Skipping enrichment because API data could not be fetched.")
-        
-    print("\nFinalizing system and generating report...")
-    generate_sales_report(valid_transactions, enriched_data)
+    # Enrichment is optional: without it the report says it did not run
+    enriched_data = None
+    if 'enrich' in stages:
+        from utils.api_handler import enrich_and_save
+
+        if not enrich_in_fold:
+            mapping = product_mapping()
+        if mapping:
+            # 3. Enrich the sales data and stream it to file (or finish the
+            # file written during ingest)
+            with metrics.stage("enrich") as stage:
+                if enricher is not None:
+                    enriched_data = enricher.finish()
+                else:
+                    enriched_data = enrich_and_save(valid_transactions, mapping)
+                stage.rows_out = enriched_data['rows']
+
+            # Sample print to verify
+            if enriched_data['sample'] is not None:
+                print("\nSample Enriched Row:")
+                print(enriched_data['sample'])
+        else:
+            print("Skipping enrichment because API data could not be fetched.")
+            enriched_data = []
+
+    if 'report' in stages:
+        print("\nFinalizing system and generating report...")
+    with metrics.stage("report") as stage:
+        # Every report figure is queried once; the snapshot lets later runs
+        # render any format with --stages report, without the raw data
+        data = build_report_data(aggregate, enriched_data, summary)
+        if 'report' in stages:
+            render_reports(data, args)
+        save_snapshot(data, args.snapshot)
+        stage.rows_in = aggregate.count
+    print(f"Report snapshot saved: {args.snapshot}")
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
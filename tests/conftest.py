@@ -0,0 +1,41 @@
+"""
+tests/conftest.py
+Shared fixtures: a generated sales file (with the source data's quirks) and
+its valid transactions, plus in_cents for comparing money figures.
+"""
+import pytest
+
+from utils.data_generator import generate_sales_file
+from utils.file_handler import read_sales_data, ingest_transactions
+
+SALES_ROWS = 3000
+
+
+def in_cents(value):
+    """
+    value with every float rounded to cents. The generated prices have
+    cents, so sums folded per chunk, partition or day differ from a serial
+    sum in the last bits; the report only promises cents.
+    """
+    if isinstance(value, float):
+        return round(value, 2)
+    if isinstance(value, dict):
+        return {k: in_cents(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(in_cents(v) for v in value)
+    return value
+
+
+@pytest.fixture(scope='session')
+def sales_file(tmp_path_factory):
+    """A synthetic sales file spanning 45 days, so the rolling windows fill up."""
+    filename = str(tmp_path_factory.mktemp('data') / 'sales.txt')
+    generate_sales_file(filename, SALES_ROWS, seed=7, days=45, products=25)
+    return filename
+
+
+@pytest.fixture(scope='session')
+def transactions(sales_file):
+    """The valid transactions of sales_file, from the serial pipeline."""
+    valid, _, _ = ingest_transactions(read_sales_data(sales_file))
+    return valid
@@ -0,0 +1,110 @@
+"""
+tests/test_api_handler.py
+fetch_all_products against the local stand-in API (utils/mock_product_api.py).
+"""
+import time
+
+import pytest
+
+from utils.api_handler import fetch_all_products, IncompleteCatalogError
+from utils.mock_product_api import make_products, serve_products
+
+
+@pytest.fixture
+def api():
+    """Starts a stand-in server per test: api(**serve_products options) -> (url, handler)."""
+    servers = []
+
+    def start(**options):
+        server, url = serve_products(**options)
+        servers.append(server)
+        return url, server.RequestHandlerClass
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _fetch(url, **options):
+    options.setdefault('backoff', 0.01)
+    return fetch_all_products(url, **options)
+
+
+def test_fetches_every_page_when_total_exceeds_the_limit(api):
+    url, handler = api(products=make_products(250))
+
+    products = _fetch(url, page_size=100)
+
+    assert [p['id'] for p in products] == list(range(1, 251))
+    assert sorted(skip for skip, _, _ in handler.requests_seen) == [0, 100, 200]
+
+
+def test_follows_the_page_size_the_server_caps_to(api):
+    url, handler = api(products=make_products(250), max_limit=50)
+
+    products = _fetch(url, page_size=100)
+
+    assert [p['id'] for p in products] == list(range(1, 251))
+    assert sorted(skip for skip, _, _ in handler.requests_seen) == [0, 50, 100, 150, 200]
+
+
+def test_retries_503_and_429_with_backoff(api):
+    url, handler = api(products=make_products(150), errors={100: [503, 429]})
+    latencies = []
+
+    started = time.perf_counter()
+    products = _fetch(url, retries=3, backoff=0.05, latencies=latencies)
+    elapsed = time.perf_counter() - started
+
+    assert len(products) == 150
+    assert [status for skip, _, status in handler.requests_seen if skip == 100] == [503, 429, 200]
+    assert sorted(status for _, status in latencies) == [200, 200, 429, 503]
+    # Two waits: backoff * 1, then backoff * 2
+    assert elapsed >= 0.05 + 0.1
+
+
+def test_page_that_keeps_failing_is_skipped(api, capsys):
+    url, handler = api(products=make_products(300), errors={100: [503] * 10})
+
+    products = _fetch(url, retries=2)
+
+    assert [p['id'] for p in products] == list(range(1, 101)) + list(range(201, 301))
+    assert [skip for skip, _, _ in handler.requests_seen].count(100) == 3
+    assert "1 page(s) could not be fetched" in capsys.readouterr().out
+
+
+def test_page_that_keeps_failing_raises_when_strict(api):
+    url, _ = api(products=make_products(300), errors={200: [503] * 10})
+
+    with pytest.raises(IncompleteCatalogError) as raised:
+        _fetch(url, retries=1, strict=True)
+
+    assert raised.value.failed_pages == 1
+    assert raised.value.total == 300
+    assert len(raised.value.products) == 200
+
+
+def test_client_errors_are_not_retried(api):
+    url, handler = api(products=make_products(50), errors={0: [404]})
+
+    assert _fetch(url, retries=3) == []
+    assert len(handler.requests_seen) == 1
+
+
+def test_slow_responses_time_out_per_request(api):
+    url, _ = api(products=make_products(50), latency=0.3)
+    latencies = []
+
+    assert _fetch(url, timeout=0.05, retries=1, latencies=latencies) == []
+    assert [outcome for _, outcome in latencies] == ['ReadTimeout', 'ReadTimeout']
+    assert all(seconds < 0.3 for seconds, _ in latencies)
+
+
+def test_slow_responses_within_the_timeout_succeed(api):
+    url, _ = api(products=make_products(150), latency=0.1)
+    latencies = []
+
+    assert len(_fetch(url, timeout=2, latencies=latencies)) == 150
+    assert [outcome for _, outcome in latencies] == [200, 200]
+    assert all(seconds >= 0.1 for seconds, _ in latencies)
@@ -0,0 +1,51 @@
+"""
+tests/test_backends.py
+The numpy and sqlite backends give the same figures as SalesAggregator.
+"""
+import pytest
+
+from utils.data_processor import build_aggregate
+from utils.report import build_report_data
+from utils.transaction_table import TransactionTable
+
+
+def _figures(aggregate):
+    """Every report figure plus the queries the report does not show."""
+    data = build_report_data(aggregate)
+    del data['created']
+    data['customers'] = aggregate.customer_analysis()
+    data['low_products_600'] = aggregate.low_performing_products(threshold=600)
+    for period in ('day', 'week', 'month'):
+        data[f'unique_customers_{period}'] = aggregate.unique_customers_by_period(period)
+    return data
+
+
+@pytest.fixture(scope='module')
+def expected(transactions):
+    return _figures(build_aggregate(transactions, backend='python'))
+
+
+def test_numpy_backend_matches_python(transactions, expected):
+    pytest.importorskip('numpy')
+    assert _figures(build_aggregate(transactions, backend='numpy')) == expected
+
+
+@pytest.mark.parametrize('fast_ufunc_at', [True, False])
+def test_numpy_grouping_paths_agree(transactions, expected, monkeypatch, fast_ufunc_at):
+    pytest.importorskip('numpy')
+    monkeypatch.setattr('utils.vectorized.FAST_UFUNC_AT', fast_ufunc_at)
+    assert _figures(build_aggregate(transactions, backend='numpy')) == expected
+
+
+def test_numpy_backend_reads_a_transaction_table(transactions, expected):
+    pytest.importorskip('numpy')
+    table = TransactionTable.from_transactions(transactions)
+    assert _figures(build_aggregate(table, backend='numpy')) == expected
+
+
+def test_sqlite_backend_matches_python(transactions, expected, tmp_path):
+    aggregate = build_aggregate(transactions, backend='sqlite', db_path=str(tmp_path / 'sales.sqlite'))
+    try:
+        assert _figures(aggregate) == expected
+    finally:
+        aggregate.close()
@@ -0,0 +1,150 @@
+"""
+tests/test_checkpoint.py
+incremental_aggregate over a file appended in pieces gives the same
+aggregate, summary and enriched file as one serial run over the whole file.
+"""
+import os
+
+import pytest
+
+from utils.aggregator import SalesAggregator
+from utils.api_handler import EnrichedWriter, create_product_mapping, enrich_and_save
+from utils.checkpoint import incremental_aggregate
+from utils.file_handler import read_sales_data, ingest_transactions
+from utils.mock_product_api import make_products
+from utils.report import build_report_data
+
+
+def _figures(aggregate):
+    data = build_report_data(aggregate)
+    del data['created']
+    return data
+
+
+@pytest.fixture
+def pieces(sales_file):
+    """The sales file cut into three pieces, the first two in the middle of a line."""
+    with open(sales_file, 'rb') as f:
+        data = f.read()
+    cuts = [len(data) // 3 + 5, 2 * len(data) // 3 + 11]
+    assert data[cuts[0] - 1:cuts[0]] != b'\n' and data[cuts[1] - 1:cuts[1]] != b'\n'
+    return [data[:cuts[0]], data[cuts[0]:cuts[1]], data[cuts[1]:]]
+
+
+def _run_appending(pieces, source, checkpoint, make_enricher=None):
+    """Appends each piece and brings the checkpoint up to date; returns the last results and modes."""
+    modes = []
+    for piece in pieces:
+        with open(source, 'ab') as f:
+            f.write(piece)
+        enricher = make_enricher() if make_enricher else None
+        aggregate, summary, mode = incremental_aggregate(source, checkpoint, enricher=enricher)
+        modes.append(mode)
+    return aggregate, summary, enricher, modes
+
+
+def test_incremental_matches_serial(sales_file, transactions, pieces, tmp_path):
+    _, _, expected_summary = ingest_transactions(read_sales_data(sales_file))
+
+    aggregate, summary, _, modes = _run_appending(
+        pieces, str(tmp_path / 'sales.txt'), str(tmp_path / 'checkpoint.json'))
+
+    assert modes == ['full', 'incremental', 'incremental']
+    assert summary == expected_summary
+    assert _figures(aggregate) == _figures(SalesAggregator.from_transactions(transactions))
+
+
+def test_incremental_enrichment_appends_only_new_rows(transactions, pieces, tmp_path):
+    mapping = create_product_mapping(make_products(115))
+    serial_file = str(tmp_path / 'serial.txt')
+    expected = enrich_and_save(transactions, mapping, serial_file)
+    enriched_file = str(tmp_path / 'enriched.txt')
+
+    _, _, enricher, modes = _run_appending(
+        pieces, str(tmp_path / 'sales.txt'), str(tmp_path / 'checkpoint.json'),
+        lambda: EnrichedWriter(mapping, enriched_file))
+
+    assert modes == ['full', 'incremental', 'incremental']
+    assert enricher.finish() == expected
+    with open(serial_file, 'rb') as serial, open(enriched_file, 'rb') as incremental:
+        assert incremental.read() == serial.read()
+
+
+def test_changed_catalog_rebuilds_the_enriched_file(transactions, pieces, tmp_path):
+    source, checkpoint = str(tmp_path / 'sales.txt'), str(tmp_path / 'checkpoint.json')
+    enriched_file = str(tmp_path / 'enriched.txt')
+    _run_appending(pieces[:2], source, checkpoint,
+                   lambda: EnrichedWriter(create_product_mapping(make_products(110)), enriched_file))
+
+    mapping = create_product_mapping(make_products(115))
+    _, _, enricher, modes = _run_appending(pieces[2:], source, checkpoint,
+                                           lambda: EnrichedWriter(mapping, enriched_file))
+
+    assert modes == ['full']
+    assert enricher.finish() == enrich_and_save(transactions, mapping, str(tmp_path / 'serial.txt'))
+
+
+def test_rewritten_source_rebuilds(sales_file, tmp_path):
+    source, checkpoint = str(tmp_path / 'sales.txt'), str(tmp_path / 'checkpoint.json')
+    with open(sales_file, 'rb') as f:
+        data = f.read()
+    _run_appending([data], source, checkpoint)
+
+    with open(source, 'wb') as f:
+        f.write(data.replace(b'|North', b'|South'))
+    aggregate, _, mode = incremental_aggregate(source, checkpoint)
+
+    assert mode == 'full'
+    assert 'North' not in aggregate.region_wise_sales()
+
+
+def test_last_line_without_newline_waits_until_the_file_settles(sales_file, tmp_path):
+    source, checkpoint = str(tmp_path / 'sales.txt'), str(tmp_path / 'checkpoint.json')
+    with open(sales_file, 'rb') as f:
+        data = f.read().rstrip(b'\n')
+    with open(source, 'wb') as f:
+        f.write(data)
+    # The serial pipeline over the same file reads the last line as well
+    transactions, _, expected_summary = ingest_transactions(read_sales_data(source))
+    mapping = create_product_mapping(make_products(115))
+    expected = enrich_and_save(transactions, mapping, str(tmp_path / 'serial.txt'))
+    enriched_file = str(tmp_path / 'enriched.txt')
+
+    # Just written: the unterminated line is left out of everything
+    enricher = EnrichedWriter(mapping, enriched_file)
+    _, summary, mode = incremental_aggregate(source, checkpoint, enricher=enricher)
+    assert mode == 'full'
+    assert summary['total_input'] == expected_summary['total_input'] - 1
+    assert enricher.summary['rows'] == expected['rows'] - 1
+
+    # Unchanged for longer than tail_settle: it is read, written and checkpointed
+    settled = os.path.getmtime(source) - 60
+    os.utime(source, (settled, settled))
+    enricher = EnrichedWriter(mapping, enriched_file)
+    aggregate, summary, mode = incremental_aggregate(source, checkpoint, enricher=enricher)
+    assert mode == 'incremental'
+    assert summary == expected_summary
+    assert _figures(aggregate) == _figures(SalesAggregator.from_transactions(transactions))
+    assert enricher.finish() == expected
+    with open(str(tmp_path / 'serial.txt'), 'rb') as serial, open(enriched_file, 'rb') as incremental:
+        assert incremental.read() == serial.read()
+
+    assert incremental_aggregate(source, checkpoint)[2] == 'unchanged'
+
+
+def test_edit_in_the_middle_of_the_prefix_rebuilds(sales_file, tmp_path):
+    source, checkpoint = str(tmp_path / 'sales.txt'), str(tmp_path / 'checkpoint.json')
+    with open(sales_file, 'rb') as f:
+        data = f.read()
+    _run_appending([data], source, checkpoint)
+
+    # Same length, away from the first and last 4 KB
+    middle = data.index(b'|North', len(data) // 2)
+    with open(source, 'r+b') as f:
+        f.seek(middle)
+        f.write(b'|South')
+    aggregate, _, mode = incremental_aggregate(source, checkpoint)
+
+    expected = SalesAggregator.from_transactions(ingest_transactions(read_sales_data(source))[0])
+    assert mode == 'full'
+    assert aggregate.region_wise_sales() == expected.region_wise_sales()
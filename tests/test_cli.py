@@ -0,0 +1,86 @@
+"""
+tests/test_cli.py
+parse_args rejects flag combinations that main() would ignore or crash on.
+"""
+import pytest
+
+import main
+
+
+def _parse(monkeypatch, *argv):
+    monkeypatch.setattr('sys.argv', ['main.py', *argv])
+    return main.parse_args()
+
+
+@pytest.mark.parametrize('argv, message', [
+    (['--backend', 'numpy', '--approx-top-k', '5'], '--approx-top-k needs --backend python'),
+    (['--backend', 'sqlite', '--approx-top-k', '5'], '--approx-top-k needs --backend python'),
+    (['--backend', 'numpy', '--distinct-precision', '8'], '--distinct-precision needs --backend python'),
+    (['--backend', 'sqlite', '--distinct-precision', '8'], '--distinct-precision needs --backend python'),
+    (['--sqlite-db', 'sales.sqlite'], '--sqlite-db needs --backend sqlite'),
+    (['--result-cache'], '--result-cache needs --cache'),
+    (['--cache', '--stream', '--result-cache'], '--result-cache needs --cache'),
+    (['--cache', '--workers', '2', '--result-cache'], '--result-cache needs --cache'),
+    (['--cache', '--backend', 'sqlite', '--result-cache'], '--result-cache cannot store'),
+    (['--start-date', '2024-13-01'], '--start-date must be a YYYY-MM-DD date'),
+    (['--end-date', '12/31/2024'], '--end-date must be a YYYY-MM-DD date'),
+    (['--start-date', '2024-12-10', '--end-date', '2024-12-01'], '--start-date is after --end-date'),
+])
+def test_rejected_combinations(monkeypatch, capsys, argv, message):
+    with pytest.raises(SystemExit) as raised:
+        _parse(monkeypatch, *argv)
+    assert raised.value.code == 2
+    assert message in capsys.readouterr().err
+
+
+@pytest.mark.parametrize('argv', [
+    [],
+    ['--approx-top-k', '5'],
+    ['--distinct-precision', '8', '--workers', '2'],
+    ['--backend', 'numpy', '--stream'],
+    ['--cache', '--backend', 'numpy', '--result-cache'],
+])
+def test_accepted_combinations(monkeypatch, argv):
+    _parse(monkeypatch, *argv)
+
+
+def test_dates_are_normalised(monkeypatch):
+    args = _parse(monkeypatch, '--start-date', '20241201', '--end-date', '2024-12-01')
+    assert args.start_date == args.end_date == '2024-12-01'
+
+
+@pytest.mark.parametrize('backend_args', [
+    ['--backend', 'python', '--approx-top-k', '5', '--distinct-precision', '8'],
+    ['--backend', 'numpy'],
+    ['--backend', 'sqlite'],
+])
+def test_accepted_backend_options_run(monkeypatch, capsys, sales_file, tmp_path, backend_args):
+    if 'numpy' in backend_args:
+        pytest.importorskip('numpy')
+    if 'sqlite' in backend_args:
+        backend_args = backend_args + ['--sqlite-db', str(tmp_path / 'sales.sqlite')]
+    monkeypatch.setattr('sys.argv', [
+        'main.py', '--input', sales_file, '--stages', 'ingest,analytics',
+        '--snapshot', str(tmp_path / 'snapshot.json'), *backend_args
+    ])
+    main.main()
+    assert 'Total Revenue:' in capsys.readouterr().out
+
+
+def test_report_only_run_writes_metrics_and_profile(monkeypatch, sales_file, tmp_path):
+    snapshot = str(tmp_path / 'snapshot.json')
+    monkeypatch.setattr('sys.argv', [
+        'main.py', '--input', sales_file, '--stages', 'ingest', '--snapshot', snapshot
+    ])
+    main.main()
+
+    profile, metrics = tmp_path / 'profile.out', tmp_path / 'metrics.json'
+    monkeypatch.setattr('sys.argv', [
+        'main.py', '--stages', 'report', '--snapshot', snapshot,
+        '--report-file', str(tmp_path / 'report.txt'),
+        '--profile', str(profile), '--metrics', str(metrics)
+    ])
+    main.main()
+
+    assert profile.exists() and metrics.exists()
+    assert 'report' in (tmp_path / 'profile.out.txt').read_text(encoding='utf-8')
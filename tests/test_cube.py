@@ -0,0 +1,84 @@
+"""
+tests/test_cube.py
+SalesCube views, slices and roll-ups agree with SalesAggregator over the
+same rows, however the cube was built.
+"""
+import pytest
+
+from conftest import in_cents
+from utils.aggregator import SalesAggregator, period_key
+from utils.checkpoint import incremental_aggregate
+from utils.cube import SalesCube
+from utils.parallel import parallel_aggregate
+
+
+def _views(aggregate):
+    return in_cents({
+        'count': aggregate.count,
+        'total_revenue': aggregate.total_revenue,
+        'regions': aggregate.region_wise_sales(),
+        'top_products': aggregate.top_selling_products(n=5),
+        'daily_trend': aggregate.daily_sales_trend(),
+        'peak_day': aggregate.find_peak_sales_day(),
+        'low_products': aggregate.low_performing_products(threshold=600)
+    })
+
+
+def test_cube_matches_aggregator(transactions):
+    cube = SalesCube.from_transactions(transactions)
+    aggregate = SalesAggregator.from_transactions(transactions)
+
+    assert _views(cube) == _views(aggregate)
+    for period in ('day', 'week', 'month'):
+        assert cube.unique_customers(period) == aggregate.unique_customers_by_period(period)
+
+
+@pytest.mark.parametrize('start, end, regions', [
+    ('2024-12-10', '2024-12-24', None),
+    (None, '2024-12-15', {'North', 'West'}),
+    ('2025-01-01', None, {'South'}),
+])
+def test_slice_matches_aggregator_over_filtered_rows(transactions, start, end, regions):
+    cube = SalesCube.from_transactions(transactions).where(start=start, end=end, regions=regions)
+    aggregate = SalesAggregator.from_transactions(
+        t for t in transactions
+        if (start is None or t['Date'] >= start) and (end is None or t['Date'] <= end) and
+        (regions is None or t['Region'] in regions)
+    )
+
+    assert aggregate.count
+    assert _views(cube) == _views(aggregate)
+
+
+def test_weekly_rollup_matches_aggregator(transactions):
+    weeks = SalesCube.from_transactions(transactions).rollup(by=('date',), period='week')
+    expected = {}
+    for t in transactions:
+        week = expected.setdefault(period_key(t['Date'], 'week'), [0, 0])
+        week[0] += t['Quantity'] * t['UnitPrice']
+        week[1] += 1
+
+    assert in_cents({k: [v['revenue'], v['transaction_count']] for k, v in weeks.items()}) == in_cents(expected)
+
+
+def test_cube_from_workers_and_checkpoints_matches(sales_file, transactions, tmp_path):
+    expected = _views(SalesCube.from_transactions(transactions))
+
+    parallel = SalesCube()
+    parallel_aggregate(sales_file, workers=2, cube=parallel)
+    assert _views(parallel) == expected
+
+    source, checkpoint = str(tmp_path / 'sales.txt'), str(tmp_path / 'checkpoint.json')
+    with open(sales_file, 'rb') as f:
+        data = f.read()
+    middle = len(data) // 2
+    for piece in (data[:middle], data[middle:]):
+        with open(source, 'ab') as f:
+            f.write(piece)
+        incremental = SalesCube()
+        incremental_aggregate(source, checkpoint, cube=incremental)
+    assert _views(incremental) == expected
+
+    saved = str(tmp_path / 'cube.json')
+    incremental.save(saved)
+    assert _views(SalesCube.load(saved)) == expected
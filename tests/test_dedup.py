@@ -0,0 +1,89 @@
+"""
+tests/test_dedup.py
+Streaming dedup keeps exactly the first row of every TransactionID, whatever
+the Bloom filter answers.
+"""
+import json
+import random
+
+import pytest
+
+import main
+from utils.aggregator import SalesAggregator
+from utils.dedup import Deduplicator, iter_deduplicate
+from utils.file_handler import read_sales_data, ingest_transactions
+
+
+def _first_occurrences(rows):
+    """Brute-force dedup: the first row of every TransactionID, in order."""
+    seen = set()
+    kept = []
+    for t in rows:
+        if t['TransactionID'] not in seen:
+            seen.add(t['TransactionID'])
+            kept.append(t)
+    return kept
+
+
+@pytest.fixture
+def replayed_rows():
+    """5000 rows over 2000 IDs; repeats carry different quantities."""
+    rng = random.Random(5)
+    return [{'TransactionID': f"T{rng.randint(1, 2000):05d}", 'Quantity': n} for n in range(5000)]
+
+
+def test_keeps_the_first_occurrence(replayed_rows):
+    summary = {'final_count': len(replayed_rows)}
+    # flush_rows below the ID count, so repeats are confirmed on disk too
+    with Deduplicator(flush_rows=100) as deduplicator:
+        kept = list(iter_deduplicate(replayed_rows, deduplicator, summary))
+
+    expected = _first_occurrences(replayed_rows)
+    assert kept == expected
+    assert summary['duplicates'] == len(replayed_rows) - len(expected)
+    assert summary['final_count'] == len(expected)
+
+
+def test_bloom_false_positives_are_passed_through(replayed_rows):
+    # One 64-bit word for 2000 IDs: nearly every new ID looks "maybe seen"
+    with Deduplicator(memory_bytes=8, expected_ids=2000, flush_rows=100) as deduplicator:
+        kept = list(iter_deduplicate(replayed_rows, deduplicator))
+        stats = deduplicator.stats()
+
+    assert kept == _first_occurrences(replayed_rows)
+    assert stats['dedup_false_positives'] > 1000
+    assert stats['dedup_disk_lookups'] >= stats['dedup_false_positives']
+
+
+def test_persistent_store_remembers_earlier_runs(replayed_rows, tmp_path):
+    store = str(tmp_path / 'seen.sqlite')
+    with Deduplicator(store_path=store) as deduplicator:
+        first = list(iter_deduplicate(replayed_rows[:2500], deduplicator))
+    with Deduplicator(store_path=store) as deduplicator:
+        second = list(iter_deduplicate(replayed_rows, deduplicator))
+
+    assert first + second == _first_occurrences(replayed_rows)
+
+
+@pytest.mark.parametrize('mode', [[], ['--stream'], ['--columnar'], ['--cache']])
+def test_main_dedup_totals_match_brute_force(monkeypatch, sales_file, tmp_path, mode):
+    # The file followed by a replay of its second half with other quantities
+    with open(sales_file, encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    replay = [line.replace('|1|', '|9|') for line in lines[len(lines) // 2:]]
+    source = tmp_path / 'replayed.txt'
+    source.write_text('\n'.join(lines + replay) + '\n', encoding='utf-8')
+
+    snapshot = tmp_path / 'snapshot.json'
+    monkeypatch.setattr('sys.argv', [
+        'main.py', '--input', str(source), '--dedup', '--stages', 'ingest',
+        '--snapshot', str(snapshot), *mode
+    ])
+    main.main()
+    data = json.loads(snapshot.read_text(encoding='utf-8'))
+
+    valid, _, _ = ingest_transactions(read_sales_data(str(source)))
+    expected = SalesAggregator.from_transactions(_first_occurrences(valid))
+    assert data['records'] == expected.count < len(valid)
+    assert data['total_revenue'] == expected.total_revenue
+    assert data['summary']['duplicates'] == len(valid) - expected.count
@@ -0,0 +1,95 @@
+"""
+tests/test_index.py
+TransactionIndex queries return exactly what a plain list filter does.
+"""
+import random
+
+import pytest
+
+from utils.index import TransactionIndex
+from utils.transaction_table import TransactionTable
+
+
+def _brute(transactions, region=None, customer=None, product=None,
+           min_amount=None, max_amount=None, start=None, end=None):
+    def allowed(value, wanted):
+        return wanted is None or value in ({wanted} if isinstance(wanted, str) else set(wanted))
+    return [i for i, t in enumerate(transactions)
+            if allowed(t['Region'], region) and allowed(t['CustomerID'], customer) and
+            allowed(t['ProductID'], product) and
+            (min_amount is None or t['Quantity'] * t['UnitPrice'] >= min_amount) and
+            (max_amount is None or t['Quantity'] * t['UnitPrice'] <= max_amount) and
+            (start is None or t['Date'] >= start) and (end is None or t['Date'] <= end)]
+
+
+@pytest.fixture(scope='module')
+def index(transactions):
+    return TransactionIndex(transactions)
+
+
+@pytest.mark.parametrize('filters', [
+    {},
+    {'region': 'North'},
+    {'region': ['North', 'West']},
+    {'customer': 'C007'},
+    {'product': {'P101', 'P105', 'P199'}},
+    {'start': '2024-12-10', 'end': '2024-12-20'},
+    {'start': '2024-12-25'},
+    {'end': '2024-12-03'},
+    {'min_amount': 50000},
+    {'max_amount': 1000},
+    {'min_amount': 0, 'max_amount': 0},
+    {'region': 'South', 'product': 'P102', 'min_amount': 1000, 'start': '2024-12-05'},
+    {'customer': ['C001', 'C002', 'C003'], 'end': '2024-12-31', 'max_amount': 20000},
+    # Empty results
+    {'region': 'Central'},
+    {'start': '2024-12-20', 'end': '2024-12-10'},
+    {'min_amount': 10 ** 9},
+    {'region': 'North', 'customer': 'C999999'},
+])
+def test_query_matches_list_filter(transactions, index, filters):
+    assert index.query(**filters) == _brute(transactions, **filters)
+
+
+def test_range_bounds_are_inclusive(transactions, index):
+    amounts = sorted(t['Quantity'] * t['UnitPrice'] for t in transactions)
+    dates = sorted(t['Date'] for t in transactions)
+    for low, high in ((amounts[10], amounts[10]), (amounts[0], amounts[100]), (amounts[-50], amounts[-1])):
+        result = index.query(min_amount=low, max_amount=high)
+        assert result == _brute(transactions, min_amount=low, max_amount=high)
+        assert result
+    for start, end in ((dates[0], dates[0]), (dates[200], dates[200]), (dates[-1], None)):
+        result = index.query(start=start, end=end)
+        assert result == _brute(transactions, start=start, end=end)
+        assert result
+
+
+def test_random_filter_combinations(transactions, index):
+    rng = random.Random(11)
+    regions = index.values('region')
+    customers = index.values('customer')
+    products = index.values('product')
+    dates = sorted(index.dates)
+    for _ in range(300):
+        filters = {}
+        if rng.random() < 0.4:
+            filters['region'] = rng.sample(regions, rng.randint(1, 2))
+        if rng.random() < 0.3:
+            filters['customer'] = rng.choice(customers)
+        if rng.random() < 0.4:
+            filters['product'] = rng.sample(products, rng.randint(1, 3))
+        if rng.random() < 0.5:
+            filters['min_amount'] = rng.choice([0, 500, 5000, 50000])
+        if rng.random() < 0.3:
+            filters['max_amount'] = rng.choice([2000, 30000, 300000])
+        if rng.random() < 0.5:
+            filters['start'], filters['end'] = sorted(rng.sample(dates, 2))
+        assert index.query(**filters) == _brute(transactions, **filters), filters
+
+
+def test_select_returns_rows_from_a_transaction_table(transactions):
+    table = TransactionTable.from_transactions(transactions)
+    rows = TransactionIndex(table).select(region='East', min_amount=10000)
+
+    assert [dict(t) for t in rows] == [dict(transactions[i])
+                                       for i in _brute(transactions, region='East', min_amount=10000)]
@@ -0,0 +1,45 @@
+"""
+tests/test_parallel.py
+parallel_aggregate gives the same aggregate, summary and enriched file as
+the serial pipeline.
+"""
+import pytest
+
+from conftest import in_cents
+from utils.aggregator import SalesAggregator
+from utils.api_handler import EnrichedWriter, create_product_mapping, enrich_and_save
+from utils.file_handler import read_sales_data, ingest_transactions
+from utils.mock_product_api import make_products
+from utils.parallel import parallel_aggregate
+from utils.report import build_report_data
+
+
+def _figures(aggregate):
+    data = build_report_data(aggregate)
+    del data['created']
+    return in_cents(data)
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_parallel_matches_serial(sales_file, transactions, workers):
+    _, _, summary = ingest_transactions(read_sales_data(sales_file))
+
+    aggregate, parallel_summary = parallel_aggregate(sales_file, workers=workers, chunks_per_worker=3)
+
+    assert parallel_summary == summary
+    assert _figures(aggregate) == _figures(SalesAggregator.from_transactions(transactions))
+
+
+def test_parallel_enrichment_matches_serial(sales_file, transactions, tmp_path):
+    # The catalog stops at id 115, so both matches and failures are written
+    mapping = create_product_mapping(make_products(115))
+    serial_file = str(tmp_path / 'serial.txt')
+    expected = enrich_and_save(transactions, mapping, serial_file)
+
+    writer = EnrichedWriter(mapping, str(tmp_path / 'parallel.txt'))
+    parallel_aggregate(sales_file, workers=2, enricher=writer)
+    summary = writer.finish()
+
+    assert summary == expected
+    with open(serial_file, 'rb') as serial, open(writer.filename, 'rb') as parallel:
+        assert parallel.read() == serial.read()
@@ -0,0 +1,106 @@
+"""
+tests/test_parse_cache.py
+The parse cache returns exactly what a fresh parse would, and falls back to
+one whenever the source changed or the cache file cannot be trusted.
+"""
+import os
+import shutil
+
+import pytest
+
+from utils.file_handler import read_sales_data, ingest_transactions
+from utils.parse_cache import cached_transactions, cache_path, evict_cache
+from utils.transaction_table import TransactionTable
+
+
+@pytest.fixture
+def source(sales_file, tmp_path):
+    """A private copy of sales_file, so tests can edit it."""
+    path = str(tmp_path / 'sales.txt')
+    shutil.copy(sales_file, path)
+    return path
+
+
+def _load(source, cache_dir, capsys):
+    table, summary = cached_transactions(source, cache_dir=cache_dir)
+    return [dict(t) for t in table], summary, capsys.readouterr().out
+
+
+def test_hit_returns_the_parsed_rows_unchanged(source, transactions, tmp_path, capsys):
+    cache_dir = str(tmp_path / 'cache')
+    parsed, summary, out = _load(source, cache_dir, capsys)
+    assert "from cache" not in out
+
+    cached, cached_summary, out = _load(source, cache_dir, capsys)
+
+    assert "from cache" in out
+    assert cached == parsed == [dict(t) for t in transactions]
+    assert cached_summary == summary
+
+
+def test_source_edit_invalidates_the_entry(source, tmp_path, capsys):
+    cache_dir = str(tmp_path / 'cache')
+    before, _, _ = _load(source, cache_dir, capsys)
+
+    # Same size and mtime: only the content hash can notice the edit
+    stat = os.stat(source)
+    with open(source, encoding='utf-8') as f:
+        lines = f.read().split('\n')
+    # One more item in the first valid row with a one-digit quantity
+    for i, line in enumerate(lines[1:], 1):
+        fields = line.split('|')
+        if fields[4] in '12345678' and ingest_transactions([line])[0]:
+            fields[4] = str(int(fields[4]) + 1)
+            lines[i] = '|'.join(fields)
+            break
+    with open(source, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines))
+    assert os.path.getsize(source) == stat.st_size
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    after, _, out = _load(source, cache_dir, capsys)
+
+    assert "from cache" not in out
+    assert sum(t['Quantity'] for t in after) == sum(t['Quantity'] for t in before) + 1
+    assert after == [dict(t) for t in ingest_transactions(read_sales_data(source))[0]]
+
+
+@pytest.mark.parametrize('damage', [
+    lambda data: data[:len(data) // 2],
+    lambda data: data[:10],
+    lambda data: b'not a table',
+    lambda data: data[:11] + b'\xff' * 8 + data[19:],
+])
+def test_unreadable_cache_file_falls_back_to_a_parse(source, tmp_path, capsys, damage):
+    cache_dir = str(tmp_path / 'cache')
+    expected, _, _ = _load(source, cache_dir, capsys)
+    path = cache_path(source, cache_dir)
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open(path, 'wb') as f:
+        f.write(damage(data))
+
+    rows, _, out = _load(source, cache_dir, capsys)
+
+    assert "Ignoring unreadable cache file" in out
+    assert rows == expected
+    # The re-parse rewrote a good entry
+    assert _load(source, cache_dir, capsys)[2].startswith("Loaded")
+
+
+def test_evict_cache_keeps_the_directory_under_the_cap(transactions, tmp_path):
+    table = TransactionTable.from_transactions(transactions[:200])
+    paths = []
+    for i in range(5):
+        path = str(tmp_path / f'{i}.stbl')
+        table.save(path)
+        os.utime(path, (i, i))
+        paths.append(path)
+    size = os.path.getsize(paths[0])
+
+    # Keep the newest and an older entry that is still in use
+    removed = evict_cache(str(tmp_path), max_bytes=2 * size, keep=paths[0])
+
+    assert removed == 3
+    assert sorted(os.listdir(tmp_path)) == ['0.stbl', '4.stbl']
+    assert evict_cache(str(tmp_path), max_bytes=2 * size) == 0
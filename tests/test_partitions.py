@@ -0,0 +1,82 @@
+"""
+tests/test_partitions.py
+Pruning partitions by their path gives the same report as applying the
+same date and region filter to a full read.
+"""
+import os
+
+import pytest
+
+from conftest import in_cents
+from utils.aggregator import SalesAggregator
+from utils.partitions import discover_partitions, partitioned_aggregate
+from utils.report import build_report_data
+
+
+def _figures(aggregate):
+    data = build_report_data(aggregate)
+    del data['created']
+    # Ties keep first-appearance order, which differs between files, so
+    # rankings are compared in full with ties sorted by name
+    data['top_products'] = sorted(aggregate.top_selling_products(n=None), key=lambda p: (-p[1], p[0]))
+    data['low_products'].sort(key=lambda p: (p[1], p[0]))
+    return in_cents(data)
+
+
+@pytest.fixture(scope='module')
+def partitioned(sales_file, tmp_path_factory):
+    """
+    sales_file split into one file per day and region, alternating between
+    sales_<date>_<Region>.txt and <date>/<Region>/part-0.txt. Rows without a
+    region go to sales_<date>.txt.
+    """
+    root = tmp_path_factory.mktemp('partitions')
+    with open(sales_file, encoding='utf-8') as f:
+        header, *lines = f.read().splitlines()
+
+    groups = {}
+    for line in lines:
+        fields = line.split('|')
+        groups.setdefault((fields[1], fields[-1]), []).append(line)
+    for (day, region), rows in groups.items():
+        if not region:
+            path = root / f'sales_{day}.txt'
+        elif int(day[-2:]) % 2:
+            path = root / day / region / 'part-0.txt'
+        else:
+            path = root / f'sales_{day}_{region}.txt'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('\n'.join([header] + rows) + '\n', encoding='utf-8')
+    return str(root)
+
+
+def test_partition_regions_come_from_the_paths(partitioned):
+    partitions = discover_partitions(partitioned)
+
+    assert {p['region'] for p in partitions} == {'North', 'South', 'East', 'West', None}
+    for p in partitions:
+        name = os.path.relpath(p['path'], partitioned)
+        assert p['date'] and p['date'] in name
+        assert (p['region'] is None) == (name.count('_') == 1)
+
+
+@pytest.mark.parametrize('start, end, regions', [
+    ('2024-12-08', '2024-12-14', None),
+    (None, '2024-12-05', ['North', 'West']),
+    ('2024-12-20', None, ['east']),
+    (None, None, ['South']),
+    ('2024-12-03', '2024-12-09', ['Central']),
+])
+def test_pruned_result_matches_filtered_full_read(partitioned, transactions, start, end, regions):
+    aggregate, summary = partitioned_aggregate(partitioned, start, end, regions, workers=1)
+
+    wanted = {r.casefold() for r in regions} if regions else None
+    expected = SalesAggregator.from_transactions(
+        t for t in transactions
+        if (start is None or t['Date'] >= start) and (end is None or t['Date'] <= end) and
+        (wanted is None or t['Region'].casefold() in wanted)
+    )
+    assert _figures(aggregate) == _figures(expected)
+    if regions != ['Central']:
+        assert expected.count
+        assert summary['partitions_read'] < summary['partitions_found']
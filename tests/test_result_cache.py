@@ -0,0 +1,97 @@
+"""
+tests/test_result_cache.py
+Cached analytics are invalidated by any change to the rows, and every hit
+hands the caller its own copy.
+"""
+import copy
+
+import pytest
+
+import main
+from utils.data_processor import region_wise_sales, disable_result_cache
+from utils.parse_cache import cached_transactions
+from utils.result_cache import ResultCache, dataset_fingerprint
+from utils.transaction_table import TransactionTable
+
+
+def _edit(rows):
+    rows[len(rows) // 2]['Quantity'] += 1
+
+
+def _append(rows):
+    rows.append(dict(rows[0]))
+
+
+def _remove(rows):
+    del rows[-1]
+
+
+@pytest.mark.parametrize('change', [_edit, _append, _remove])
+def test_changed_rows_miss_the_cache(transactions, change):
+    rows = copy.deepcopy(transactions)
+    cache = ResultCache()
+    cache.call(region_wise_sales, rows)
+
+    change(rows)
+    result = cache.call(region_wise_sales, rows)
+
+    assert cache.stats['hits'] == 0 and cache.stats['misses'] == 2
+    assert result == region_wise_sales(rows)
+
+
+@pytest.mark.parametrize('change', [_edit, _append])
+def test_changed_table_rows_miss_the_cache(sales_file, tmp_path, change):
+    table, _ = cached_transactions(sales_file, cache_dir=str(tmp_path))
+    assert table.source_fingerprint is not None
+    cache = ResultCache()
+    cache.call(region_wise_sales, table)
+
+    change(table)
+    result = cache.call(region_wise_sales, table)
+
+    assert table.source_fingerprint is None
+    assert cache.stats['hits'] == 0 and cache.stats['misses'] == 2
+    assert result == region_wise_sales(table)
+
+
+def test_table_from_the_parse_cache_is_keyed_by_its_source(sales_file, tmp_path, monkeypatch):
+    first, _ = cached_transactions(sales_file, cache_dir=str(tmp_path))
+    second, _ = cached_transactions(sales_file, cache_dir=str(tmp_path))
+    monkeypatch.setattr(TransactionTable, 'update_digest', None)
+
+    assert dataset_fingerprint(first) == dataset_fingerprint(second)
+    cache = ResultCache()
+    cache.call(region_wise_sales, first)
+    cache.call(region_wise_sales, second)
+    assert cache.stats['hits'] == 1
+
+
+@pytest.mark.parametrize('disk', [False, True])
+def test_every_hit_is_a_fresh_copy(transactions, tmp_path, disk):
+    cache = ResultCache(disk_dir=str(tmp_path) if disk else None)
+    expected = region_wise_sales(transactions)
+
+    first = cache.call(region_wise_sales, transactions)
+    first.clear()
+    if disk:
+        cache.entries.clear()
+    second = cache.call(region_wise_sales, transactions)
+    second[next(iter(second))]['total_sales'] = -1
+
+    assert cache.call(region_wise_sales, transactions) == expected
+    assert cache.stats['misses'] == 1
+
+
+def test_main_result_cache_hits_on_the_second_run(monkeypatch, sales_file, tmp_path, capsys):
+    argv = ['main.py', '--input', sales_file, '--cache', '--result-cache', str(tmp_path),
+            '--stages', 'ingest', '--snapshot', str(tmp_path / 'snapshot.json')]
+    monkeypatch.setattr('sys.argv', argv)
+    try:
+        main.main()
+        main.main()
+    finally:
+        disable_result_cache()
+
+    out = capsys.readouterr().out
+    assert "Result cache: {'hits': 0, 'disk_hits': 0, 'misses': 1" in out
+    assert "Result cache: {'hits': 0, 'disk_hits': 1, 'misses': 0" in out
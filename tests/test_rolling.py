@@ -0,0 +1,86 @@
+"""
+tests/test_rolling.py
+RollingMetrics windows agree with brute-force sums over the rows.
+"""
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from utils.aggregator import SalesAggregator
+from utils.rolling import RollingMetrics
+
+FIRST_DAY = date(2024, 12, 1)
+
+
+def _brute_window(rows, latest, days):
+    """(revenue, count) of the rows dated within `days` days up to latest."""
+    first = latest - timedelta(days=days - 1)
+    inside = [revenue for day, revenue in rows if first <= day <= latest]
+    return sum(inside), len(inside)
+
+
+def _brute_week_over_week(rows, latest):
+    this_week = _brute_window(rows, latest, 7)[0]
+    last_week = _brute_window(rows, latest - timedelta(days=7), 7)[0]
+    return round(this_week / last_week - 1, 4) if last_week else None
+
+
+def _check(rolling, rows, latest):
+    assert rolling.latest_date == latest.isoformat()
+    for days in (1, 3, 7, 14, 30):
+        revenue, count = _brute_window(rows, latest, days)
+        window = rolling.window(days)
+        assert (window['revenue'], window['transaction_count']) == (round(revenue, 2), count), days
+        # Rounded from a sum that may differ from ours in the last bits
+        assert window['moving_average'] == pytest.approx(revenue / days, abs=0.0051)
+    assert rolling.week_over_week() == _brute_week_over_week(rows, latest)
+
+
+def test_windows_match_brute_force_for_rows_in_any_order():
+    rng = random.Random(3)
+    rolling = RollingMetrics(windows=(7, 30))
+    accepted = []
+    head = None
+    late = 0
+    # Mostly moving forward with gaps, some rows up to 40 days back
+    offset = 0
+    for n in range(3000):
+        offset += rng.choice([0, 0, 0, 1, 1, 2, 5])
+        day = FIRST_DAY + timedelta(days=max(0, offset - rng.choice([0, 0, 0, 3, 12, 40])))
+        revenue = rng.randint(1, 5000)
+
+        # Rows older than the ring when they arrive only count as late
+        if head is not None and day <= head - timedelta(days=rolling.capacity):
+            late += 1
+        else:
+            accepted.append((day, revenue))
+            head = day if head is None else max(head, day)
+        rolling.add(day.isoformat(), revenue)
+
+        if n % 97 == 0:
+            _check(rolling, accepted, head)
+
+    _check(rolling, accepted, head)
+    assert rolling.late_rows == late > 0
+
+    totals = {}
+    for day, revenue in accepted:
+        totals[day] = totals.get(day, 0) + revenue
+    assert rolling.peak[1] == max(totals.values())
+    assert totals[date.fromisoformat(rolling.peak[0])] == rolling.peak[1]
+
+
+@pytest.mark.parametrize('rolling_windows', [None, (7, 30)])
+def test_aggregator_windows_match_brute_force(transactions, rolling_windows):
+    rolling = SalesAggregator.from_transactions(transactions, rolling_windows=rolling_windows).rolling_metrics()
+    rows = [(date.fromisoformat(t['Date']), t['Quantity'] * t['UnitPrice']) for t in transactions]
+
+    _check(rolling, rows, max(day for day, _ in rows))
+
+
+def test_empty_metrics_have_no_windows():
+    rolling = RollingMetrics()
+    assert rolling.window(7) is None
+    assert rolling.week_over_week() is None
+    assert rolling.summary()['peak_day'] is None
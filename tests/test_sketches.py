@@ -0,0 +1,109 @@
+"""
+tests/test_sketches.py
+The sketches keep their documented guarantees, alone and after merging.
+"""
+import random
+from collections import Counter
+
+import pytest
+
+from utils.sketches import top_n, SpaceSaving, HyperLogLog
+
+
+def _stream(rng, length, shift=0):
+    """Skewed (item, weight) pairs: a few heavy items and a long tail."""
+    return [(int(rng.paretovariate(1.1)) + (shift if rng.random() < 0.3 else 0), rng.randint(1, 5))
+            for _ in range(length)]
+
+
+def _check_space_saving(sketch, exact):
+    total = sum(exact.values())
+    assert sketch.total == total
+    for item, count, error, _ in sketch.top():
+        assert count - error <= exact[item] <= count
+        assert error <= sketch.error_bound()
+    heavy = {item for item, weight in exact.items() if weight > total / sketch.capacity}
+    assert heavy and heavy <= set(sketch.counters)
+
+
+def test_top_n_matches_a_full_sort():
+    rng = random.Random(1)
+    items = [(i, rng.randint(0, 20)) for i in range(200)]
+
+    for n in (1, 5, 50, None):
+        expected = sorted(items, key=lambda x: x[1], reverse=True)[:n]
+        assert top_n(items, n, key=lambda x: x[1]) == expected
+
+
+@pytest.mark.parametrize('capacity', [5, 20])
+def test_space_saving_bounds(capacity):
+    rng = random.Random(capacity)
+    sketch, exact = SpaceSaving(capacity), Counter()
+    for item, weight in _stream(rng, 2000):
+        sketch.update(item, weight)
+        exact[item] += weight
+
+    assert len(sketch.counters) == capacity
+    _check_space_saving(sketch, exact)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_merge_keeps_heavy_hitters_within_bounds(seed):
+    rng = random.Random(seed)
+    merged, exact = None, Counter()
+    for part in range(4):
+        sketch = SpaceSaving(10)
+        for item, weight in _stream(rng, rng.randint(100, 800), shift=part * 20):
+            sketch.update(item, weight)
+            exact[item] += weight
+        merged = sketch if merged is None else merged.merge(sketch)
+
+    assert len(merged.counters) == 10
+    _check_space_saving(merged, exact)
+
+
+def test_space_saving_state_round_trip():
+    sketch = SpaceSaving(8)
+    for item, weight in _stream(random.Random(3), 500):
+        sketch.update(item, weight, aux=weight * 2)
+
+    restored = SpaceSaving.from_state(sketch.to_state())
+    assert restored.top() == sketch.top()
+    restored.update(1, 3)
+    assert restored.total == sketch.total + 3
+
+
+@pytest.mark.parametrize('precision', [6, 10, 14])
+@pytest.mark.parametrize('distinct', [50, 5000, 40000])
+def test_hyperloglog_within_its_relative_error(precision, distinct):
+    sketch = HyperLogLog(precision)
+    for i in range(distinct):
+        # Every item twice: repeats must not count
+        sketch.add(f'C{i}')
+        sketch.add(f'C{i}')
+
+    # Four standard errors, so the fixed hashes leave a wide margin
+    assert abs(sketch.estimate() - distinct) <= 4 * 1.04 / (1 << precision) ** 0.5 * distinct
+
+
+@pytest.mark.parametrize('sizes', [(10, 20), (10, 3000), (3000, 5000)])
+def test_hyperloglog_merge_equals_the_union(sizes):
+    parts = [HyperLogLog(10) for _ in sizes]
+    union = HyperLogLog(10)
+    for offset, (sketch, size) in enumerate(zip(parts, sizes)):
+        # Overlapping ranges of items
+        for i in range(offset * size // 2, offset * size // 2 + size):
+            sketch.add(i)
+            union.add(i)
+
+    merged = parts[0].copy().merge(parts[1])
+
+    assert dict(merged._registers()) == dict(union._registers())
+    assert merged.estimate() == union.estimate()
+    restored = HyperLogLog.from_state(merged.to_state())
+    assert restored.estimate() == union.estimate()
+
+
+def test_hyperloglog_rejects_mixed_precision():
+    with pytest.raises(ValueError):
+        HyperLogLog(10).merge(HyperLogLog(12))
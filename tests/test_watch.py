@@ -0,0 +1,159 @@
+"""
+tests/test_watch.py
+The watcher folds appended rows like a full read, holds back an unfinished
+last line, debounces the report and serves its metrics. Each test drives
+poll cycles directly instead of sleeping.
+"""
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from utils.aggregator import SalesAggregator
+from utils.file_handler import read_sales_data, ingest_transactions
+from utils.watch import SalesWatcher, metrics_server
+
+
+def _views(aggregate):
+    return (aggregate.count, aggregate.total_revenue, aggregate.region_wise_sales(),
+            aggregate.top_selling_products(5), aggregate.daily_sales_trend())
+
+
+def _expected(path):
+    valid, _, _ = ingest_transactions(read_sales_data(path))
+    return _views(SalesAggregator.from_transactions(valid))
+
+
+def _age(path, seconds=60):
+    """Backdates path's mtime, as if it had not been written for `seconds`."""
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+@pytest.fixture
+def feed(sales_file, tmp_path):
+    """(data dir, file in it holding the first half of sales_file, remaining lines)."""
+    with open(sales_file, encoding='utf-8') as f:
+        lines = f.read().splitlines(keepends=True)
+    middle = len(lines) // 2
+    path = tmp_path / 'data' / 'sales.txt'
+    path.parent.mkdir()
+    path.write_text(''.join(lines[:middle]), encoding='utf-8')
+    return str(path.parent), str(path), lines[middle:]
+
+
+def _watcher(source, tmp_path, **options):
+    return SalesWatcher(source, report_file=str(tmp_path / 'report.txt'), **options)
+
+
+def test_appended_rows_are_folded_in(feed, tmp_path):
+    source, path, rest = feed
+    watcher = _watcher(source, tmp_path)
+
+    watcher.tick()
+    assert _views(watcher.aggregate) == _expected(path)
+
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(''.join(rest))
+    watcher.tick()
+
+    assert _views(watcher.aggregate) == _expected(path)
+    assert watcher.stats['rebuilds'] == 0
+    assert watcher.version == 2
+
+
+def test_rewritten_file_is_rebuilt(feed, tmp_path):
+    source, path, rest = feed
+    watcher = _watcher(source, tmp_path)
+    watcher.tick()
+
+    with open(path, encoding='utf-8') as f:
+        header = f.readline()
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(header + ''.join(rest[:50]))
+    watcher.tick()
+
+    assert watcher.stats['rebuilds'] == 1
+    assert _views(watcher.aggregate) == _expected(path)
+
+
+def test_unfinished_last_line_waits_for_tail_settle(feed, tmp_path):
+    source, path, rest = feed
+    watcher = _watcher(source, tmp_path, tail_settle=30)
+    watcher.tick()
+    before = watcher.aggregate.count
+
+    # Half a line, then the writer pauses
+    line = rest[0]
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(line[:10])
+    watcher.tick()
+    assert watcher.aggregate.count == before
+    assert watcher.snapshot()['watcher']['ingest_lag_s'] is not None
+
+    # The writer finishes the line: it is read in full, never split
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(line[10:].rstrip('\n'))
+    watcher.tick()
+    assert watcher.aggregate.count == before
+
+    _age(path)
+    watcher.tick()
+    assert _views(watcher.aggregate) == _expected(path)
+
+
+def test_report_waits_for_the_debounce_interval(feed, tmp_path):
+    source, path, rest = feed
+    watcher = _watcher(source, tmp_path, debounce=5)
+    report = tmp_path / 'report.txt'
+
+    started = time.time()
+    assert not watcher.tick(now=started)
+    assert not report.exists()
+    assert watcher.snapshot()['watcher']['report_pending']
+
+    # Quiet long enough: one rewrite, and none while nothing changes
+    assert watcher.tick(now=watcher.dirty_since + 5)
+    assert report.exists()
+    assert not watcher.tick(now=time.time() + 60)
+    assert watcher.stats['reports_written'] == 1
+
+    # New rows restart the interval
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(''.join(rest))
+    assert not watcher.tick(now=time.time())
+    assert watcher.tick(now=watcher.dirty_since + 5)
+    assert watcher.stats['reports_written'] == 2
+
+
+def test_metrics_endpoint_serves_the_snapshot(feed, tmp_path):
+    source, path, _ = feed
+    watcher = _watcher(source, tmp_path)
+    watcher.tick()
+    server = metrics_server(watcher, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        with urllib.request.urlopen(base + '/metrics') as response:
+            metrics = json.load(response)
+        with urllib.request.urlopen(base + '/health') as response:
+            health = json.load(response)
+        with pytest.raises(urllib.error.HTTPError) as missing:
+            urllib.request.urlopen(base + '/nope')
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    count, revenue, regions, _, _ = _expected(path)
+    assert metrics['transactions'] == count
+    assert metrics['total_revenue'] == round(revenue, 2)
+    assert metrics['regions'] == json.loads(json.dumps(regions))
+    assert metrics['version'] == health['version'] == 1
+    assert metrics['watcher']['files'] == 1
+    assert missing.value.code == 404
@@ -0,0 +1,366 @@
+"""
+utils/aggregator.py
+Single-pass accumulator behind the analytics in utils/data_processor.py.
+"""
+from datetime import date as _date
+
+from utils.rolling import DEFAULT_WINDOWS, RollingMetrics
+from utils.sketches import HyperLogLog, SpaceSaving, top_n
+
+PERIODS = ('day', 'week', 'month')
+
+
+def period_key(date, period):
+    """Bucket key of a YYYY-MM-DD date: the date, its ISO week or its month."""
+    if period == 'day':
+        return date
+    if period == 'month':
+        return date[:7]
+    if period == 'week':
+        year, week, _ = _date.fromisoformat(date).isocalendar()
+        return f"{year}-W{week:02d}"
+    raise ValueError(f"Unknown period '{period}' (expected one of {', '.join(PERIODS)})")
+
+
+def peak_sales_day(trend):
+    """(date, revenue, count) for the highest revenue day of a daily_sales_trend(), or None."""
+    if not trend: return None
+    peak_date = max(trend, key=lambda d: trend[d]['revenue'])
+    return (peak_date, trend[peak_date]['revenue'], trend[peak_date]['transaction_count'])
+
+
+class SalesAggregator:
+    """
+    Folds transactions in one at a time and keeps every running total the
+    data_processor functions need, so a full report costs one pass over the
+    data instead of one pass per metric.
+    """
+
+    def __init__(self, approx_top_k=None, exact_details=True, distinct_precision=None,
+                 rolling_windows=None):
+        """
+        approx_top_k: if set, also track product quantity and customer spend
+            in Space-Saving sketches of this many counters (approx_top_products,
+            approx_top_customers). The sketches merge across chunks.
+        exact_details: set to False to skip the exact per-product and
+            per-customer tables, so memory for those dimensions stays bounded
+            by the sketches. The exact product/customer views then raise
+            ValueError.
+        distinct_precision: if set, per-day unique customers and
+            per-customer distinct products are kept in HyperLogLog sketches
+            of 2**distinct_precision registers instead of exact sets
+            (~1.04 / sqrt(2**p) relative error). customer_analysis then
+            reports 'distinct_products' instead of 'products_bought'.
+        rolling_windows: if set (e.g. (7, 30)), trailing-window revenue is
+            also kept up to date per transaction in a RollingMetrics, for
+            callers that fold rows in continuously. Without it,
+            rolling_metrics() derives the windows from the per-day totals.
+        """
+        if not exact_details and not approx_top_k:
+            raise ValueError("exact_details=False needs approx_top_k to be set")
+
+        self.approx_top_k = approx_top_k
+        self.exact_details = exact_details
+        self.distinct_precision = distinct_precision
+        self.product_sketch = SpaceSaving(approx_top_k) if approx_top_k else None
+        self.customer_sketch = SpaceSaving(approx_top_k) if approx_top_k else None
+        self.rolling_windows = tuple(rolling_windows) if rolling_windows else None
+        self.rolling = RollingMetrics(rolling_windows) if rolling_windows else None
+
+        self.count = 0
+        self.total_revenue = 0
+        self.min_date = None
+        self.max_date = None
+
+        # region -> [total_sales, transaction_count]
+        self.regions = {}
+        # product name -> [qty, rev]
+        self.products = {}
+        # customer id -> [total_spent, purchase_count, distinct product names]
+        self.customers = {}
+        # date -> [revenue, transaction_count, distinct customer ids]
+        self.days = {}
+        # (the distinct members are sets, or HyperLogLogs with distinct_precision)
+
+    def _new_distinct(self):
+        if self.distinct_precision is None:
+            return set()
+        return HyperLogLog(self.distinct_precision)
+
+    def _copy_distinct(self, members):
+        return set(members) if isinstance(members, set) else members.copy()
+
+    @staticmethod
+    def _union_into(members, other):
+        if isinstance(members, set):
+            members |= other
+        else:
+            members.merge(other)
+
+    @classmethod
+    def from_transactions(cls, transactions, **options):
+        """Builds an aggregator from an iterable of transactions."""
+        return cls(**options).update(transactions)
+
+    def update(self, transactions):
+        """Adds every transaction from an iterable. Returns self."""
+        for t in transactions:
+            self.add(t)
+        return self
+
+    def add(self, t):
+        """Adds a single transaction to every running total."""
+        qty = t['Quantity']
+        rev = qty * t['UnitPrice']
+        date = t['Date']
+        name = t['ProductName']
+        c_id = t['CustomerID']
+
+        self.count += 1
+        self.total_revenue += rev
+
+        if self.min_date is None or date < self.min_date:
+            self.min_date = date
+        if self.max_date is None or date > self.max_date:
+            self.max_date = date
+
+        region = self.regions.get(t['Region'])
+        if region is None:
+            region = self.regions[t['Region']] = [0.0, 0]
+        region[0] += rev
+        region[1] += 1
+
+        if self.exact_details:
+            product = self.products.get(name)
+            if product is None:
+                product = self.products[name] = [0, 0.0]
+            product[0] += qty
+            product[1] += rev
+
+            customer = self.customers.get(c_id)
+            if customer is None:
+                customer = self.customers[c_id] = [0.0, 0, self._new_distinct()]
+            customer[0] += rev
+            customer[1] += 1
+            customer[2].add(name)
+
+        if self.product_sketch is not None:
+            self.product_sketch.update(name, qty, rev)
+            self.customer_sketch.update(c_id, rev, 1)
+
+        day = self.days.get(date)
+        if day is None:
+            day = self.days[date] = [0.0, 0, self._new_distinct()]
+        day[0] += rev
+        day[1] += 1
+        day[2].add(c_id)
+
+        if self.rolling is not None:
+            self.rolling.add(date, rev)
+
+    def merge(self, other):
+        """
+        Folds another aggregator's partial results into this one. Merging the
+        partials of consecutive chunks in file order gives the same groups, in
+        the same order, as one serial pass. Returns self.
+        """
+        self.count += other.count
+        self.total_revenue += other.total_revenue
+
+        if other.min_date is not None and (self.min_date is None or other.min_date < self.min_date):
+            self.min_date = other.min_date
+        if other.max_date is not None and (self.max_date is None or other.max_date > self.max_date):
+            self.max_date = other.max_date
+
+        for totals, other_totals in ((self.regions, other.regions), (self.products, other.products)):
+            for key, (a, b) in other_totals.items():
+                current = totals.get(key)
+                if current is None:
+                    totals[key] = [a, b]
+                else:
+                    current[0] += a
+                    current[1] += b
+
+        for totals, other_totals in ((self.customers, other.customers), (self.days, other.days)):
+            for key, (amount, count, members) in other_totals.items():
+                current = totals.get(key)
+                if current is None:
+                    totals[key] = [amount, count, self._copy_distinct(members)]
+                else:
+                    current[0] += amount
+                    current[1] += count
+                    self._union_into(current[2], members)
+
+        if self.product_sketch is not None and other.product_sketch is not None:
+            self.product_sketch.merge(other.product_sketch)
+            self.customer_sketch.merge(other.customer_sketch)
+
+        if self.rolling is not None:
+            self.rolling = self._rolling_from_days(self.rolling_windows)
+
+        return self
+
+    def to_state(self):
+        """Returns the running totals as a JSON-serialisable dict."""
+        return {
+            'approx_top_k': self.approx_top_k,
+            'exact_details': self.exact_details,
+            'distinct_precision': self.distinct_precision,
+            'rolling_windows': self.rolling_windows,
+            'product_sketch': self.product_sketch.to_state() if self.product_sketch else None,
+            'customer_sketch': self.customer_sketch.to_state() if self.customer_sketch else None,
+            'count': self.count,
+            'total_revenue': self.total_revenue,
+            'min_date': self.min_date,
+            'max_date': self.max_date,
+            'regions': self.regions,
+            'products': self.products,
+            'customers': {k: [a, c, self._distinct_state(m)] for k, (a, c, m) in self.customers.items()},
+            'days': {k: [a, c, self._distinct_state(m)] for k, (a, c, m) in self.days.items()}
+        }
+
+    @staticmethod
+    def _distinct_state(members):
+        return sorted(members) if isinstance(members, set) else members.to_state()
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuilds an aggregator from the output of to_state()."""
+        aggregate = cls(state.get('approx_top_k'), state.get('exact_details', True),
+                        state.get('distinct_precision'), state.get('rolling_windows'))
+        if aggregate.distinct_precision is None:
+            distinct = set
+        else:
+            distinct = HyperLogLog.from_state
+        if state.get('product_sketch'):
+            aggregate.product_sketch = SpaceSaving.from_state(state['product_sketch'])
+            aggregate.customer_sketch = SpaceSaving.from_state(state['customer_sketch'])
+        aggregate.count = state['count']
+        aggregate.total_revenue = state['total_revenue']
+        aggregate.min_date = state['min_date']
+        aggregate.max_date = state['max_date']
+        aggregate.regions = {k: list(v) for k, v in state['regions'].items()}
+        aggregate.products = {k: list(v) for k, v in state['products'].items()}
+        aggregate.customers = {k: [a, c, distinct(m)] for k, (a, c, m) in state['customers'].items()}
+        aggregate.days = {k: [a, c, distinct(m)] for k, (a, c, m) in state['days'].items()}
+        if aggregate.rolling is not None:
+            aggregate.rolling = aggregate._rolling_from_days(aggregate.rolling_windows)
+        return aggregate
+
+    # ------------------------------------------------------------------
+    # Views (same shapes as the data_processor functions)
+    # ------------------------------------------------------------------
+
+    def region_wise_sales(self):
+        """Sales by region, sorted by total_sales descending."""
+        regions = {}
+        for reg, (total_sales, count) in self.regions.items():
+            regions[reg] = {
+                'total_sales': total_sales,
+                'transaction_count': count,
+                'percentage': round((total_sales / self.total_revenue) * 100, 2)
+            }
+        return dict(sorted(regions.items(), key=lambda x: x[1]['total_sales'], reverse=True))
+
+    def _require_details(self):
+        if not self.exact_details:
+            raise ValueError(
+                "This aggregator was built with exact_details=False; "
+                "use approx_top_products() / approx_top_customers() instead"
+            )
+
+    def top_selling_products(self, n=5):
+        """Top n products by total quantity sold as (name, qty, rev)."""
+        self._require_details()
+        product_list = [(name, qty, rev) for name, (qty, rev) in self.products.items()]
+        return top_n(product_list, n, key=lambda x: x[1])
+
+    def customer_analysis(self, n=None):
+        """
+        Customer spending and unique products, sorted by total_spent.
+        With n, only the top n customers are selected (heap, no full sort).
+        """
+        self._require_details()
+        ranked = top_n(self.customers.items(), n, key=lambda x: round(x[1][0], 2))
+        result = {}
+        for c_id, (total_spent, count, products) in ranked:
+            result[c_id] = {
+                'total_spent': round(total_spent, 2),
+                'purchase_count': count,
+                'avg_order_value': round(total_spent / count, 2)
+            }
+            if isinstance(products, set):
+                result[c_id]['products_bought'] = sorted(products)
+            else:
+                result[c_id]['distinct_products'] = len(products)
+        return result
+
+    def approx_top_products(self, n=5):
+        """
+        Approximate top n products by quantity from the sketch, as
+        (name, qty_estimate, max_error, revenue_while_tracked).
+        """
+        if self.product_sketch is None:
+            raise ValueError("approx_top_k was not set for this aggregator")
+        return self.product_sketch.top(n)
+
+    def approx_top_customers(self, n=5):
+        """
+        Approximate top n customers by spend from the sketch, as
+        (customer_id, spend_estimate, max_error, purchases_while_tracked).
+        """
+        if self.customer_sketch is None:
+            raise ValueError("approx_top_k was not set for this aggregator")
+        return self.customer_sketch.top(n)
+
+    def daily_sales_trend(self):
+        """Revenue, transaction count and unique customers per date."""
+        result = {}
+        for date in sorted(self.days):
+            revenue, count, customers = self.days[date]
+            result[date] = {
+                'revenue': round(revenue, 2),
+                'transaction_count': count,
+                'unique_customers': len(customers)
+            }
+        return result
+
+    def unique_customers_by_period(self, period='week'):
+        """
+        Unique customers per 'day', 'week' (ISO, e.g. 2024-W49) or 'month'
+        (YYYY-MM), derived by merging the per-day sets or sketches, so no
+        rescan is needed. Estimates when distinct_precision is set.
+        """
+        buckets = {}
+        for date in sorted(self.days):
+            key = period_key(date, period)
+            members = buckets.get(key)
+            if members is None:
+                buckets[key] = self._copy_distinct(self.days[date][2])
+            else:
+                self._union_into(members, self.days[date][2])
+        return {key: len(members) for key, members in buckets.items()}
+
+    def _rolling_from_days(self, windows):
+        days = ((date, revenue, count) for date, (revenue, count, _) in self.days.items())
+        return RollingMetrics.from_days(days, windows)
+
+    def rolling_metrics(self, windows=DEFAULT_WINDOWS):
+        """
+        RollingMetrics (7/30-day windows, week-over-week growth, peak) as of
+        the latest date. The incrementally kept one is returned when it has
+        the requested windows; otherwise it is built from the per-day totals.
+        """
+        if self.rolling is not None and self.rolling.windows == tuple(sorted(set(windows))):
+            return self.rolling
+        return self._rolling_from_days(windows)
+
+    def find_peak_sales_day(self):
+        """(date, revenue, count) for the highest revenue day, or None."""
+        return peak_sales_day(self.daily_sales_trend())
+
+    def low_performing_products(self, threshold=10):
+        """Products with total quantity < threshold, sorted by quantity."""
+        self._require_details()
+        low_perf = [(name, qty, rev) for name, (qty, rev) in self.products.items() if qty < threshold]
+        return sorted(low_perf, key=lambda x: x[1])
@@ -2,25 +2,111 @@
 utils/api_handler.py
 Handles fetching external product data from DummyJSON API and enriching local sales data.
 """
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
+
+API_URL = "https://dummyjson.com/products"
+
+class IncompleteCatalogError(RuntimeError):
+    """Raised by fetch_all_products(strict=True) when some pages failed; .products has the rest."""
+
+    def __init__(self, products, failed_pages, total):
+        super().__init__(f"{failed_pages} page(s) could not be fetched; got {len(products)} of {total} products")
+        self.products = products
+        self.failed_pages = failed_pages
+        self.total = total
+
+def _make_session(pool_size):
+    """Creates a session whose connection pool can serve pool_size threads."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def _fetch_page(session, url, skip, limit, timeout, retries, backoff, latencies=None):
+    """
+    Fetches one page of products, retrying timeouts, connection errors,
+    429 and 5xx responses with exponential backoff.
+    Returns the decoded JSON page or raises RuntimeError.
+    """
+    error = None
+    for attempt in range(retries + 1):
+        started = time.perf_counter()
+        try:
+            response = session.get(url, params={'limit': limit, 'skip': skip}, timeout=timeout)
+            if latencies is not None:
+                latencies.append((time.perf_counter() - started, response.status_code))
+            if response.status_code == 200:
+                return response.json()
+            error = f"status code {response.status_code}"
+            if response.status_code < 500 and response.status_code != 429:
+                break
+        except (requests.RequestException, ValueError) as e:
+            if latencies is not None:
+                latencies.append((time.perf_counter() - started, type(e).__name__))
+            error = e
 
-def fetch_all_products():
-    """Fetches all products from DummyJSON API using limit=100."""
-    url = "https://dummyjson.com/products?limit=100"
+        if attempt < retries:
+            time.sleep(backoff * (2 ** attempt))
+
+    raise RuntimeError(f"page skip={skip} failed: {error}")
+
+def fetch_all_products(url=API_URL, page_size=100, max_workers=4, timeout=10, retries=3, backoff=0.5,
+                       latencies=None, strict=False):
+    """
+    Fetches the full product catalog from DummyJSON.
+    The first page gives the catalog 'total'; the remaining pages are then
+    requested concurrently (at most max_workers at a time) over one pooled
+    session, each with its own timeout and retries. Pages that still fail
+    are reported and skipped, or raise IncompleteCatalogError with
+    strict=True. If a latencies list is given, every HTTP attempt appends
+    (seconds, status code or exception name) to it.
+    """
+    print("Connecting to DummyJSON API...")
+    session = _make_session(max_workers)
     try:
-        print("Connecting to DummyJSON API...")
-        response = requests.get(url, timeout=10)
-        
-        if response.status_code == 200:
-            print("Successfully fetched products from API.")
-            data = response.json()
-            return data.get('products', [])
-        else:
-            print(f"API Error: Received status code {response.status_code}")
+        try:
+            first = _fetch_page(session, url, 0, page_size, timeout, retries, backoff, latencies)
+        except RuntimeError as e:
+            print(f"Connection Failed: {e}")
             return []
-    except Exception as e:
-        print(f"Connection Failed: {e}")
-        return []
+
+        products = list(first.get('products', []))
+        total = first.get('total', len(products))
+        # The API may cap the page size below what was asked for
+        step = first.get('limit') or len(products) or page_size
+        skips = range(len(products), total, step)
+
+        failed = 0
+        if skips:
+            def fetch(skip):
+                try:
+                    return _fetch_page(session, url, skip, step, timeout, retries, backoff, latencies)
+                except RuntimeError as e:
+                    print(f"API Error: {e}")
+                    return None
+
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                for page in pool.map(fetch, skips):
+                    if page is None:
+                        failed += 1
+                    else:
+                        products.extend(page.get('products', []))
+
+        if failed:
+            print(f"Warning: {failed} page(s) could not be fetched; catalog is incomplete.")
+            if strict:
+                raise IncompleteCatalogError(products, failed, total)
+        print(f"Successfully fetched {len(products)} of {total} products from API.")
+        return products
+    finally:
+        session.close()
 
 def create_product_mapping(api_products):
     """Creates a dictionary mapping numeric IDs to product info for fast lookup."""
@@ -35,58 +121,223 @@ def create_product_mapping(api_products):
         }
     return mapping
 
+ENRICHED_HEADERS = [
+    'TransactionID', 'Date', 'ProductID', 'ProductName', 'Quantity', 
+    'UnitPrice', 'CustomerID', 'Region', 'API_Category', 'API_Brand', 
+    'API_Rating', 'API_Match'
+]
+
+BASE_HEADERS = ENRICHED_HEADERS[:8]
+
+ENRICHED_FILE = 'data/enriched_sales_data.txt'
+
+# Output buffer and number of rows joined per write() call
+WRITE_BUFFER_SIZE = 1024 * 1024
+WRITE_BATCH_ROWS = 2000
+
+def _product_enrichment(raw_id, product_mapping):
+    """API fields for one ProductID using numeric matching ('P101' -> 101)."""
+    # We remove the 'P' and convert the rest to an integer
+    try:
+        numeric_id = int(raw_id.replace('P', ''))
+    except (ValueError, AttributeError):
+        numeric_id = -1
+
+    # Check if this numeric_id exists in our API mapping
+    if numeric_id in product_mapping:
+        info = product_mapping[numeric_id]
+        return {
+            'API_Category': info['category'],
+            'API_Brand': info['brand'],
+            'API_Rating': info['rating'],
+            'API_Match': True
+        }
+    return {
+        'API_Category': None,
+        'API_Brand': None,
+        'API_Rating': None,
+        'API_Match': False
+    }
+
+def iter_enriched(transactions, product_mapping):
+    """
+    Streaming join of transactions with the product mapping.
+    The enrichment for each ProductID is computed once and reused; every
+    row is yielded as a new dict, so the input transactions are unchanged.
+    """
+    by_product = {}
+    for t in transactions:
+        raw_id = t['ProductID']
+        extra = by_product.get(raw_id)
+        if extra is None:
+            extra = by_product[raw_id] = _product_enrichment(raw_id, product_mapping)
+        row = dict(t)
+        row.update(extra)
+        yield row
+
 def enrich_sales_data(transactions, product_mapping):
     """Enriches transaction data with API info using numeric ProductID matching."""
-    enriched_list = []
-    
-    for t in transactions:
-        # 1. Extract numeric ID from ProductID (e.g., 'P101' -> 101)
-        # We remove the 'P' and convert the rest to an integer
-        try:
-            raw_id = t['ProductID']
-            numeric_id = int(raw_id.replace('P', ''))
-        except (ValueError, AttributeError):
-            numeric_id = -1
-        
-        # 2. Check if this numeric_id exists in our API mapping
-        if numeric_id in product_mapping:
-            info = product_mapping[numeric_id]
-            t['API_Category'] = info['category']
-            t['API_Brand'] = info['brand']
-            t['API_Rating'] = info['rating']
-            t['API_Match'] = True
+    return list(iter_enriched(transactions, product_mapping))
+
+def _write_rows(lines, filename):
+    """
+    Writes an iterator of ready-made lines through a large buffer, joining
+    WRITE_BATCH_ROWS lines per write. Returns the number of lines, or 0
+    (without creating the file) when there are none.
+    """
+    first = next(lines, None)
+    if first is None:
+        return 0
+
+    count = 0
+    with open(filename, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as f:
+        f.write("|".join(ENRICHED_HEADERS) + "\n")
+        batch = [first]
+        for line in lines:
+            batch.append(line)
+            if len(batch) >= WRITE_BATCH_ROWS:
+                f.write("".join(batch))
+                count += len(batch)
+                batch = []
+        f.write("".join(batch))
+        count += len(batch)
+    return count
+
+def save_enriched_data(enriched_transactions, filename=ENRICHED_FILE):
+    """Saves enriched transactions (any iterable) to a pipe-delimited file."""
+    lines = ("|".join([str(t.get(h, '')) for h in ENRICHED_HEADERS]) + "\n"
+             for t in enriched_transactions)
+    try:
+        if _write_rows(lines, filename):
+            print(f"Enriched data successfully saved to {filename}")
         else:
-            t['API_Category'] = None
-            t['API_Brand'] = None
-            t['API_Rating'] = None
-            t['API_Match'] = False
-            
-        enriched_list.append(t)
-        
-    return enriched_list
-
-def save_enriched_data(enriched_transactions, filename='data/enriched_sales_data.txt'):
-    """Saves enriched transactions to a pipe-delimited file."""
-    if not enriched_transactions:
-        print("No enriched data to save.")
-        return
-
-    # Define headers
-    headers = [
-        'TransactionID', 'Date', 'ProductID', 'ProductName', 'Quantity', 
-        'UnitPrice', 'CustomerID', 'Region', 'API_Category', 'API_Brand', 
-        'API_Rating', 'API_Match'
-    ]
+            print("No enriched data to save.")
+    except Exception as e:
+        print(f"Error saving enriched data: {e}")
+
+class EnrichedWriter:
+    """
+    Streaming enrichment sink. add() enriches one row and writes it to
+    `filename` through a large buffer, WRITE_BATCH_ROWS lines per write;
+    the API part of each line is formatted once per ProductID. The file is
+    only created once there is a row to write, with a header unless
+    header=False (part files that are appended to another writer later);
+    append=True adds to an existing file. filename=None only counts.
+
+    .summary is the report summary {'rows', 'matched', 'failed_products',
+    'sample'} where sample is the first enriched row.
+    """
+
+    def __init__(self, product_mapping, filename=ENRICHED_FILE, header=True, append=False):
+        self.product_mapping = product_mapping
+        self.filename = filename
+        self.header = header
+        self.append = append
+        self.summary = {'rows': 0, 'matched': 0, 'failed_products': [], 'sample': None}
+        self.written = 0
+        self._suffixes = {}
+        self._batch = []
+        self._file = None
+
+    def add(self, t):
+        raw_id = t['ProductID']
+        entry = self._suffixes.get(raw_id)
+        if entry is None:
+            extra = _product_enrichment(raw_id, self.product_mapping)
+            suffix = "|" + "|".join([str(extra[h]) for h in ENRICHED_HEADERS[8:]]) + "\n"
+            entry = self._suffixes[raw_id] = (suffix, extra)
+            if not extra['API_Match']:
+                self.summary['failed_products'].append(raw_id)
+
+        summary = self.summary
+        summary['rows'] += 1
+        if entry[1]['API_Match']:
+            summary['matched'] += 1
+        if summary['sample'] is None:
+            summary['sample'] = dict(t, **entry[1])
 
+        if self.filename is not None:
+            self._batch.append("|".join([str(t[h]) for h in BASE_HEADERS]) + entry[0])
+            if len(self._batch) >= WRITE_BATCH_ROWS:
+                self.flush()
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.filename, 'a' if self.append else 'w',
+                              encoding='utf-8', buffering=WRITE_BUFFER_SIZE)
+            if self.header and self._file.tell() == 0:
+                self._file.write("|".join(ENRICHED_HEADERS) + "\n")
+        return self._file
+
+    def flush(self):
+        """Writes the queued lines."""
+        if self._batch:
+            self._open().write("".join(self._batch))
+            self.written += len(self._batch)
+            self._batch = []
+
+    def append_part(self, part_file, part_summary):
+        """
+        Appends a headerless part file written by another EnrichedWriter
+        (e.g. in a worker process) and deletes it; part_summary is that
+        writer's summary, merged in order.
+        """
+        if part_file is not None and os.path.exists(part_file):
+            self.flush()
+            with open(part_file, 'r', encoding='utf-8') as part:
+                shutil.copyfileobj(part, self._open(), WRITE_BUFFER_SIZE)
+            os.remove(part_file)
+            self.written += part_summary['rows']
+        merge_enrichment(self.summary, part_summary)
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def finish(self):
+        """Closes the file, reports what was saved and returns the summary."""
+        try:
+            self.close()
+            if self.written:
+                print(f"Enriched data successfully saved to {self.filename}")
+            else:
+                print("No enriched data to save.")
+        except Exception as e:
+            print(f"Error saving enriched data: {e}")
+        return self.summary
+
+
+def merge_enrichment(summary, other):
+    """Folds the enrichment summary of a later chunk into summary (in place)."""
+    summary['rows'] += other['rows']
+    summary['matched'] += other['matched']
+    failed = set(summary['failed_products'])
+    summary['failed_products'].extend(p for p in other['failed_products'] if p not in failed)
+    if summary['sample'] is None:
+        summary['sample'] = other['sample']
+    return summary
+
+
+def enrich_and_save(transactions, product_mapping, filename=ENRICHED_FILE):
+    """
+    Enriches and saves transactions in one streaming pass without building
+    enriched rows (see EnrichedWriter).
+    Returns a summary for the report: {'rows', 'matched', 'failed_products',
+    'sample'} where sample is the first enriched row.
+    """
+    writer = EnrichedWriter(product_mapping, filename)
     try:
-        with open(filename, 'w', encoding='utf-8') as f:
-            # Write header
-            f.write("|".join(headers) + "\n")
-            
-            # Write data rows
-            for t in enriched_transactions:
-                row = [str(t.get(h, '')) for h in headers]
-                f.write("|".join(row) + "\n")
-        print(f"Enriched data successfully saved to {filename}")
+        for t in transactions:
+            writer.add(t)
     except Exception as e:
-        print(f"Error saving enriched data: {e}")
\ No newline at end of file
+        print(f"Error saving enriched data: {e}")
+        try:
+            writer.close()
+        except OSError:
+            pass
+        return writer.summary
+    return writer.finish()
@@ -0,0 +1,108 @@
+"""
+utils/catalog_cache.py
+On-disk cache of the product catalog used for enrichment.
+
+Fresh entries (younger than the TTL) are served straight from disk. Stale
+entries are served immediately while a background thread refreshes them
+(stale-while-revalidate), and stay in use if the API cannot be reached. Only
+an empty cache waits on the network.
+
+Only a complete catalog is stored. The fetcher signals a partial one by
+raising IncompleteCatalogError (fetch_all_products(strict=True) does): the
+partial list is still returned on a cold miss, but it is never saved and a
+refresh keeps the previous catalog. A background refresh is a daemon
+thread, so a short run does not wait for it at exit; if the process ends
+first, the next run simply refreshes again.
+"""
+import functools
+import json
+import threading
+import time
+
+from utils.api_handler import fetch_all_products, IncompleteCatalogError
+from utils.file_handler import save_json
+
+DEFAULT_CATALOG_CACHE = 'data/.sales_cache/product_catalog.json'
+DEFAULT_TTL = 3600
+
+
+class CatalogCache:
+    """Product catalog with a TTL, background refresh and hit/miss counters."""
+
+    def __init__(self, path=DEFAULT_CATALOG_CACHE, ttl=DEFAULT_TTL,
+                 fetcher=functools.partial(fetch_all_products, strict=True)):
+        self.path = path
+        self.ttl = ttl
+        self.fetcher = fetcher
+        self.stats = {'hits': 0, 'misses': 0, 'stale_hits': 0, 'refreshes': 0, 'refresh_failures': 0,
+                      'incomplete_fetches': 0}
+        self._lock = threading.Lock()
+        self._refresh_thread = None
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            return entry if isinstance(entry.get('products'), list) else None
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, AttributeError) as e:
+            print(f"Ignoring unreadable catalog cache {self.path}: {e}")
+            return None
+
+    def _save(self, products):
+        save_json(self.path, {'fetched_at': time.time(), 'products': products})
+
+    def _fetch_and_store(self):
+        """
+        Fetches the catalog and stores it if complete. Returns the products
+        (possibly partial) or [].
+        """
+        try:
+            products = self.fetcher()
+        except IncompleteCatalogError as e:
+            with self._lock:
+                self.stats['incomplete_fetches'] += 1
+                self.stats['refresh_failures'] += 1
+            print(f"Not caching the product catalog: {e}")
+            return e.products
+        with self._lock:
+            if products:
+                self._save(products)
+                self.stats['refreshes'] += 1
+            else:
+                self.stats['refresh_failures'] += 1
+        return products
+
+    def _start_refresh(self):
+        with self._lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            self._refresh_thread = threading.Thread(target=self._fetch_and_store, daemon=True)
+            self._refresh_thread.start()
+
+    def get_products(self):
+        """
+        Returns the product list: from disk when cached (refreshing in the
+        background once stale), otherwise from the API.
+        """
+        entry = self._load()
+
+        if entry is None:
+            self.stats['misses'] += 1
+            return self._fetch_and_store()
+
+        age = time.time() - entry.get('fetched_at', 0)
+        if age <= self.ttl:
+            self.stats['hits'] += 1
+        else:
+            self.stats['stale_hits'] += 1
+            print(f"Product catalog is {age:.0f}s old; refreshing in the background.")
+            self._start_refresh()
+        return entry['products']
+
+    def wait(self, timeout=None):
+        """Waits for a running background refresh to finish."""
+        thread = self._refresh_thread
+        if thread is not None:
+            thread.join(timeout)
@@ -0,0 +1,268 @@
+"""
+utils/checkpoint.py
+Incremental processing for append-only sales files.
+
+A checkpoint records how far into the source file the last run got (byte
+offset of the last complete line), a fingerprint of the bytes already
+processed and the serialised aggregate state. On the next run only the newly
+appended lines are read, parsed, validated and folded in. If the file was
+truncated, replaced or rewritten the fingerprint no longer matches and the
+aggregate is rebuilt from scratch (see fingerprint() for what is detected).
+A last line without a newline is left for a later run until the file has
+not changed for `tail_settle` seconds (as in watch mode), so a line that is
+still being written is never read half-finished, while a file that simply
+ends without a newline is still read in full. A SalesCube is kept in the
+checkpoint the same way once one has been asked for; asking for one that
+the checkpoint does not hold yet rebuilds from scratch.
+
+Enrichment works on the delta too: the checkpoint records the enriched
+file's size, a fingerprint of the product catalog and the enrichment
+summary, and only the new rows are enriched and appended. If the catalog
+changed, the enriched file was touched or the last run did not enrich,
+everything is rebuilt once.
+"""
+import hashlib
+import json
+import os
+import time
+
+from utils.aggregator import SalesAggregator
+from utils.cube import SalesCube
+from utils.file_handler import iter_sales_data, iter_ingest, save_json, INGEST_SUMMARY_KEYS
+
+CHECKPOINT_VERSION = 2
+FINGERPRINT_BLOCK = 4096
+# Processed prefixes up to this size are hashed in full
+FULL_HASH_LIMIT = 8 * 1024 * 1024
+# Seconds a file must be unchanged before a last line without a newline is read
+DEFAULT_TAIL_SETTLE = 10.0
+
+
+def _hash_range(file, start, end):
+    file.seek(start)
+    digest = hashlib.blake2b(digest_size=16)
+    remaining = end - start
+    while remaining > 0:
+        block = file.read(min(remaining, 1024 * 1024))
+        if not block:
+            break
+        digest.update(block)
+        remaining -= len(block)
+    return digest.hexdigest()
+
+
+def fingerprint(filename, offset):
+    """
+    Fingerprint of the first `offset` bytes of a file: the file's inode and
+    a hash of the whole prefix when it is at most FULL_HASH_LIMIT bytes.
+    Longer prefixes only hash their first and last FINGERPRINT_BLOCK bytes,
+    so there a same-length in-place edit between those blocks is NOT
+    detected; replacing the file (a new inode), truncating it or editing
+    either end is.
+    """
+    with open(filename, 'rb') as file:
+        if offset <= FULL_HASH_LIMIT:
+            prefix = {'prefix': _hash_range(file, 0, offset)}
+        else:
+            prefix = {'head': _hash_range(file, 0, FINGERPRINT_BLOCK),
+                      'tail': _hash_range(file, offset - FINGERPRINT_BLOCK, offset)}
+        return dict(prefix, inode=os.fstat(file.fileno()).st_ino)
+
+
+def complete_lines_end(filename):
+    """Byte offset just past the last newline, so half-written lines wait."""
+    size = os.path.getsize(filename)
+    with open(filename, 'rb') as file:
+        position = size
+        while position > 0:
+            start = max(0, position - FINGERPRINT_BLOCK)
+            file.seek(start)
+            block = file.read(position - start)
+            newline = block.rfind(b'\n')
+            if newline != -1:
+                return start + newline + 1
+            position = start
+    return 0
+
+
+def settled_end(filename, tail_settle=DEFAULT_TAIL_SETTLE, stat=None):
+    """
+    Byte offset that can be processed: the end of the last complete line,
+    or the end of the file once a last line without a newline has not
+    changed for tail_settle seconds. stat: os.stat result, if already known.
+    """
+    stat = stat or os.stat(filename)
+    end = complete_lines_end(filename)
+    if stat.st_size > end and time.time() - stat.st_mtime >= tail_settle:
+        end = stat.st_size
+    return end
+
+
+def load_checkpoint(checkpoint_file):
+    """Returns the saved checkpoint dict, or None if missing/unreadable."""
+    try:
+        with open(checkpoint_file, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable checkpoint {checkpoint_file}: {e}")
+        return None
+
+    if checkpoint.get('version') != CHECKPOINT_VERSION:
+        return None
+    return checkpoint
+
+
+def save_checkpoint(checkpoint_file, checkpoint):
+    """Writes the checkpoint atomically (temp file + rename)."""
+    save_json(checkpoint_file, checkpoint)
+
+
+def catalog_fingerprint(product_mapping):
+    """Digest of a product mapping, to tell whether enriched rows are still current."""
+    data = json.dumps(product_mapping, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _enrichment_resumable(state, enricher):
+    """True if the checkpointed enriched file can be appended to by enricher."""
+    if state is None or enricher.filename is None:
+        return False
+    path = os.path.abspath(enricher.filename)
+    return (state['file'] == path and os.path.exists(path) and
+            os.path.getsize(path) == state['size'] and
+            state['catalog'] == catalog_fingerprint(enricher.product_mapping))
+
+
+def _is_resumable(checkpoint, filename, filters):
+    """True if the checkpoint describes a prefix of the current file."""
+    if checkpoint is None:
+        return False
+    if checkpoint['source'] != os.path.abspath(filename) or checkpoint['filters'] != filters:
+        return False
+    if os.path.getsize(filename) < checkpoint['offset']:
+        return False
+    return fingerprint(filename, checkpoint['offset']) == checkpoint['fingerprint']
+
+
+def incremental_aggregate(filename, checkpoint_file='output/checkpoint.json',
+                          region=None, min_amount=None, max_amount=None,
+                          aggregator_options=None, cube=None, enricher=None,
+                          tail_settle=DEFAULT_TAIL_SETTLE):
+    """
+    Brings the aggregate for `filename` up to date using the checkpoint.
+    aggregator_options are passed to SalesAggregator; a checkpoint saved
+    with different options is rebuilt. If an (empty) SalesCube is given it
+    is filled with the checkpointed cube plus the new rows. If an
+    api_handler.EnrichedWriter is given, the new rows are appended to its
+    file and its summary covers every row; it is closed on return.
+    tail_settle: see settled_end().
+    Returns (SalesAggregator, summary, mode) where mode is 'full',
+    'incremental' or 'unchanged'.
+    """
+    aggregator_options = aggregator_options or {}
+    if not os.path.exists(filename):
+        print(f"Error: File '{filename}' not found.")
+        return SalesAggregator(**aggregator_options), dict.fromkeys(INGEST_SUMMARY_KEYS, 0), 'full'
+
+    filters = {'region': region, 'min_amount': min_amount, 'max_amount': max_amount}
+    checkpoint = load_checkpoint(checkpoint_file)
+
+    resumable = _is_resumable(checkpoint, filename, filters) and \
+        checkpoint.get('options', {}) == aggregator_options
+    if resumable and cube is not None and checkpoint.get('cube') is None:
+        print("Checkpoint has no sales cube yet; rebuilding from scratch.")
+        resumable = False
+    elif resumable and enricher is not None and \
+            not _enrichment_resumable(checkpoint.get('enrichment'), enricher):
+        print("Enriched file or product catalog changed since the checkpoint; rebuilding from scratch.")
+        resumable = False
+    elif not resumable and checkpoint is not None:
+        print("Checkpoint does not match the source file; rebuilding from scratch.")
+
+    if resumable:
+        aggregate = SalesAggregator.from_state(checkpoint['aggregate'])
+        summary = checkpoint['summary']
+        start = checkpoint['offset']
+        mode = 'incremental'
+        if checkpoint.get('cube') is not None:
+            # Once the checkpoint holds a cube it is kept up to date every run
+            cube = cube if cube is not None else SalesCube()
+            cube.merge(SalesCube.from_state(checkpoint['cube']))
+        if enricher is not None:
+            # New rows go after the ones already in the enriched file
+            enriched = checkpoint['enrichment']['summary']
+            enricher.append = True
+            enricher.written = enriched['rows']
+    else:
+        aggregate = SalesAggregator(**aggregator_options)
+        summary = dict.fromkeys(INGEST_SUMMARY_KEYS, 0)
+        start = 0
+        mode = 'full'
+        enriched = None
+
+    end = settled_end(filename, tail_settle)
+    if end <= start and mode == 'incremental':
+        print("No new data since the last checkpoint.")
+        mode = 'unchanged'
+    else:
+        print(f"Processing bytes {start} to {end} ({mode} run)...")
+        _fold_range(aggregate, summary, filename, start, end, filters, cube, enricher)
+        enrichment = None
+        if enricher is not None:
+            enricher.close()
+            path = os.path.abspath(enricher.filename)
+            enrichment = {
+                'file': path,
+                'size': os.path.getsize(path) if os.path.exists(path) else 0,
+                'catalog': catalog_fingerprint(enricher.product_mapping),
+                'summary': _merged_enrichment(enriched, enricher.summary)
+            }
+        save_checkpoint(checkpoint_file, {
+            'version': CHECKPOINT_VERSION,
+            'source': os.path.abspath(filename),
+            'filters': filters,
+            'options': aggregator_options,
+            'offset': end,
+            'fingerprint': fingerprint(filename, end),
+            'summary': summary,
+            'aggregate': aggregate.to_state(),
+            'cube': cube.to_state() if cube is not None else None,
+            'enrichment': enrichment
+        })
+
+    if os.path.getsize(filename) > max(start, end):
+        print("The last line has no newline yet; it is read once the file settles.")
+
+    if enricher is not None:
+        enricher.close()
+        enricher.summary = _merged_enrichment(enriched, enricher.summary)
+    return aggregate, summary, mode
+
+
+def _merged_enrichment(earlier, later):
+    """A new enrichment summary covering earlier (may be None) then later."""
+    from utils.api_handler import merge_enrichment
+    if earlier is None:
+        return later
+    return merge_enrichment(dict(earlier, failed_products=list(earlier['failed_products'])), later)
+
+
+def _fold_range(aggregate, summary, filename, start, end, filters, cube=None, enricher=None):
+    """
+    Streams a byte range into the aggregate (and cube / enricher, if given)
+    and adds to the summary counters.
+    """
+    delta_summary = {}
+    rows = iter_ingest(iter_sales_data(filename, start, end), summary=delta_summary, **filters)
+    sinks = [sink.add for sink in (cube, enricher) if sink is not None]
+    if not sinks:
+        aggregate.update(rows)
+    else:
+        for t in rows:
+            aggregate.add(t)
+            for add in sinks:
+                add(t)
+    for key, value in delta_summary.items():
+        summary[key] = summary.get(key, 0) + value
@@ -0,0 +1,289 @@
+"""
+utils/cube.py
+Pre-aggregated (Date, Region, ProductID) rollup cube for drill-down queries.
+
+The cube is built in one pass over the valid transactions. Each cell holds
+quantity, revenue and transaction count, and a side table keeps the
+customers seen per (Date, Region) so unique customers can still be counted.
+Slicing by date range, region set and product set and rolling up to day,
+week or month then touch only the cells, never the raw rows:
+
+    cube = SalesCube.from_transactions(valid_transactions)
+    north = cube.where(start='2024-12-01', end='2024-12-15', regions={'North'})
+    north.rollup(by=('date', 'product'), period='week')
+    north.top_selling_products(5)
+
+The same ProductID is sold under slightly different names in the source data
+(e.g. 'Mouse' / 'MouseWireless'), and the existing reports group by name, so
+the name is kept as an attribute of each cell; a cell key is
+(Date, Region, ProductID, ProductName).
+"""
+import argparse
+import json
+
+from utils.aggregator import PERIODS, peak_sales_day, period_key
+from utils.file_handler import save_json
+from utils.sketches import top_n
+
+DIMENSIONS = ('date', 'region', 'product', 'product_name')
+
+
+class SalesCube:
+    """
+    Cells of (date, region, product_id, product_name) -> [qty, revenue, count]
+    in first-appearance order, plus (date, region) -> set of customer ids.
+
+    Views have the same shapes as the data_processor functions. Revenue is
+    summed per cell first, so unrounded totals can differ from a row-by-row
+    pass in the last few bits; rounded values are unaffected.
+    """
+
+    def __init__(self):
+        self.cells = {}
+        self.customers = {}
+
+    @classmethod
+    def from_transactions(cls, transactions):
+        """Builds a cube from an iterable of valid transactions."""
+        return cls().update(transactions)
+
+    def update(self, transactions):
+        """Adds every transaction from an iterable. Returns self."""
+        for t in transactions:
+            self.add(t)
+        return self
+
+    def add(self, t):
+        """Adds a single transaction to its cell."""
+        qty = t['Quantity']
+        key = (t['Date'], t['Region'], t['ProductID'], t['ProductName'])
+
+        cell = self.cells.get(key)
+        if cell is None:
+            cell = self.cells[key] = [0, 0.0, 0]
+        cell[0] += qty
+        cell[1] += qty * t['UnitPrice']
+        cell[2] += 1
+
+        members = self.customers.get(key[:2])
+        if members is None:
+            members = self.customers[key[:2]] = set()
+        members.add(t['CustomerID'])
+
+    def merge(self, other):
+        """Folds another cube (e.g. of a later chunk) into this one. Returns self."""
+        for key, (qty, rev, count) in other.cells.items():
+            cell = self.cells.get(key)
+            if cell is None:
+                self.cells[key] = [qty, rev, count]
+            else:
+                cell[0] += qty
+                cell[1] += rev
+                cell[2] += count
+        if self.customers is None or other.customers is None:
+            self.customers = None
+        else:
+            for key, members in other.customers.items():
+                self.customers.setdefault(key, set()).update(members)
+        return self
+
+    def __len__(self):
+        return len(self.cells)
+
+    # ------------------------------------------------------------------
+    # Slicing and rollup
+    # ------------------------------------------------------------------
+
+    def where(self, start=None, end=None, regions=None, products=None):
+        """
+        Sub-cube of the cells with start <= Date <= end (YYYY-MM-DD, either
+        bound optional) whose Region is in `regions` and ProductID is in
+        `products` (None means no restriction).
+        """
+        regions = set(regions) if regions is not None else None
+        products = set(products) if products is not None else None
+
+        def keep(date, region):
+            return ((start is None or date >= start) and (end is None or date <= end) and
+                    (regions is None or region in regions))
+
+        cube = SalesCube()
+        for key, cell in self.cells.items():
+            if keep(key[0], key[1]) and (products is None or key[2] in products):
+                cube.cells[key] = list(cell)
+        if products is None:
+            cube.customers = {key: set(m) for key, m in self.customers.items() if keep(*key)}
+        else:
+            # Customers are only tracked per (date, region), not per product
+            cube.customers = None
+        return cube
+
+    def rollup(self, by=('date',), period='day'):
+        """
+        Totals grouped by the `by` dimensions ('date', 'region', 'product',
+        'product_name'), with dates bucketed by `period` ('day', 'week' or
+        'month'). Returns {key: {'quantity', 'revenue', 'transaction_count'}}
+        in first-appearance order; the key is a tuple when grouping by more
+        than one dimension, and None when `by` is empty.
+        """
+        if isinstance(by, str):
+            by = (by,)
+        unknown = [d for d in by if d not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Unknown dimension(s) {unknown} (expected {', '.join(DIMENSIONS)})")
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period '{period}' (expected one of {', '.join(PERIODS)})")
+
+        positions = [DIMENSIONS.index(d) for d in by]
+        buckets = {}
+        groups = {}
+        for key, (qty, rev, count) in self.cells.items():
+            if period != 'day' and 0 in positions:
+                bucket = buckets.get(key[0])
+                if bucket is None:
+                    bucket = buckets[key[0]] = period_key(key[0], period)
+                key = (bucket,) + key[1:]
+            if not positions:
+                group_key = None
+            elif len(positions) == 1:
+                group_key = key[positions[0]]
+            else:
+                group_key = tuple(key[p] for p in positions)
+
+            group = groups.get(group_key)
+            if group is None:
+                group = groups[group_key] = [0, 0.0, 0]
+            group[0] += qty
+            group[1] += rev
+            group[2] += count
+
+        return {
+            k: {'quantity': qty, 'revenue': rev, 'transaction_count': count}
+            for k, (qty, rev, count) in groups.items()
+        }
+
+    def unique_customers(self, period='day'):
+        """Unique customers per 'day', 'week' or 'month' in this cube."""
+        if self.customers is None:
+            raise ValueError("Unique customers are not available for a product slice")
+        buckets = {}
+        for (date, _), members in self.customers.items():
+            buckets.setdefault(period_key(date, period), set()).update(members)
+        return {key: len(buckets[key]) for key in sorted(buckets)}
+
+    # ------------------------------------------------------------------
+    # Views (same shapes as the data_processor functions)
+    # ------------------------------------------------------------------
+
+    @property
+    def count(self):
+        return sum(cell[2] for cell in self.cells.values())
+
+    @property
+    def total_revenue(self):
+        return sum(cell[1] for cell in self.cells.values())
+
+    def region_wise_sales(self):
+        """Sales by region, sorted by total_sales descending."""
+        total = self.total_revenue
+        regions = {}
+        for reg, group in self.rollup(by=('region',)).items():
+            regions[reg] = {
+                'total_sales': group['revenue'],
+                'transaction_count': group['transaction_count'],
+                'percentage': round((group['revenue'] / total) * 100, 2)
+            }
+        return dict(sorted(regions.items(), key=lambda x: x[1]['total_sales'], reverse=True))
+
+    def _product_totals(self):
+        return [(name, g['quantity'], g['revenue'])
+                for name, g in self.rollup(by=('product_name',)).items()]
+
+    def top_selling_products(self, n=5):
+        """Top n products by total quantity sold as (name, qty, rev)."""
+        return top_n(self._product_totals(), n, key=lambda x: x[1])
+
+    def daily_sales_trend(self):
+        """Revenue, transaction count and unique customers per date."""
+        days = self.rollup(by=('date',))
+        customers = self.unique_customers() if self.customers is not None else {}
+        result = {}
+        for date in sorted(days):
+            result[date] = {
+                'revenue': round(days[date]['revenue'], 2),
+                'transaction_count': days[date]['transaction_count'],
+                'unique_customers': customers.get(date)
+            }
+        return result
+
+    def find_peak_sales_day(self):
+        """(date, revenue, count) for the highest revenue day, or None."""
+        return peak_sales_day(self.daily_sales_trend())
+
+    def low_performing_products(self, threshold=10):
+        """Products with total quantity < threshold, sorted by quantity."""
+        low_perf = [p for p in self._product_totals() if p[1] < threshold]
+        return sorted(low_perf, key=lambda x: x[1])
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def to_state(self):
+        """Returns the cube as a JSON-serialisable dict."""
+        return {
+            'cells': [list(key) + cell for key, cell in self.cells.items()],
+            'customers': None if self.customers is None else
+                [list(key) + [sorted(m)] for key, m in self.customers.items()]
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuilds a cube from the output of to_state()."""
+        cube = cls()
+        cube.cells = {tuple(row[:4]): list(row[4:]) for row in state['cells']}
+        if state['customers'] is None:
+            cube.customers = None
+        else:
+            cube.customers = {(d, r): set(m) for d, r, m in state['customers']}
+        return cube
+
+    def save(self, filename):
+        """Writes the cube to a JSON file (atomically)."""
+        save_json(filename, self.to_state())
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename, 'r', encoding='utf-8') as f:
+            return cls.from_state(json.load(f))
+
+
+def _split(value):
+    return set(value.split(',')) if value else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query a saved sales cube")
+    parser.add_argument("cube", help="Cube file written by main.py --cube")
+    parser.add_argument("--start", help="First date (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last date (YYYY-MM-DD)")
+    parser.add_argument("--regions", help="Comma-separated regions")
+    parser.add_argument("--products", help="Comma-separated product IDs")
+    parser.add_argument("--by", default="region",
+                        help=f"Comma-separated dimensions to group by ({', '.join(DIMENSIONS)})")
+    parser.add_argument("--period", choices=PERIODS, default="day",
+                        help="Date bucket used when grouping by date")
+    args = parser.parse_args()
+
+    cube = SalesCube.load(args.cube).where(
+        args.start, args.end, _split(args.regions), _split(args.products)
+    )
+    by = tuple(d for d in args.by.split(',') if d)
+    for key, group in cube.rollup(by, args.period).items():
+        label = ' / '.join(key) if isinstance(key, tuple) else str(key)
+        print(f"{label:<40} qty {group['quantity']:>8}  "
+              f"${group['revenue']:>16,.2f}  {group['transaction_count']:>6} txns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+utils/data_generator.py
+Deterministic synthetic sales files for scaling tests and benchmarks.
+
+Files use the same pipe-delimited layout as data/sales_data.txt and
+reproduce its quirks at configurable rates:
+- prices in cents ('449.99'), some whole like the source's ('1,916')
+- thousands separators in prices ('1,916', '2,104.50')
+- commas inside product names ('Mouse,Wireless')
+- zero quantities and negative prices
+- missing CustomerID or Region
+- transaction IDs with a bad prefix ('X611')
+- non-ASCII product names, written in one encoding or, with
+  encoding='mixed', with some lines in cp1252 inside a UTF-8 file
+
+The same arguments always produce the same bytes. Rows are written in
+batches, so the file size is not limited by memory:
+
+    python -m utils.data_generator data/bench_1m.txt --rows 1000000 --seed 7
+"""
+import argparse
+import random
+from datetime import date, timedelta
+
+HEADER = 'TransactionID|Date|ProductID|ProductName|Quantity|UnitPrice|CustomerID|Region'
+REGIONS = ['North', 'South', 'East', 'West']
+
+# (ProductID, name, name variants as they appear in the source, base price)
+PRODUCTS = [
+    ('P101', 'Laptop', ['Laptop,Premium'], 60000),
+    ('P102', 'Mouse', ['Mouse,Wireless'], 700),
+    ('P103', 'Keyboard', ['Keyboard,Mechanical'], 1800),
+    ('P104', 'Monitor', ['Monitor,LED'], 12000),
+    ('P105', 'Webcam', ['Webcam,HD'], 3000),
+    ('P106', 'Headphones', [], 3500),
+    ('P107', 'USB Cable', [], 250),
+    ('P108', 'External Hard Drive', ['External Hard Drive,1TB'], 5000),
+    ('P109', 'Wireless Mouse', ['Wireless Mouse,Gaming'], 1000),
+    ('P110', 'Laptop Charger', ['Laptop Charger,65W'], 2000),
+]
+
+# Names outside ASCII but inside latin-1/cp1252, for the encoding paths
+NON_ASCII_PRODUCTS = [
+    ('P111', 'Câble HDMI', [], 450),
+    ('P112', 'Écran Portable', [], 15000),
+    ('P113', 'Kopfhörer Pro', [], 4200),
+]
+
+DEFAULT_RATES = {
+    'price_commas': 0.1,
+    'whole_price': 0.3,
+    'name_commas': 0.15,
+    'zero_quantity': 0.01,
+    'negative_price': 0.02,
+    'missing_customer': 0.02,
+    'missing_region': 0.02,
+    'bad_id': 0.04,
+    'non_ascii': 0.05,
+    'mixed_encoding': 0.5
+}
+
+ENCODINGS = ('utf-8', 'latin-1', 'cp1252', 'mixed')
+BATCH_ROWS = 50000
+
+
+def _catalog(products):
+    """The first `products` catalog entries, extended with numbered products."""
+    catalog = list(PRODUCTS)
+    for i in range(len(catalog), products):
+        product_id = 101 + len(NON_ASCII_PRODUCTS) + i
+        catalog.append((f"P{product_id}", f"Product {product_id}", [], 500 + (i * 7919) % 20000))
+    return catalog[:max(products, 1)]
+
+
+def iter_sales_lines(rows, seed=0, start_date='2024-12-01', days=31,
+                     customers=None, products=10, rates=None):
+    """
+    Yields (line, non_ascii) for `rows` synthetic transactions. customers
+    defaults to one per 50 rows (at least 30), like the source data. A
+    share of rows (rates['non_ascii']) use the non-ASCII products.
+    """
+    rng = random.Random(seed)
+    rates = dict(DEFAULT_RATES, **(rates or {}))
+    customers = customers or max(30, rows // 50)
+    first_day = date.fromisoformat(start_date)
+    dates = [(first_day + timedelta(days=d)).isoformat() for d in range(days)]
+    catalog = _catalog(products)
+
+    for n in range(rows):
+        non_ascii = rng.random() < rates['non_ascii']
+        pid, name, variants, base = rng.choice(NON_ASCII_PRODUCTS if non_ascii else catalog)
+        if variants and rng.random() < rates['name_commas']:
+            name = rng.choice(variants)
+
+        quantity = 0 if rng.random() < rates['zero_quantity'] else rng.randint(1, 10)
+        # Cents make the float sums depend on their order, as real prices do
+        price = max(0.01, round(base * rng.uniform(0.75, 1.35), 2))
+        price_format = '.0f' if rng.random() < rates['whole_price'] else '.2f'
+        if rng.random() < rates['negative_price']:
+            price = -price
+        if rng.random() < rates['price_commas']:
+            price_format = ',' + price_format
+        price_text = format(price, price_format)
+
+        tid = f"X{n + 1}" if rng.random() < rates['bad_id'] else f"T{n + 1:03d}"
+        cid = '' if rng.random() < rates['missing_customer'] else f"C{rng.randint(1, customers):03d}"
+        region = '' if rng.random() < rates['missing_region'] else rng.choice(REGIONS)
+
+        line = f"{tid}|{rng.choice(dates)}|{pid}|{name}|{quantity}|{price_text}|{cid}|{region}"
+        yield line, non_ascii
+
+
+def generate_sales_file(filename, rows, seed=0, encoding='utf-8', **options):
+    """
+    Writes a synthetic sales file with a header and `rows` transactions.
+    encoding is 'utf-8', 'latin-1', 'cp1252' or 'mixed' (UTF-8 with a share
+    of the non-ASCII lines in cp1252). Other options go to iter_sales_lines.
+    Returns the number of bytes written.
+    """
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown encoding '{encoding}' (expected one of {', '.join(ENCODINGS)})")
+
+    rates = dict(DEFAULT_RATES, **options.get('rates', {}) or {})
+    # Separate stream so the mixed-encoding choice does not shift the rows
+    rng = random.Random(f"{seed}-encoding")
+    base_encoding = 'utf-8' if encoding == 'mixed' else encoding
+
+    written = 0
+    with open(filename, 'wb') as f:
+        batch = [(HEADER + '\n').encode(base_encoding)]
+        for line, non_ascii in iter_sales_lines(rows, seed, **options):
+            line_encoding = base_encoding
+            if encoding == 'mixed' and non_ascii and rng.random() < rates['mixed_encoding']:
+                line_encoding = 'cp1252'
+            batch.append((line + '\n').encode(line_encoding))
+            if len(batch) >= BATCH_ROWS:
+                data = b''.join(batch)
+                f.write(data)
+                written += len(data)
+                batch = []
+        data = b''.join(batch)
+        f.write(data)
+        written += len(data)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic sales data file")
+    parser.add_argument("output", help="File to write")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--encoding", choices=ENCODINGS, default="utf-8")
+    parser.add_argument("--days", type=int, default=31, help="Days covered, from --start-date")
+    parser.add_argument("--start-date", default="2024-12-01")
+    parser.add_argument("--customers", type=int, default=None)
+    parser.add_argument("--products", type=int, default=10,
+                        help="Catalog size (beyond 10, numbered products are added)")
+    args = parser.parse_args()
+
+    size = generate_sales_file(args.output, args.rows, args.seed, args.encoding,
+                               start_date=args.start_date, days=args.days,
+                               customers=args.customers, products=args.products)
+    print(f"Wrote {args.rows} rows ({size:,} bytes) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
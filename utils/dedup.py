@@ -0,0 +1,234 @@
+"""
+utils/dedup.py
+Streaming TransactionID deduplication with bounded memory.
+
+Replayed upstream batches repeat TransactionIDs, and every repeat inflates
+revenue and counts. Keeping an exact set of IDs does not scale, so each ID
+is first checked against a Bloom filter of a fixed size in memory:
+
+- "not seen" from the filter is always right, so the row is new. Its ID is
+  added to the filter and queued for the disk store.
+- "maybe seen" is confirmed against an exact, disk-backed SQLite store of
+  every ID kept so far. Only a confirmed repeat is dropped.
+
+A Bloom false positive therefore never drops a row; it only costs one
+indexed lookup on disk. The filter is blocked: all k bits of an ID fall in
+one 64-bit word, so a check is one hash, one array read and one AND. That
+is a little less accurate than a classic Bloom filter of the same size.
+With m bits, n IDs and the k picked for `expected_ids`, the rate is about
+0.5% at 16 bits per ID; false_positive_rate() gives the exact figure. The
+default 16 MiB filter at 10M expected IDs is 13.4 bits per ID, about 0.8%.
+Past expected_ids the rate (and the share of rows that need a disk lookup)
+rises gradually; nothing breaks.
+
+Memory is the filter, at most `flush_rows` IDs waiting to be written and a
+small SQLite page cache. New IDs are written in batches with executemany.
+The filter uses Python's per-process string hash, so it is rebuilt from
+the store on every run and never saved.
+"""
+import math
+import os
+import random
+import sqlite3
+import tempfile
+from array import array
+
+DEFAULT_MEMORY_BYTES = 16 * 2 ** 20
+DEFAULT_EXPECTED_IDS = 10_000_000
+FLUSH_ROWS = 10000
+# IDs per INSERT statement when flushing (below SQLite's old 999-parameter limit)
+INSERT_ROWS = 500
+_MULTI_INSERT = "INSERT INTO seen VALUES " + ",".join(["(?)"] * INSERT_ROWS)
+# SQLite page cache of the store, in KiB (negative cache_size = KiB)
+STORE_CACHE_KB = 8192
+# The low MASK_BITS of the hash pick a precomputed k-bit mask, the rest the word
+MASK_BITS = 12
+MASK_LIMIT = (1 << MASK_BITS) - 1
+
+
+def _masks(hashes):
+    rng = random.Random(hashes)
+    return [sum(1 << bit for bit in rng.sample(range(64), hashes))
+            for _ in range(1 << MASK_BITS)]
+
+
+class BloomFilter:
+    """Blocked Bloom filter over strings: every item sets k bits of one 64-bit word."""
+
+    def __init__(self, memory_bytes=DEFAULT_MEMORY_BYTES, expected_items=DEFAULT_EXPECTED_IDS):
+        self.words = array('Q', bytes(max(8, int(memory_bytes)) // 8 * 8))
+        self.size = len(self.words) * 64
+        bits_per_item = self.size / max(expected_items, 1)
+        self.hashes = min(16, max(1, round(bits_per_item * math.log(2) * 0.85)))
+        self.masks = _masks(self.hashes)
+        self.count = 0
+
+    def add(self, item):
+        """Adds item; returns True if it may have been added before."""
+        h = hash(item)
+        mask = self.masks[h & MASK_LIMIT]
+        index = (h >> MASK_BITS) % len(self.words)
+        word = self.words[index]
+        if word & mask == mask:
+            return True
+        self.words[index] = word | mask
+        self.count += 1
+        return False
+
+    def __contains__(self, item):
+        h = hash(item)
+        mask = self.masks[h & MASK_LIMIT]
+        return self.words[(h >> MASK_BITS) % len(self.words)] & mask == mask
+
+    def false_positive_rate(self, items=None):
+        """
+        Expected false-positive rate after `items` additions (default: so
+        far). Items per word are Poisson distributed; a word holding j items
+        has about 64 * (1 - (1 - 1/64) ** (k * j)) bits set.
+        """
+        items = self.count if items is None else items
+        load = items / len(self.words)
+        if load == 0:
+            return 0.0
+        k = self.hashes
+        rate = 0.0
+        probability = math.exp(-load)
+        for j in range(int(load + 10 * math.sqrt(load) + 10)):
+            if j:
+                probability *= load / j
+            rate += probability * (1 - (1 - 1 / 64) ** (k * j)) ** k
+        return rate
+
+
+class Deduplicator:
+    """
+    Remembers TransactionIDs: seen(tid) is True for an ID already passed
+    to it. The exact store is a temporary file unless `store_path` is given,
+    in which case IDs persist across runs. Use as a context manager or
+    call close().
+    """
+
+    def __init__(self, memory_bytes=DEFAULT_MEMORY_BYTES, expected_ids=DEFAULT_EXPECTED_IDS,
+                 store_path=None, flush_rows=FLUSH_ROWS):
+        self.bloom = BloomFilter(memory_bytes, expected_ids)
+        self.flush_rows = flush_rows
+        self.pending = set()
+        self.duplicates = 0
+        self.false_positives = 0
+        self.disk_lookups = 0
+
+        self._temp_path = None
+        if store_path is None:
+            fd, store_path = tempfile.mkstemp(prefix='sales_dedup_', suffix='.sqlite')
+            os.close(fd)
+            self._temp_path = store_path
+        else:
+            directory = os.path.dirname(store_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self.store_path = store_path
+
+        self.connection = sqlite3.connect(store_path)
+        self.connection.execute("PRAGMA journal_mode = OFF")
+        self.connection.execute("PRAGMA synchronous = OFF")
+        self.connection.execute(f"PRAGMA cache_size = -{STORE_CACHE_KB}")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS seen (id TEXT PRIMARY KEY) WITHOUT ROWID"
+        )
+        # A persistent store from an earlier run seeds the filter
+        for (tid,) in self.connection.execute("SELECT id FROM seen"):
+            self.bloom.add(tid)
+
+    def seen(self, tid):
+        """Records tid and returns True if it was recorded before."""
+        if not self.bloom.add(tid):
+            self._remember(tid)
+            return False
+
+        # Bloom says "maybe": confirm exactly
+        if tid in self.pending:
+            self.duplicates += 1
+            return True
+        self.disk_lookups += 1
+        if self.connection.execute("SELECT 1 FROM seen WHERE id = ?", (tid,)).fetchone():
+            self.duplicates += 1
+            return True
+        self.false_positives += 1
+        self._remember(tid)
+        return False
+
+    def _remember(self, tid):
+        self.pending.add(tid)
+        if len(self.pending) >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the queued IDs to the disk store, sorted (for B-tree locality)
+        and INSERT_ROWS per statement, which halves the cost per ID.
+        """
+        if not self.pending:
+            return
+        ids = sorted(self.pending)
+        full = len(ids) - len(ids) % INSERT_ROWS
+        with self.connection:
+            self.connection.executemany(
+                _MULTI_INSERT, (ids[i:i + INSERT_ROWS] for i in range(0, full, INSERT_ROWS))
+            )
+            self.connection.executemany("INSERT INTO seen VALUES (?)",
+                                        ((tid,) for tid in ids[full:]))
+        self.pending = set()
+
+    def stats(self):
+        return {
+            'duplicates': self.duplicates,
+            'dedup_false_positives': self.false_positives,
+            'dedup_disk_lookups': self.disk_lookups,
+            'dedup_expected_fp_rate': round(self.bloom.false_positive_rate(), 6)
+        }
+
+    def close(self):
+        """Flushes a persistent store; deletes a temporary one."""
+        if self.connection is None:
+            return
+        if self._temp_path is None:
+            self.flush()
+        self.connection.close()
+        self.connection = None
+        if self._temp_path is not None and os.path.exists(self._temp_path):
+            os.remove(self._temp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def iter_deduplicate(transactions, deduplicator=None, summary=None,
+                     memory_bytes=DEFAULT_MEMORY_BYTES):
+    """
+    Yields the first occurrence of every TransactionID. When the generator
+    finishes or is closed, summary gets 'duplicates' (and the false-positive
+    counters) and its final_count, if present, is reduced by the duplicates.
+    Without a deduplicator a temporary one of memory_bytes is used and closed.
+    """
+    owned = deduplicator is None
+    if owned:
+        deduplicator = Deduplicator(memory_bytes)
+    dropped = 0
+    try:
+        seen = deduplicator.seen
+        for t in transactions:
+            if seen(t['TransactionID']):
+                dropped += 1
+                continue
+            yield t
+    finally:
+        if summary is not None:
+            summary.update(deduplicator.stats(), duplicates=dropped)
+            if 'final_count' in summary:
+                summary['final_count'] -= dropped
+        if owned:
+            deduplicator.close()
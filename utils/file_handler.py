@@ -1,80 +1,214 @@
 # utils/file_handler.py
 
-def read_sales_data(filename):
+import json
+import mmap
+import os
+from contextlib import closing, contextmanager
+
+# Tried in order; latin-1 accepts any byte sequence, so it is the effective
+# last resort and cp1252 is only kept for compatibility.
+ENCODINGS = ['utf-8', 'latin-1', 'cp1252']
+
+# Bytes from the start of the file used to pick the encoding
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+
+def detect_encoding(data, sample_size=ENCODING_SAMPLE_SIZE):
     """
-    Reads sales data from file handling encoding issues
-    Returns: list of raw transaction lines (strings)
+    Picks the encoding from a bounded sample at the start of the data
+    instead of decoding the whole file once per candidate encoding
+    Returns: name of the first encoding in ENCODINGS that decodes the sample
     """
 
-    encodings = ['utf-8', 'latin-1', 'cp1252']
+    sample = data[:sample_size]
+
+    # Cut a full sample back to the last newline so a multi-byte character
+    # split at the sample boundary does not look like invalid UTF-8
+    if len(sample) == sample_size and b'\n' in sample:
+        sample = sample[:sample.rindex(b'\n')]
 
-    for encoding in encodings:
+    for encoding in ENCODINGS:
         try:
-            with open(filename, 'r', encoding=encoding) as file:
-                lines = file.readlines()
+            sample.decode(encoding)
+            return encoding
+        except UnicodeDecodeError:
+            continue
 
-                cleaned_lines = []
+    return ENCODINGS[-1]
 
-                # Skip header row and empty lines
-                for line in lines[1:]:
-                    line = line.strip()
-                    if line:
-                        cleaned_lines.append(line)
 
-                return cleaned_lines
+def _decode_line(raw, encoding):
+    """
+    Decodes one line with the detected encoding, falling back line by line
+    through the other supported encodings
+    """
 
+    try:
+        return str(raw, encoding)
+    except UnicodeDecodeError:
+        pass
+
+    for fallback in ENCODINGS:
+        try:
+            return str(raw, fallback)
         except UnicodeDecodeError:
-            # Try next encoding
             continue
 
-        except FileNotFoundError:
-            print(f"Error: File '{filename}' not found.")
-            return []
+    return None
 
-    print("Error: Unable to read file with supported encodings.")
-    return []
 
-
-def parse_transactions(raw_lines):
+def iter_line_slices(data, start=0, end=None):
     """
-    Parses raw lines into clean list of dictionaries
+    Yields (line_start, memoryview) for every line that begins inside the
+    byte range [start, end) of a bytes-like object such as an mmap. The
+    views are zero-copy and without the trailing newline; each one is
+    released once the next line is requested.
     """
 
-    transactions = []
+    view = memoryview(data)
+    size = len(view)
+    end = size if end is None else min(end, size)
+    position = start
 
-    for line in raw_lines:
-        parts = line.split('|')
+    try:
+        while position < end:
+            newline = data.find(b'\n', position)
+            if newline == -1:
+                newline = size
 
-        # Skip rows with incorrect number of fields
-        if len(parts) != 8:
-            continue
+            line = view[position:newline]
+            try:
+                yield position, line
+            finally:
+                line.release()
+
+            position = newline + 1
+    finally:
+        view.release()
 
+
+def _iter_mapped_lines(filename, start=0, end=None):
+    """
+    Memory-maps the file once and yields its decoded, stripped, non-empty
+    lines in [start, end). The header row is skipped when start is 0.
+    """
+
+    with open(filename, 'rb') as file:
         try:
-            transaction = {
-                'TransactionID': parts[0].strip(),
-                'Date': parts[1].strip(),
-                'ProductID': parts[2].strip(),
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            return
 
-                # Remove commas from product name
-                'ProductName': parts[3].replace(',', '').strip(),
+    with data:
+        encoding = detect_encoding(data)
 
-                # Convert Quantity to int
-                'Quantity': int(parts[4].replace(',', '').strip()),
+        # Skip header row
+        if start == 0:
+            header_end = data.find(b'\n')
+            start = len(data) if header_end == -1 else header_end + 1
 
-                # Convert UnitPrice to float
-                'UnitPrice': float(parts[5].replace(',', '').strip()),
+        # Close the slice generator explicitly so its views are released
+        # before the map is closed, even if the caller stops early
+        with closing(iter_line_slices(data, start, end)) as slices:
+            for _, raw in slices:
+                line = _decode_line(raw, encoding)
 
-                'CustomerID': parts[6].strip(),
-                'Region': parts[7].strip()
-            }
+                # Skip empty lines
+                if line is not None:
+                    line = line.strip()
+                    if line:
+                        yield line
 
-            transactions.append(transaction)
 
-        except ValueError:
-            # Skip rows where conversion fails
-            continue
+def read_sales_data(filename):
+    """
+    Reads sales data from file handling encoding issues
+    The file is memory-mapped and read once: the encoding is picked from a
+    bounded sample and each line is decoded on its own with a per-line
+    fallback to the other supported encodings
+    Returns: list of raw transaction lines (strings)
+    """
+
+    try:
+        return list(_iter_mapped_lines(filename))
+
+    except FileNotFoundError:
+        print(f"Error: File '{filename}' not found.")
+        return []
+
+
+def iter_sales_data(filename, start=0, end=None):
+    """
+    Streaming version of read_sales_data
+    Yields raw transaction lines one at a time without loading the file
+    into memory.
+
+    start/end restrict the stream to the lines that begin inside the byte
+    range [start, end); the header is only skipped when start is 0.
+    """
+
+    try:
+        yield from _iter_mapped_lines(filename, start, end)
+
+    except FileNotFoundError:
+        print(f"Error: File '{filename}' not found.")
 
-    return transactions
+
+def _parse_line(line):
+    """
+    Parses one raw line into a transaction dictionary
+    Returns: dict, or None if the row is malformed
+    """
+
+    parts = line.split('|')
+
+    # Skip rows with incorrect number of fields
+    if len(parts) != 8:
+        return None
+
+    try:
+        return {
+            'TransactionID': parts[0].strip(),
+            'Date': parts[1].strip(),
+            'ProductID': parts[2].strip(),
+
+            # Remove commas from product name
+            'ProductName': parts[3].replace(',', '').strip(),
+
+            # Convert Quantity to int
+            'Quantity': int(parts[4].replace(',', '').strip()),
+
+            # Convert UnitPrice to float
+            'UnitPrice': float(parts[5].replace(',', '').strip()),
+
+            'CustomerID': parts[6].strip(),
+            'Region': parts[7].strip()
+        }
+
+    except ValueError:
+        # Skip rows where conversion fails
+        return None
+
+
+def parse_transactions(raw_lines):
+    """
+    Parses raw lines into clean list of dictionaries
+    """
+
+    return list(iter_parse_transactions(raw_lines))
+
+
+def iter_parse_transactions(raw_lines):
+    """
+    Streaming version of parse_transactions
+    Yields: one transaction dictionary per well-formed line
+    """
+
+    for line in raw_lines:
+        transaction = _parse_line(line)
+        if transaction is not None:
+            yield transaction
 
 
 def validate_and_filter(transactions, region=None, min_amount=None, max_amount=None):
@@ -107,37 +241,16 @@ def validate_and_filter(transactions, region=None, min_amount=None, max_amount=N
     filtered_by_amount = 0
 
     for t in transactions:
+        outcome = _check_transaction(t, region, min_amount, max_amount)
 
-        # Validation rules
-        if (
-            t['Quantity'] <= 0 or
-            t['UnitPrice'] <= 0 or
-            not t['TransactionID'].startswith('T') or
-            not t['ProductID'].startswith('P') or
-            not t['CustomerID'].startswith('C') or
-            not t['Region']
-        ):
+        if outcome == 'invalid':
             invalid_count += 1
-            continue
-
-        amount = t['Quantity'] * t['UnitPrice']
-
-        # Region filter
-        if region and t['Region'] != region:
+        elif outcome == 'region':
             filtered_by_region += 1
-            continue
-
-        # Minimum amount filter
-        if min_amount and amount < min_amount:
-            filtered_by_amount += 1
-            continue
-
-        # Maximum amount filter
-        if max_amount and amount > max_amount:
+        elif outcome == 'amount':
             filtered_by_amount += 1
-            continue
-
-        valid_transactions.append(t)
+        else:
+            valid_transactions.append(t)
 
     summary = {
         'total_input': len(transactions),
@@ -148,3 +261,231 @@ def validate_and_filter(transactions, region=None, min_amount=None, max_amount=N
     }
 
     return valid_transactions, invalid_count, summary
+
+
+def _check_transaction(t, region=None, min_amount=None, max_amount=None):
+    """
+    Applies the validation rules and optional filters to one transaction
+    Returns: None if it passes, otherwise 'invalid', 'region' or 'amount'
+    """
+
+    # Validation rules
+    if (
+        t['Quantity'] <= 0 or
+        t['UnitPrice'] <= 0 or
+        not t['TransactionID'].startswith('T') or
+        not t['ProductID'].startswith('P') or
+        not t['CustomerID'].startswith('C') or
+        not t['Region']
+    ):
+        return 'invalid'
+
+    amount = t['Quantity'] * t['UnitPrice']
+
+    # Region filter
+    if region and t['Region'] != region:
+        return 'region'
+
+    # Minimum amount filter (0 is a valid bound, so compare against None)
+    if min_amount is not None and amount < min_amount:
+        return 'amount'
+
+    # Maximum amount filter
+    if max_amount is not None and amount > max_amount:
+        return 'amount'
+
+    return None
+
+
+def iter_validate_and_filter(transactions, region=None, min_amount=None,
+                             max_amount=None, summary=None):
+    """
+    Streaming version of validate_and_filter
+    Yields valid transactions one at a time and keeps the counters of the
+    given summary dict up to date, so they are complete once the generator
+    is exhausted
+    """
+
+    if summary is None:
+        summary = {}
+
+    summary.update({
+        'total_input': 0,
+        'invalid': 0,
+        'filtered_by_region': 0,
+        'filtered_by_amount': 0,
+        'final_count': 0
+    })
+
+    for t in transactions:
+        summary['total_input'] += 1
+        outcome = _check_transaction(t, region, min_amount, max_amount)
+
+        if outcome == 'invalid':
+            summary['invalid'] += 1
+        elif outcome == 'region':
+            summary['filtered_by_region'] += 1
+        elif outcome == 'amount':
+            summary['filtered_by_amount'] += 1
+        else:
+            summary['final_count'] += 1
+            yield t
+
+
+# Counters produced by the fused ingest. total_input counts rows that parsed,
+# as in validate_and_filter; lines rejected while parsing are counted in the
+# rejected_field_count / rejected_bad_number entries instead. invalid is the
+# sum of the three validation reasons after it.
+INGEST_SUMMARY_KEYS = (
+    'total_input', 'invalid', 'filtered_by_region', 'filtered_by_amount',
+    'final_count', 'rejected_field_count', 'rejected_bad_number',
+    'rejected_non_positive', 'rejected_bad_id', 'rejected_missing_region'
+)
+
+
+def iter_ingest(raw_lines, region=None, min_amount=None, max_amount=None,
+                summary=None, profile=None):
+    """
+    Fused parse + validate + filter in a single loop
+    Yields valid transaction dictionaries. The summary dict receives a
+    counter per rejection reason (see INGEST_SUMMARY_KEYS) and the optional
+    profile dict receives 'regions' (set) and 'min_amount'/'max_amount' over
+    the parsed rows that have a region, as printed by validate_and_filter.
+    Both are filled in when the generator finishes or is closed.
+    """
+
+    parsed = invalid_count = by_region = by_amount = final = 0
+    bad_fields = bad_number = non_positive = bad_id = missing_region = 0
+    regions = set()
+    lowest = highest = None
+
+    try:
+        for line in raw_lines:
+            parts = line.split('|')
+
+            if len(parts) != 8:
+                bad_fields += 1
+                continue
+
+            tid, date, pid, name, qty, price, cid, reg = parts
+
+            # Only pay for replace() when a field actually has a comma
+            try:
+                qty = int(qty.replace(',', '') if ',' in qty else qty)
+                price = float(price.replace(',', '') if ',' in price else price)
+            except ValueError:
+                bad_number += 1
+                continue
+
+            parsed += 1
+            amount = qty * price
+            reg = reg.strip()
+
+            if reg:
+                regions.add(reg)
+                if lowest is None or amount < lowest:
+                    lowest = amount
+                if highest is None or amount > highest:
+                    highest = amount
+
+            tid = tid.strip()
+            pid = pid.strip()
+            cid = cid.strip()
+
+            # Validation rules
+            if qty <= 0 or price <= 0:
+                non_positive += 1
+                invalid_count += 1
+                continue
+            if not (tid.startswith('T') and pid.startswith('P') and cid.startswith('C')):
+                bad_id += 1
+                invalid_count += 1
+                continue
+            if not reg:
+                missing_region += 1
+                invalid_count += 1
+                continue
+
+            # Filters
+            if region and reg != region:
+                by_region += 1
+                continue
+            if (min_amount is not None and amount < min_amount) or \
+                    (max_amount is not None and amount > max_amount):
+                by_amount += 1
+                continue
+
+            final += 1
+            yield {
+                'TransactionID': tid,
+                'Date': date.strip(),
+                'ProductID': pid,
+                'ProductName': (name.replace(',', '') if ',' in name else name).strip(),
+                'Quantity': qty,
+                'UnitPrice': price,
+                'CustomerID': cid,
+                'Region': reg
+            }
+
+    finally:
+        if summary is not None:
+            summary.update(zip(INGEST_SUMMARY_KEYS, (
+                parsed, invalid_count, by_region, by_amount, final,
+                bad_fields, bad_number, non_positive, bad_id, missing_region
+            )))
+        if profile is not None:
+            profile.update({'regions': regions, 'min_amount': lowest, 'max_amount': highest})
+
+
+def ingest_transactions(raw_lines, region=None, min_amount=None, max_amount=None):
+    """
+    Single-pass replacement for parse_transactions + validate_and_filter
+    Returns: (valid_transactions, invalid_count, summary) like
+    validate_and_filter, with per-reason rejection counters in the summary
+    """
+
+    summary = {}
+    profile = {}
+    valid_transactions = list(iter_ingest(
+        raw_lines, region, min_amount, max_amount, summary, profile
+    ))
+
+    if profile['regions']:
+        print("Available Regions:", profile['regions'])
+        print(
+            "Transaction Amount Range:",
+            profile['min_amount'],
+            "-",
+            profile['max_amount']
+        )
+
+    return valid_transactions, summary['invalid'], summary
+
+
+@contextmanager
+def atomic_write(filename, mode='w'):
+    """
+    Opens a temp file next to `filename` (creating its directory) and renames
+    it over `filename` once the block finishes, so readers never see a
+    half-written file. On error the temp file is removed.
+    """
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_file = filename + '.tmp'
+    try:
+        with open(temp_file, mode, encoding=None if 'b' in mode else 'utf-8') as f:
+            yield f
+        os.replace(temp_file, filename)
+    except BaseException:
+        try:
+            os.remove(temp_file)
+        except OSError:
+            pass
+        raise
+
+
+def save_json(filename, data):
+    """Writes data to a JSON file atomically (see atomic_write)."""
+    with atomic_write(filename) as f:
+        json.dump(data, f)
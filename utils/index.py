@@ -0,0 +1,149 @@
+"""
+utils/index.py
+In-memory indexes for repeated ad-hoc filters over one loaded dataset.
+
+validate_and_filter answers each filter combination with a full scan. A
+TransactionIndex is built once over the valid transactions (a list or a
+TransactionTable) and then answers region / customer / product lookups from
+hash indexes and amount / date ranges with bisect over sorted arrays. A
+query starts from the most selective index and checks the remaining
+conditions only on those candidate rows, so it costs time in proportion to
+the smallest match, not to the dataset:
+
+    index = TransactionIndex(valid_transactions)
+    rows = index.select(region='North', min_amount=0, start='2024-12-10')
+    region_wise_sales(rows)
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+
+# query() keyword -> indexed column
+HASH_KEYS = {'region': 'Region', 'customer': 'CustomerID', 'product': 'ProductID'}
+
+
+class TransactionIndex:
+    """
+    Hash indexes on Region, CustomerID and ProductID (value -> ascending row
+    ids) plus amount- and date-sorted row ids. Row ids are positions in the
+    indexed sequence. Build a new index if the transactions change.
+    """
+
+    def __init__(self, transactions):
+        self.transactions = transactions
+        self.hashes = {column: {} for column in HASH_KEYS.values()}
+        # Per-row amount and date, for checking candidates directly
+        self.amounts = array('d')
+        self.dates = []
+
+        for row_id, t in enumerate(transactions):
+            for column, index in self.hashes.items():
+                ids = index.get(t[column])
+                if ids is None:
+                    ids = index[t[column]] = array('I')
+                ids.append(row_id)
+            self.amounts.append(t['Quantity'] * t['UnitPrice'])
+            self.dates.append(t['Date'])
+
+        order = sorted(range(len(self.amounts)), key=self.amounts.__getitem__)
+        self.amount_order = array('I', order)
+        self.sorted_amounts = array('d', (self.amounts[i] for i in order))
+
+        order = sorted(range(len(self.dates)), key=self.dates.__getitem__)
+        self.date_order = array('I', order)
+        self.sorted_dates = [self.dates[i] for i in order]
+
+    def __len__(self):
+        return len(self.amounts)
+
+    def values(self, key):
+        """Distinct indexed values for 'region', 'customer' or 'product'."""
+        return list(self.hashes[HASH_KEYS[key]])
+
+    def _hash_candidates(self, key, values):
+        index = self.hashes[HASH_KEYS[key]]
+        if len(values) == 1:
+            return index.get(next(iter(values)), ())
+        ids = []
+        for value in values:
+            ids.extend(index.get(value, ()))
+        ids.sort()
+        return ids
+
+    @staticmethod
+    def _bounds(sorted_keys, low, high):
+        """Slice of a sorted array with low <= key <= high."""
+        lo = 0 if low is None else bisect_left(sorted_keys, low)
+        hi = len(sorted_keys) if high is None else bisect_right(sorted_keys, high)
+        return lo, max(hi, lo)
+
+    def query(self, region=None, customer=None, product=None,
+              min_amount=None, max_amount=None, start=None, end=None):
+        """
+        Ascending row ids of the transactions matching every given filter.
+        region / customer / product take one value or a collection of values;
+        amounts (Quantity * UnitPrice) and dates (YYYY-MM-DD) are inclusive
+        bounds. None means no restriction, so min_amount=0 is a real bound.
+        """
+        sets = {}
+        for key, value in (('region', region), ('customer', customer), ('product', product)):
+            if value is not None:
+                sets[key] = {value} if isinstance(value, str) else set(value)
+        has_amount = min_amount is not None or max_amount is not None
+        has_date = start is not None or end is not None
+
+        # Count each filter's matches from its index and drive from the smallest
+        plans = []
+        for key, values in sets.items():
+            index = self.hashes[HASH_KEYS[key]]
+            plans.append((sum(len(index.get(v, ())) for v in values), key))
+        if has_amount:
+            amount_range = self._bounds(self.sorted_amounts, min_amount, max_amount)
+            plans.append((amount_range[1] - amount_range[0], 'amount'))
+        if has_date:
+            date_range = self._bounds(self.sorted_dates, start, end)
+            plans.append((date_range[1] - date_range[0], 'date'))
+        if not plans:
+            return list(range(len(self)))
+
+        _, driver = min(plans)
+        if driver == 'amount':
+            candidates = sorted(self.amount_order[amount_range[0]:amount_range[1]])
+        elif driver == 'date':
+            candidates = sorted(self.date_order[date_range[0]:date_range[1]])
+        else:
+            candidates = self._hash_candidates(driver, sets[driver])
+
+        checks = []
+        for key in sets:
+            if key != driver:
+                checks.append((HASH_KEYS[key], sets[key]))
+        transactions = self.transactions
+        amounts = self.amounts
+        dates = self.dates
+
+        result = []
+        for row_id in candidates:
+            if driver != 'amount' and has_amount:
+                amount = amounts[row_id]
+                if (min_amount is not None and amount < min_amount) or \
+                        (max_amount is not None and amount > max_amount):
+                    continue
+            if driver != 'date' and has_date:
+                date = dates[row_id]
+                if (start is not None and date < start) or (end is not None and date > end):
+                    continue
+            if checks:
+                t = transactions[row_id]
+                if any(t[column] not in values for column, values in checks):
+                    continue
+            result.append(row_id)
+        return result
+
+    def rows(self, row_ids):
+        """The transactions for a list of row ids."""
+        transactions = self.transactions
+        return [transactions[i] for i in row_ids]
+
+    def select(self, **filters):
+        """Matching transactions for query(**filters), ready for data_processor."""
+        return self.rows(self.query(**filters))
@@ -0,0 +1,223 @@
+"""
+utils/metrics.py
+Per-stage instrumentation for the pipeline in main.py.
+
+Each stage runs inside `with metrics.stage(name) as stage:` and records its
+wall and CPU time, rows in/out, rows/sec and how far peak RSS rose above the
+RSS at the stage start. HTTP request latencies (see
+api_handler.fetch_all_products(latencies=...)) are summarised per stage.
+With profiling on, every stage runs under cProfile and the profile of the
+slowest stage is dumped. Everything is written as one JSON document.
+
+A disabled Metrics hands out one shared no-op stage, so instrumented code
+costs a method call per stage when metrics are off; cProfile and pstats are
+only imported when profiling is requested.
+"""
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+def reset_peak_rss():
+    """
+    Resets the kernel's peak-RSS counter for this process (Linux), so the
+    next peak_rss() covers only what runs afterwards. Returns False where
+    that is not supported and peaks are process-wide.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _status_bytes(field):
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def current_rss():
+    """Current resident set size in bytes, or None if unknown."""
+    return _status_bytes('VmRSS:')
+
+
+def peak_rss():
+    """Peak resident set size in bytes, or None if it cannot be measured."""
+    peak = _status_bytes('VmHWM:')
+    if peak is not None or resource is None:
+        return peak
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _mb(value):
+    return None if value is None else round(value / 2 ** 20, 2)
+
+
+def summarize_latencies(latencies):
+    """count/errors/mean/p50/p95/max (seconds) of [(seconds, status), ...]."""
+    if not latencies:
+        return {'count': 0}
+    seconds = sorted(s for s, _ in latencies)
+
+    def percentile(p):
+        return round(seconds[min(len(seconds) - 1, int(p * len(seconds)))], 4)
+
+    return {
+        'count': len(seconds),
+        'errors': sum(1 for _, status in latencies if status != 200),
+        'mean_s': round(sum(seconds) / len(seconds), 4),
+        'p50_s': percentile(0.5),
+        'p95_s': percentile(0.95),
+        'max_s': round(seconds[-1], 4)
+    }
+
+
+class _NullStage:
+    """Stand-in used when metrics are disabled; accepts and drops everything."""
+
+    rows_in = rows_out = None
+    latencies = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class Stage:
+    """Measurements of one pipeline stage; set rows_in / rows_out inside the block."""
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.rows_in = None
+        self.rows_out = None
+        # Filled with (seconds, status) by instrumented HTTP calls
+        self.latencies = []
+        self.profiler = None
+
+    def __enter__(self):
+        self.rss_start = current_rss()
+        self.peak_reset = reset_peak_rss()
+        if self.metrics.profile:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.cpu_start = time.process_time()
+        self.wall_start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+        if self.profiler is not None:
+            self.profiler.disable()
+        peak = peak_rss()
+
+        rows = self.rows_in if self.rows_in is not None else self.rows_out
+        record = {
+            'stage': self.name,
+            'wall_s': round(wall, 6),
+            'cpu_s': round(cpu, 6),
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'rows_per_s': round(rows / wall) if rows and wall else None,
+            'rss_start_mb': _mb(self.rss_start),
+            'peak_rss_mb': _mb(peak),
+            'peak_delta_mb': _mb(peak - self.rss_start)
+                if self.peak_reset and peak is not None and self.rss_start is not None else None,
+            'failed': exc_type is not None
+        }
+        if self.latencies:
+            record['http'] = summarize_latencies(self.latencies)
+        self.metrics._finish(self, record, wall)
+        return False
+
+
+class Metrics:
+    """Collects Stage records; disabled instances do no measuring at all."""
+
+    def __init__(self, enabled=False, profile=False):
+        self.enabled = enabled or profile
+        self.profile = profile
+        self.stages = []
+        self.started = datetime.now()
+        self._hottest = None
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_STAGE
+        return Stage(self, name)
+
+    def _finish(self, stage, record, wall):
+        self.stages.append(record)
+        if stage.profiler is not None and (self._hottest is None or wall > self._hottest[0]):
+            self._hottest = (wall, stage.name, stage.profiler)
+
+    def to_dict(self):
+        return {
+            'started': self.started.isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'total_wall_s': round(sum(s['wall_s'] for s in self.stages), 6),
+            'hottest_stage': max(self.stages, key=lambda s: s['wall_s'])['stage'] if self.stages else None,
+            'stages': self.stages
+        }
+
+    def write(self, filename):
+        """Writes the metrics JSON (no-op when disabled)."""
+        if not self.enabled:
+            return
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        print(f"Pipeline metrics written to {filename}")
+
+    def dump_profile(self, filename, top=25):
+        """
+        Saves the cProfile data of the slowest stage to `filename` (for
+        pstats/snakeviz) and a text summary of its top functions next to it.
+        """
+        if self._hottest is None:
+            return
+        import io
+        import pstats
+
+        _, name, profiler = self._hottest
+        directory = os.path.dirname(filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        profiler.dump_stats(filename)
+
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats('cumulative').print_stats(top)
+        with open(filename + '.txt', 'w', encoding='utf-8') as f:
+            f.write(f"Hottest stage: {name}\n")
+            f.write(text.getvalue())
+        print(f"Profile of hottest stage '{name}' written to {filename}")
@@ -0,0 +1,153 @@
+"""
+utils/mock_product_api.py
+Local stand-in for the DummyJSON products endpoint.
+
+Serves GET /products?limit=&skip= with DummyJSON-shaped pages
+({'products': [...], 'total', 'skip', 'limit'}) and can add latency and
+random failures, so fetch_all_products can be exercised without network
+access (tests/test_api_handler.py uses it the same way):
+
+    python -m utils.mock_product_api --products 250 --latency 0.2 --failure-rate 0.1
+    python main.py --api-url http://127.0.0.1:8765/products
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+CATEGORIES = ['laptops', 'smartphones', 'mobile-accessories', 'tablets', 'sports-accessories']
+BRANDS = ['Apple', 'Samsung', 'Dell', 'Logitech', 'Sony', None]
+
+
+def make_products(count, seed=0):
+    """Builds `count` DummyJSON-shaped product records with ids 1..count."""
+    rng = random.Random(seed)
+    products = []
+    for product_id in range(1, count + 1):
+        products.append({
+            'id': product_id,
+            'title': f"Product {product_id}",
+            'category': rng.choice(CATEGORIES),
+            'brand': rng.choice(BRANDS),
+            'price': round(rng.uniform(5, 2000), 2),
+            'rating': round(rng.uniform(1, 5), 2)
+        })
+    return products
+
+
+class _ProductHandler(BaseHTTPRequestHandler):
+    # Set per server by serve_products()
+    products = []
+    latency = 0.0
+    failure_rate = 0.0
+    max_limit = 100
+    rng = random.Random(0)
+    errors = {}
+    requests_seen = []
+    lock = threading.Lock()
+
+    def do_GET(self):
+        request = urlparse(self.path)
+        if request.path.rstrip('/') != '/products':
+            self._send(404, {'message': 'Not found'})
+            return
+
+        if self.latency:
+            time.sleep(self.latency)
+        if self.failure_rate and self.rng.random() < self.failure_rate:
+            self._send(503, {'message': 'Service unavailable'})
+            return
+
+        query = parse_qs(request.query)
+        try:
+            limit = int(query.get('limit', ['30'])[0])
+            skip = int(query.get('skip', ['0'])[0])
+        except ValueError:
+            self._send(400, {'message': 'limit and skip must be integers'})
+            return
+
+        # Scripted failures: the next status queued for this page, if any
+        with self.lock:
+            queued = self.errors.get(skip)
+            status = queued.pop(0) if queued else 200
+            self.requests_seen.append((skip, limit, status))
+        if status != 200:
+            self._send(status, {'message': f'Scripted status {status}'})
+            return
+
+        # DummyJSON treats limit=0 as "everything" and caps large pages
+        if limit <= 0:
+            limit = len(self.products)
+        limit = min(limit, self.max_limit)
+
+        page = self.products[skip:skip + limit]
+        self._send(200, {
+            'products': page,
+            'total': len(self.products),
+            'skip': skip,
+            'limit': len(page)
+        })
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_products(products=None, host='127.0.0.1', port=0, latency=0.0,
+                   failure_rate=0.0, max_limit=100, seed=0, errors=None):
+    """
+    Starts the stand-in server on a background thread.
+    errors maps a page's skip to the statuses its next requests get (e.g.
+    {100: [503, 429]} fails twice, then serves the page).
+    Returns (server, url); call server.shutdown() to stop it. port=0 picks
+    a free port. server.RequestHandlerClass.requests_seen lists every
+    (skip, limit, status) that got past the latency/failure_rate stage.
+    """
+    handler = type('ProductHandler', (_ProductHandler,), {
+        'products': products if products is not None else make_products(100),
+        'latency': latency,
+        'failure_rate': failure_rate,
+        'max_limit': max_limit,
+        'rng': random.Random(seed),
+        'errors': {skip: list(statuses) for skip, statuses in (errors or {}).items()},
+        'requests_seen': [],
+        'lock': threading.Lock()
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://{server.server_address[0]}:{server.server_address[1]}/products"
+    return server, url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local DummyJSON products stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--products", type=int, default=100, help="Catalog size")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to each response")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument("--max-limit", type=int, default=100, help="Largest page the server returns")
+    args = parser.parse_args()
+
+    server, url = serve_products(make_products(args.products), args.host, args.port,
+                                 args.latency, args.failure_rate, args.max_limit)
+    print(f"Serving {args.products} products at {url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
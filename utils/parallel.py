@@ -0,0 +1,156 @@
+"""
+utils/parallel.py
+Multi-core version of the read -> parse -> validate -> aggregate pipeline.
+
+The input file is split into byte ranges aligned to line starts. Each range
+is streamed, parsed, validated and aggregated by a worker process, and the
+partial SalesAggregator results and summary counters are merged in file
+order so groups come out in the same order as a serial run. A SalesCube
+and the enriched output, when asked for, are produced by the workers in
+the same pass: each worker enriches its own rows into a part file, and
+the parts are appended to the enriched file in file order.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.aggregator import SalesAggregator
+from utils.cube import SalesCube
+from utils.file_handler import iter_sales_data, iter_ingest, INGEST_SUMMARY_KEYS
+
+
+def split_byte_ranges(filename, parts):
+    """
+    Splits a file into at most `parts` (start, end) byte ranges.
+    Every boundary is moved forward to the start of the next line, so each
+    line belongs to exactly one range.
+    """
+    size = os.path.getsize(filename)
+    parts = max(1, min(parts, size or 1))
+
+    boundaries = [0]
+    with open(filename, 'rb') as file:
+        for i in range(1, parts):
+            file.seek(max(size * i // parts, boundaries[-1]))
+            file.readline()
+            position = file.tell()
+            if position >= size:
+                break
+            if position > boundaries[-1]:
+                boundaries.append(position)
+    boundaries.append(size)
+
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def fold_rows(rows, aggregator_options=None, cube=False, enrichment=None):
+    """
+    Folds valid rows into a new SalesAggregator and, in the same pass, a
+    SalesCube (cube=True) and an enriched part file (enrichment =
+    (product_mapping, part_file); part_file may be None to only count).
+    Returns (aggregate, extras) where extras is {'cube': SalesCube or None,
+    'enrichment': (part_file, enrichment summary) or None}.
+    """
+    aggregate = SalesAggregator(**(aggregator_options or {}))
+    extras = {'cube': SalesCube() if cube else None, 'enrichment': None}
+    sinks = [aggregate.add]
+    if extras['cube'] is not None:
+        sinks.append(extras['cube'].add)
+    writer = None
+    if enrichment is not None:
+        from utils.api_handler import EnrichedWriter
+        writer = EnrichedWriter(enrichment[0], enrichment[1], header=False)
+        sinks.append(writer.add)
+
+    if len(sinks) == 1:
+        aggregate.update(rows)
+    else:
+        for t in rows:
+            for add in sinks:
+                add(t)
+    if writer is not None:
+        writer.close()
+        extras['enrichment'] = (enrichment[1], writer.summary)
+    return aggregate, extras
+
+
+def process_range(filename, start, end, region=None, min_amount=None, max_amount=None,
+                  aggregator_options=None, cube=False, enrichment=None):
+    """
+    Worker: streams one byte range through the fused ingest and aggregation.
+    Returns (SalesAggregator, summary, extras) for the range; see fold_rows().
+    """
+    summary = {}
+    valid = iter_ingest(
+        iter_sales_data(filename, start, end),
+        region=region,
+        min_amount=min_amount,
+        max_amount=max_amount,
+        summary=summary
+    )
+    aggregate, extras = fold_rows(valid, aggregator_options, cube, enrichment)
+    return aggregate, summary, extras
+
+
+def _process_range_args(args):
+    return process_range(*args)
+
+
+def merge_results(results, aggregator_options=None, cube=None, enricher=None):
+    """
+    Merges (aggregator, summary, extras) partials in order into one
+    (aggregator, summary). Partial cubes are merged into `cube` and enriched
+    parts appended to `enricher` (an api_handler.EnrichedWriter) if given.
+    """
+    aggregate = SalesAggregator(**(aggregator_options or {}))
+    summary = dict.fromkeys(INGEST_SUMMARY_KEYS, 0)
+    for partial, partial_summary, extras in results:
+        aggregate.merge(partial)
+        for key, value in partial_summary.items():
+            summary[key] = summary.get(key, 0) + value
+        if cube is not None and extras['cube'] is not None:
+            cube.merge(extras['cube'])
+        if enricher is not None and extras['enrichment'] is not None:
+            enricher.append_part(*extras['enrichment'])
+    return aggregate, summary
+
+
+def enrichment_tasks(enricher, count):
+    """Per-task (product_mapping, part_file) for the workers of an EnrichedWriter, or Nones."""
+    if enricher is None:
+        return [None] * count
+    return [(enricher.product_mapping,
+             None if enricher.filename is None else f"{enricher.filename}.part-{i}")
+            for i in range(count)]
+
+
+def parallel_aggregate(filename, workers=None, region=None, min_amount=None,
+                       max_amount=None, chunks_per_worker=4, aggregator_options=None,
+                       cube=None, enricher=None):
+    """
+    Runs the whole ingest and aggregation over a process pool.
+    Returns (SalesAggregator, summary), matching the serial pipeline. If a
+    SalesCube is given, the rows are also folded into it; if an
+    EnrichedWriter is given, they are enriched into it.
+
+    Group totals are sums of per-chunk partial sums, so float totals can
+    differ from a serial pass in the last few bits when prices carry cents;
+    rounded report values are unaffected. aggregator_options are passed to
+    every SalesAggregator (e.g. {'approx_top_k': 1000}); their sketches are
+    merged like the exact totals.
+    """
+    if not os.path.exists(filename):
+        print(f"Error: File '{filename}' not found.")
+        return SalesAggregator(**(aggregator_options or {})), dict.fromkeys(INGEST_SUMMARY_KEYS, 0)
+
+    workers = workers or os.cpu_count() or 1
+    ranges = split_byte_ranges(filename, workers * chunks_per_worker)
+    tasks = [(filename, start, end, region, min_amount, max_amount, aggregator_options,
+              cube is not None, enrichment)
+             for (start, end), enrichment in zip(ranges, enrichment_tasks(enricher, len(ranges)))]
+
+    if workers == 1:
+        return merge_results(map(_process_range_args, tasks), aggregator_options, cube, enricher)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return merge_results(pool.map(_process_range_args, tasks), aggregator_options, cube,
+                             enricher)
@@ -0,0 +1,150 @@
+"""
+utils/parse_cache.py
+Persistent cache of parsed and validated transactions.
+
+The first run over a source file streams it through parse and validation into
+a TransactionTable and saves that table in its binary columnar format in a
+cache directory next to the source. Later runs reload the table with one bulk
+read instead of re-splitting and re-converting every line. Entries are keyed
+by the source path and invalidated when its size, mtime or content hash
+changes; the directory is kept under a byte budget by evicting the least
+recently used entries. Tables from the cache carry the source's content hash
+as their source_fingerprint, which result_cache uses as the dataset key.
+"""
+import hashlib
+import os
+
+from utils.file_handler import iter_sales_data, iter_ingest
+from utils.transaction_table import TransactionTable
+
+CACHE_DIR_NAME = '.sales_cache'
+CACHE_SUFFIX = '.stbl'
+DEFAULT_MAX_CACHE_BYTES = 512 * 1024 * 1024
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def source_fingerprint(filename, with_hash=True):
+    """Path, size, mtime and (optionally) BLAKE2 content hash of a file."""
+    stat = os.stat(filename)
+    fingerprint = {
+        'path': os.path.abspath(filename),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns
+    }
+    if with_hash:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        fingerprint['content_hash'] = digest.hexdigest()
+    return fingerprint
+
+
+def cache_dir_for(filename):
+    """Default cache directory: .sales_cache next to the source file."""
+    return os.path.join(os.path.dirname(os.path.abspath(filename)), CACHE_DIR_NAME)
+
+
+def cache_path(filename, cache_dir=None):
+    """Cache file used for a source path."""
+    cache_dir = cache_dir or cache_dir_for(filename)
+    key = hashlib.blake2b(os.path.abspath(filename).encode('utf-8'), digest_size=8).hexdigest()
+    return os.path.join(cache_dir, key + CACHE_SUFFIX)
+
+
+def load_cached_transactions(filename, cache_dir=None):
+    """
+    Returns (TransactionTable, summary) from the cache, or None if there is
+    no entry or the source changed since it was written.
+    """
+    path = cache_path(filename, cache_dir)
+    try:
+        table, metadata = TransactionTable.load(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Ignoring unreadable cache file {path}: {e}")
+        return None
+
+    cached = metadata.get('source', {})
+    current = source_fingerprint(filename, with_hash=False)
+    # Size and mtime are checked first so a changed file never pays for hashing
+    if any(cached.get(k) != current[k] for k in ('path', 'size', 'mtime_ns')):
+        return None
+    if cached.get('content_hash') != source_fingerprint(filename)['content_hash']:
+        return None
+
+    # Touch the entry so eviction treats it as recently used
+    os.utime(path)
+    table.source_fingerprint = cached['content_hash']
+    return table, metadata['summary']
+
+
+def evict_cache(cache_dir, max_bytes=DEFAULT_MAX_CACHE_BYTES, keep=None, suffix=CACHE_SUFFIX):
+    """
+    Deletes least recently used cache files (those ending in `suffix`) until
+    they take at most max_bytes. The entry at `keep` is never removed.
+    Returns: number of files removed.
+    """
+    try:
+        names = [n for n in os.listdir(cache_dir) if n.endswith(suffix)]
+    except FileNotFoundError:
+        return 0
+
+    entries = []
+    for name in names:
+        path = os.path.join(cache_dir, name)
+        stat = os.stat(path)
+        entries.append((stat.st_mtime, stat.st_size, path))
+    entries.sort()
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        if keep and os.path.abspath(path) == os.path.abspath(keep):
+            continue
+        os.remove(path)
+        total -= size
+        removed += 1
+    return removed
+
+
+def cached_transactions(filename, cache_dir=None, max_cache_bytes=DEFAULT_MAX_CACHE_BYTES):
+    """
+    Returns (TransactionTable of valid transactions, validation summary) for
+    a source file, using the cache when it is still valid and refreshing it
+    otherwise.
+    """
+    if not os.path.exists(filename):
+        print(f"Error: File '{filename}' not found.")
+        return TransactionTable(), {}
+
+    cached = load_cached_transactions(filename, cache_dir)
+    if cached is not None:
+        print(f"Loaded {len(cached[0])} transactions from cache.")
+        return cached
+
+    # Fingerprint before parsing so a file modified mid-parse is not cached
+    # under its new fingerprint
+    fingerprint = source_fingerprint(filename)
+    summary = {}
+    table = TransactionTable.from_transactions(iter_ingest(
+        iter_sales_data(filename),
+        summary=summary
+    ))
+
+    # Only a file that did not change while it was parsed vouches for the rows
+    current = source_fingerprint(filename, with_hash=False)
+    if all(fingerprint[k] == current[k] for k in ('path', 'size', 'mtime_ns')):
+        table.source_fingerprint = fingerprint['content_hash']
+
+    path = cache_path(filename, cache_dir)
+    try:
+        table.save(path, metadata={'source': fingerprint, 'summary': summary})
+        evict_cache(os.path.dirname(path), max_cache_bytes, keep=path)
+    except OSError as e:
+        print(f"Could not write cache file {path}: {e}")
+
+    return table, summary
@@ -0,0 +1,270 @@
+"""
+utils/partitions.py
+Ingestion of a sales feed split into one file per day and/or region.
+
+A source is a directory (searched recursively) or a glob pattern. The date
+and region of each partition are read from its path below the source root,
+either from the file name (sales_2024-12-01_North.txt, 20241201-north.txt)
+or from directories (date=2024-12-01/region=North/part-0.txt, 2024-12-01/
+North/part-0.txt). Directories above the source are never read and a date
+must be a real calendar date. There is no fixed list of regions: an
+explicit region= key always names one, otherwise the region is a word
+position of the path (a file name token or a directory level) that takes
+different values among the same-shaped partitions of one day, so a
+constant prefix such as sales_ never does. Partitions outside
+the requested date range or regions are dropped before any file is opened;
+the rest are ingested and aggregated concurrently and merged in path order,
+so a one-week report over years of partitions only reads that week's files.
+Files whose name carries no date or region are opened and filtered row by
+row instead. Files the pipeline writes itself (enriched_*) are not
+partitions.
+"""
+import glob
+import os
+import re
+from datetime import date as _date
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.file_handler import iter_sales_data, iter_ingest
+from utils.parallel import enrichment_tasks, fold_rows, merge_results
+
+_DATE = re.compile(r'(?<!\d)(?:date=)?(\d{4})-?(\d{2})-?(\d{2})(?!\d)', re.IGNORECASE)
+_REGION_KEY = re.compile(r'region=([^\W\d_]+(?:[ -][^\W\d_]+)*)', re.IGNORECASE)
+# A directory level that could name a region: words only (South America, south-america)
+_DIR_WORDS = re.compile(r'[^\W\d_]+(?:[ -][^\W\d_]+)*')
+_NAME_SEPARATORS = re.compile(r'[_\-.\s]+')
+_SKIP_DIRS = {'.sales_cache'}
+# Files the pipeline itself writes next to the source data
+IGNORED_PREFIXES = ('enriched_',)
+
+
+def is_partitioned_source(source):
+    """True for a directory or a glob pattern rather than a single file."""
+    return os.path.isdir(source) or glob.has_magic(source)
+
+
+def source_root(source):
+    """Directory the partition paths of a source are read relative to."""
+    if os.path.isdir(source):
+        return source
+    if glob.has_magic(source):
+        # The directories before the first wildcard
+        parts = []
+        for part in os.path.normpath(source).split(os.sep):
+            if glob.has_magic(part):
+                break
+            parts.append(part)
+        return os.sep.join(parts) or os.curdir
+    return os.path.dirname(source) or os.curdir
+
+
+def _parse_date(text):
+    """The first YYYY-MM-DD / YYYYMMDD calendar date in text, or None."""
+    for match in _DATE.finditer(text):
+        value = '-'.join(match.groups())
+        try:
+            _date.fromisoformat(value)
+        except ValueError:
+            continue
+        return value
+    return None
+
+
+def _path_keys(path, root):
+    """
+    (date, region, slots) read from the part of path below root. region is
+    only set by an explicit region= key; slots maps every other word
+    position that could name a region, ('name', i) for the i-th word of the
+    file name or ('dir', depth) for a directory level, to its word.
+    """
+    relative = os.path.relpath(path, root)
+    parts = os.path.normpath(relative).split(os.sep)
+    if parts[0] == os.pardir:
+        parts = parts[-1:]
+    date = region = None
+    slots = {}
+
+    *dirs, name = parts
+    stem = os.path.splitext(name)[0]
+    date = _parse_date(stem)
+    match = _REGION_KEY.search(stem)
+    if match:
+        region = match.group(1)
+    else:
+        words = _NAME_SEPARATORS.split(_DATE.sub('_', stem))
+        for i, word in enumerate(w for w in words if w):
+            if word.isalpha():
+                slots[('name', i)] = word
+
+    for depth, part in reversed(list(enumerate(dirs))):
+        if date is None:
+            date = _parse_date(part)
+        match = _REGION_KEY.fullmatch(part)
+        if match:
+            region = region or match.group(1)
+        elif _DIR_WORDS.fullmatch(part):
+            slots[('dir', depth)] = part
+    return date, region, slots
+
+
+def _region_slots(keyed):
+    """
+    Slots that name regions across a source: those taking different values
+    among partitions with the same date and the same path shape (which slots
+    they have), file name words first, then directories from the deepest.
+    """
+    values = {}
+    for date, _, slots in keyed:
+        shape = (date, tuple(sorted(slots)))
+        for slot, word in slots.items():
+            values.setdefault((slot, shape), set()).add(word.casefold())
+    varying = {slot for (slot, _), seen in values.items() if len(seen) > 1}
+    return sorted(varying, key=lambda slot: (slot[0] != 'name', slot[1] if slot[0] == 'name' else -slot[1]))
+
+
+def _slot_region(region_slots, slots):
+    for slot in region_slots:
+        if slot in slots:
+            return slots[slot]
+    return None
+
+
+def parse_partition_path(path, root=None):
+    """
+    Returns {'path', 'date', 'region'} for a partition file; date is
+    YYYY-MM-DD and date/region are None when the path does not carry them.
+    Only the part of the path below `root` (default: the file's directory)
+    is read. On its own a path only names a region with a region= key;
+    discover_partitions also reads unkeyed regions off the whole source.
+    """
+    date, region, _ = _path_keys(path, root if root is not None else os.path.dirname(path) or os.curdir)
+    return {'path': path, 'date': date, 'region': region}
+
+
+def discover_partitions(source):
+    """
+    Partition files of a directory (recursively) or glob, sorted by path.
+    Hidden files and the pipeline's own outputs are left out; a single file
+    is always taken as given.
+    """
+    if os.path.isdir(source):
+        paths = []
+        for root, dirs, files in os.walk(source):
+            dirs[:] = sorted(d for d in dirs if d not in _SKIP_DIRS and not d.startswith('.'))
+            paths.extend(os.path.join(root, f) for f in files if not f.startswith('.'))
+    elif glob.has_magic(source):
+        paths = [p for p in glob.glob(source, recursive=True) if os.path.isfile(p)]
+    else:
+        paths = [source] if os.path.isfile(source) else []
+    if paths != [source]:
+        paths = [p for p in paths if not os.path.basename(p).startswith(IGNORED_PREFIXES)]
+    root = source_root(source)
+    keyed = [_path_keys(p, root) for p in sorted(paths)]
+    region_slots = _region_slots(keyed)
+    return [{'path': p, 'date': date, 'region': region or _slot_region(region_slots, slots)}
+            for p, (date, region, slots) in zip(sorted(paths), keyed)]
+
+
+def prune_partitions(partitions, start=None, end=None, regions=None):
+    """
+    Drops partitions whose path date lies outside [start, end] or whose path
+    region is not in `regions` (compared case-insensitively). Partitions
+    without a date or region in their path are kept, since only their rows
+    can tell. When no partition is named after any of the requested regions,
+    the path regions are not trusted and every file is filtered row by row.
+    """
+    regions = {r.casefold() for r in regions} if regions else None
+    if regions is not None and not any(
+            p['region'] is not None and p['region'].casefold() in regions for p in partitions):
+        regions = None
+    kept = []
+    for p in partitions:
+        if p['date'] is not None and ((start and p['date'] < start) or (end and p['date'] > end)):
+            continue
+        if (p['region'] is not None and regions is not None and
+                p['region'].casefold() not in regions):
+            continue
+        kept.append(p)
+    return kept
+
+
+def iter_partition(partition, start=None, end=None, regions=None, summary=None):
+    """
+    Streams the valid transactions of one partition, applying the date and
+    region filters to each row unless the path already guarantees them.
+    summary receives the ingest counters plus 'filtered_by_date'.
+    """
+    if summary is None:
+        summary = {}
+    regions = {r.casefold() for r in regions} if regions else None
+    check_date = (start or end) and not (
+        partition['date'] and (not start or partition['date'] >= start) and
+        (not end or partition['date'] <= end)
+    )
+    check_region = regions is not None and (
+        partition['region'] is None or partition['region'].casefold() not in regions
+    )
+
+    by_date = by_region = 0
+    try:
+        for t in iter_ingest(iter_sales_data(partition['path']), summary=summary):
+            if check_date and ((start and t['Date'] < start) or (end and t['Date'] > end)):
+                by_date += 1
+                continue
+            if check_region and t['Region'].casefold() not in regions:
+                by_region += 1
+                continue
+            yield t
+    finally:
+        summary['filtered_by_date'] = by_date
+        summary['filtered_by_region'] = summary.get('filtered_by_region', 0) + by_region
+        summary['final_count'] = summary.get('final_count', 0) - by_date - by_region
+
+
+def process_partition(partition, start=None, end=None, regions=None, aggregator_options=None,
+                      cube=False, enrichment=None):
+    """Worker: returns (SalesAggregator, summary, extras) for one partition."""
+    summary = {}
+    rows = iter_partition(partition, start, end, regions, summary)
+    aggregate, extras = fold_rows(rows, aggregator_options, cube, enrichment)
+    return aggregate, summary, extras
+
+
+def _process_partition_args(args):
+    return process_partition(*args)
+
+
+def partitioned_aggregate(source, start=None, end=None, regions=None, workers=None,
+                          aggregator_options=None, cube=None, enricher=None):
+    """
+    Prunes, ingests and aggregates the partitions of a source concurrently.
+    Returns (SalesAggregator, summary) like parallel_aggregate; summary also
+    has filtered_by_date, partitions_found and partitions_read. A SalesCube
+    or EnrichedWriter, if given, is filled in the same pass.
+    """
+    partitions = discover_partitions(source)
+    kept = prune_partitions(partitions, start, end, regions)
+    if not partitions:
+        print(f"Error: No partition files found for '{source}'.")
+
+    tasks = [(p, start, end, regions, aggregator_options, cube is not None, enrichment)
+             for p, enrichment in zip(kept, enrichment_tasks(enricher, len(kept)))]
+    workers = min(workers or os.cpu_count() or 1, max(len(tasks), 1))
+    if workers == 1:
+        aggregate, summary = merge_results(map(_process_partition_args, tasks),
+                                           aggregator_options, cube, enricher)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            aggregate, summary = merge_results(pool.map(_process_partition_args, tasks),
+                                               aggregator_options, cube, enricher)
+
+    summary.setdefault('filtered_by_date', 0)
+    summary['partitions_found'] = len(partitions)
+    summary['partitions_read'] = len(kept)
+    return aggregate, summary
+
+
+def iter_partitioned_transactions(source, start=None, end=None, regions=None):
+    """Serial stream of the valid, filtered transactions of every kept partition."""
+    for partition in prune_partitions(discover_partitions(source), start, end, regions):
+        yield from iter_partition(partition, start, end, regions)
@@ -0,0 +1,258 @@
+"""
+utils/report.py
+Report data, snapshots and the text / JSON / CSV renderers.
+
+build_report_data() queries an aggregate (any backend) once for every
+figure the report shows and returns them as a plain, JSON-serialisable
+dict. That dict is the report snapshot: save_snapshot() writes it to disk,
+and any renderer can turn it into a report later without the raw data,
+so producing another format or re-rendering never rereads the sales file.
+"""
+import csv
+import io
+import json
+import os
+from datetime import datetime
+
+from utils.file_handler import save_json
+
+REPORT_FORMATS = ('text', 'json', 'csv')
+FORMAT_EXTENSIONS = {'text': '.txt', 'json': '.json', 'csv': '.csv'}
+DEFAULT_REPORT_FILE = 'output/sales_report.txt'
+DEFAULT_SNAPSHOT_FILE = 'output/report_snapshot.json'
+SNAPSHOT_VERSION = 1
+
+
+def _enrichment(enriched_transactions, total_count):
+    """Matched rows and failed ProductIDs from enriched rows or an enrichment summary."""
+    if enriched_transactions is None:
+        return None
+    # api_handler.enrich_and_save returns a summary when rows were streamed to disk
+    if isinstance(enriched_transactions, dict):
+        enriched_count = enriched_transactions['matched']
+        failed_products = list(enriched_transactions['failed_products'])
+    else:
+        enriched_count = sum(1 for t in enriched_transactions if t.get('API_Match'))
+        failed_products = list(set(t['ProductID'] for t in enriched_transactions if not t.get('API_Match')))
+    return {
+        'matched': enriched_count,
+        'failed_products': failed_products,
+        'success_rate': (enriched_count / total_count * 100) if total_count > 0 else 0
+    }
+
+
+def build_report_data(stats, enriched_transactions=None, summary=None):
+    """
+    Every figure of the report from a prebuilt aggregate, as a dict.
+    enriched_transactions may be the enriched rows, an enrichment summary,
+    or None when enrichment did not run; summary is the validation summary.
+    """
+    total_revenue = stats.total_revenue
+    total_count = stats.count
+    top_customers = list(stats.customer_analysis(n=5).items())[:5]
+    return {
+        'snapshot_version': SNAPSHOT_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'records': total_count,
+        'total_revenue': total_revenue,
+        'avg_order_value': total_revenue / total_count if total_count > 0 else 0,
+        'min_date': stats.min_date if total_count else None,
+        'max_date': stats.max_date if total_count else None,
+        'regions': stats.region_wise_sales(),
+        'top_products': [list(p) for p in stats.top_selling_products(n=5)],
+        'top_customers': [[cid, data['total_spent'], data['purchase_count']]
+                          for cid, data in top_customers],
+        'daily_trend': stats.daily_sales_trend(),
+        'rolling': stats.rolling_metrics().summary() if total_count else None,
+        'peak_day': list(stats.find_peak_sales_day() or ()) or None,
+        'low_products': [list(p) for p in stats.low_performing_products(threshold=10)],
+        'enrichment': _enrichment(enriched_transactions, total_count),
+        'summary': dict(summary) if summary is not None else None
+    }
+
+
+def save_snapshot(data, filename=DEFAULT_SNAPSHOT_FILE):
+    """Writes report data atomically (temp file + rename)."""
+    save_json(filename, data)
+
+
+def load_snapshot(filename=DEFAULT_SNAPSHOT_FILE):
+    """Returns the saved report data, or None if missing or unreadable."""
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        print(f"Error: Report snapshot '{filename}' not found.")
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Error: Unreadable report snapshot {filename}: {e}")
+        return None
+    if data.get('snapshot_version') != SNAPSHOT_VERSION:
+        print(f"Error: Report snapshot {filename} has an unsupported version.")
+        return None
+    return data
+
+
+# ----------------------------------------------------------------------
+# Renderers
+# ----------------------------------------------------------------------
+
+def render_text(data):
+    """The formatted text report."""
+    total_count = data['records']
+    date_range = f"{data['min_date']} to {data['max_date']}" if total_count else "N/A"
+    lines = []
+    w = lines.append
+
+    # HEADER
+    w("============================================\n")
+    w(f"{'SALES ANALYTICS REPORT':^44}\n")
+    w(f"{'Generated: ' + datetime.now().strftime('%Y-%m-%d %H:%M:%S'):^44}\n")
+    w(f"{'Records Processed: ' + str(total_count):^44}\n")
+    w("============================================\n\n")
+
+    # OVERALL SUMMARY
+    w("OVERALL SUMMARY\n")
+    w("-" * 44 + "\n")
+    w(f"Total Revenue:         ${data['total_revenue']:,.2f}\n")
+    w(f"Total Transactions:    {total_count}\n")
+    w(f"Average Order Value:   ${data['avg_order_value']:,.2f}\n")
+    w(f"Date Range:            {date_range}\n\n")
+
+    # REGION-WISE PERFORMANCE
+    w("REGION-WISE PERFORMANCE\n")
+    w("-" * 44 + "\n")
+    w(f"{'Region':<12} {'Sales':<15} {'% Total':<8} {'Count'}\n")
+    for reg, stats in data['regions'].items():
+        w(f"{reg:<12} ${stats['total_sales']:<14,.2f} {stats['percentage']:<7}% {stats['transaction_count']}\n")
+    w("\n")
+
+    # TOP 5 PRODUCTS
+    w("TOP 5 PRODUCTS\n")
+    w("-" * 44 + "\n")
+    w(f"{'Rank':<5} {'Product Name':<18} {'Qty':<5} {'Revenue'}\n")
+    for i, (name, qty, rev) in enumerate(data['top_products'], 1):
+        w(f"{i:<5} {name:<18} {qty:<5} ${rev:,.2f}\n")
+    w("\n")
+
+    # TOP 5 CUSTOMERS
+    w("TOP 5 CUSTOMERS\n")
+    w("-" * 44 + "\n")
+    w(f"{'Rank':<5} {'Customer ID':<12} {'Total Spent':<15} {'Orders'}\n")
+    for i, (cid, total_spent, purchase_count) in enumerate(data['top_customers'], 1):
+        w(f"{i:<5} {cid:<12} ${total_spent:<14,.2f} {purchase_count}\n")
+    w("\n")
+
+    # DAILY SALES TREND
+    w("DAILY SALES TREND\n")
+    w("-" * 44 + "\n")
+    w(f"{'Date':<12} {'Revenue':<15} {'Sales':<6} {'Cust'}\n")
+    for date, day in data['daily_trend'].items():
+        w(f"{date:<12} ${day['revenue']:<14,.2f} {day['transaction_count']:<6} {day['unique_customers']}\n")
+    w("\n")
+
+    # ROLLING WINDOWS (None when there were no records)
+    rolling = data['rolling']
+    w(f"ROLLING WINDOWS (as of {rolling['latest_date'] if rolling else 'N/A'})\n")
+    w("-" * 44 + "\n")
+    w(f"{'Window':<12} {'Revenue':<15} {'Sales':<6} {'Avg/Day'}\n")
+    if rolling:
+        for window in rolling['windows'].values():
+            w(f"{str(window['days']) + ' days':<12} ${window['revenue']:<14,.2f} "
+              f"{window['transaction_count']:<6} ${window['moving_average']:,.2f}\n")
+    growth = rolling['week_over_week'] if rolling else None
+    w(f"Week-over-Week Growth: {'N/A' if growth is None else f'{growth:+.2%}'}\n\n")
+
+    # PRODUCT PERFORMANCE ANALYSIS
+    peak_day = data['peak_day']
+    w("PRODUCT PERFORMANCE ANALYSIS\n")
+    w("-" * 44 + "\n")
+    w(f"Best Selling Day: {f'{peak_day[0]} (${peak_day[1]:,.2f})' if peak_day else 'N/A'}\n")
+    w(f"Low Performing Products: {len(data['low_products'])} items\n\n")
+
+    # API ENRICHMENT SUMMARY
+    enrichment = data['enrichment']
+    w("API ENRICHMENT SUMMARY\n")
+    w("-" * 44 + "\n")
+    if enrichment is None:
+        w("Enrichment stage was not run.\n")
+    else:
+        w(f"Products Enriched: {enrichment['matched']}\n")
+        w(f"Success Rate:      {enrichment['success_rate']:.2f}%\n")
+        if enrichment['failed_products']:
+            w(f"Failed IDs:        {', '.join(enrichment['failed_products'][:3])}...\n")
+
+    return "".join(lines)
+
+
+def render_json(data):
+    """The report data as indented JSON."""
+    return json.dumps(data, indent=2) + "\n"
+
+
+def render_csv(data):
+    """
+    The report data in long format, one figure per row:
+    section, key, metric, value.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(['section', 'key', 'metric', 'value'])
+    for metric in ('records', 'total_revenue', 'avg_order_value', 'min_date', 'max_date'):
+        writer.writerow(['summary', '', metric, data[metric]])
+    for reg, stats in data['regions'].items():
+        for metric, value in stats.items():
+            writer.writerow(['region', reg, metric, value])
+    for name, qty, rev in data['top_products']:
+        writer.writerow(['top_product', name, 'quantity', qty])
+        writer.writerow(['top_product', name, 'revenue', rev])
+    for cid, total_spent, purchase_count in data['top_customers']:
+        writer.writerow(['top_customer', cid, 'total_spent', total_spent])
+        writer.writerow(['top_customer', cid, 'purchase_count', purchase_count])
+    for date, day in data['daily_trend'].items():
+        for metric, value in day.items():
+            writer.writerow(['daily', date, metric, value])
+    if data['rolling']:
+        for window in data['rolling']['windows'].values():
+            for metric in ('revenue', 'transaction_count', 'moving_average'):
+                writer.writerow(['rolling', f"{window['days']}d", metric, window[metric]])
+        writer.writerow(['rolling', '', 'week_over_week', data['rolling']['week_over_week']])
+    if data['peak_day']:
+        writer.writerow(['peak_day', data['peak_day'][0], 'revenue', data['peak_day'][1]])
+        writer.writerow(['peak_day', data['peak_day'][0], 'transaction_count', data['peak_day'][2]])
+    for name, qty, rev in data['low_products']:
+        writer.writerow(['low_product', name, 'quantity', qty])
+    if data['enrichment'] is not None:
+        writer.writerow(['enrichment', '', 'matched', data['enrichment']['matched']])
+        writer.writerow(['enrichment', '', 'success_rate', data['enrichment']['success_rate']])
+        for product_id in data['enrichment']['failed_products']:
+            writer.writerow(['enrichment', product_id, 'failed', 1])
+    return buffer.getvalue()
+
+
+RENDERERS = {'text': render_text, 'json': render_json, 'csv': render_csv}
+
+
+def report_filename(output_file, fmt):
+    """output_file with the extension of the format (sales_report.txt -> .json / .csv)."""
+    base, _ = os.path.splitext(output_file)
+    return base + FORMAT_EXTENSIONS[fmt]
+
+
+def write_report(data, output_file=DEFAULT_REPORT_FILE, fmt='text'):
+    """Renders the report data in one format and writes it in a single call."""
+    if fmt not in RENDERERS:
+        raise ValueError(f"Unknown report format '{fmt}' (expected one of {', '.join(REPORT_FORMATS)})")
+    directory = os.path.dirname(output_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    try:
+        content = RENDERERS[fmt](data)
+        with open(output_file, 'w', encoding='utf-8', newline='' if fmt == 'csv' else None) as f:
+            f.write(content)
+        if fmt == 'text':
+            print(f"\nComprehensive report generated successfully: {output_file}")
+        else:
+            print(f"Report ({fmt}) written to {output_file}")
+    except Exception as e:
+        print(f"Error generating report: {e}")
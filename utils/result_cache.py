@@ -0,0 +1,216 @@
+"""
+utils/result_cache.py
+Memoization of the data_processor analytics for interactive sessions.
+
+Results are keyed by a fingerprint of the input dataset plus the
+function name and its (normalised) call parameters. Entries live in an
+in-process LRU bounded by entry count and bytes, with an optional on-disk
+tier that survives restarts. Results are stored pickled, so callers always
+get a fresh copy they are free to modify.
+
+The cheapest key is taken at the source: a TransactionTable loaded through
+parse_cache carries the content hash of its file (source_fingerprint), so
+keying it costs nothing; editing or appending a row clears that hash. Any
+other transaction list or table is fingerprinted over every row, so a
+replaced, edited, appended or removed row gives a new key. A table hashes
+its raw column arrays, but a list of dicts is pickled in chunks, at about
+half the cost of aggregating it. For interactive use on such lists, pass
+sample_fingerprint=True: it hashes only the length and an evenly spaced
+sample of rows, so after editing a row that was not sampled, call
+invalidate().
+
+A prebuilt aggregate is fingerprinted from its running totals and an
+identity token of the object itself. Those keys mean nothing in another
+process, so results for aggregates stay in memory and are never written to
+the disk tier.
+"""
+import hashlib
+import inspect
+import itertools
+import os
+import pickle
+import weakref
+from collections import OrderedDict
+
+from utils.file_handler import atomic_write
+from utils.parse_cache import evict_cache
+
+SAMPLE_ROWS = 64
+# Rows serialised per step of a full fingerprint
+FINGERPRINT_CHUNK = 10000
+RESULT_SUFFIX = '.result'
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = 256 * 1024 * 1024
+
+
+def _row_key(t):
+    return repr(tuple(t.items()) if hasattr(t, 'items') else t)
+
+
+# Identity tokens of live aggregates; unlike id() they are never reused
+_tokens = weakref.WeakKeyDictionary()
+_next_token = itertools.count(1)
+
+
+def _identity(obj):
+    try:
+        token = _tokens.get(obj)
+        if token is None:
+            token = _tokens[obj] = next(_next_token)
+        return token
+    except TypeError:
+        # Not weak-referenceable: fall back to id(), valid while obj lives
+        return ('id', id(obj))
+
+
+def is_aggregate(transactions):
+    return hasattr(transactions, 'region_wise_sales')
+
+
+def dataset_fingerprint(transactions, sample=False):
+    """
+    Short hex digest identifying a dataset: a table's source_fingerprint,
+    a transaction sequence (every row, or its length plus sampled rows with
+    sample=True) or a prebuilt aggregate (its type, running totals and
+    identity).
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(type(transactions).__name__.encode('utf-8'))
+
+    if is_aggregate(transactions):
+        digest.update(repr((
+            transactions.count,
+            transactions.total_revenue,
+            getattr(transactions, 'min_date', None),
+            getattr(transactions, 'max_date', None),
+            _identity(transactions)
+        )).encode('utf-8'))
+        return digest.hexdigest()
+
+    source = getattr(transactions, 'source_fingerprint', None)
+    if source is not None:
+        digest.update(repr(('source', source, len(transactions))).encode('utf-8'))
+        return digest.hexdigest()
+
+    if not hasattr(transactions, '__getitem__'):
+        raise TypeError("Only sequences and aggregates can be fingerprinted, not one-shot iterators")
+
+    length = len(transactions)
+    digest.update(str(length).encode('utf-8'))
+    if sample and length > SAMPLE_ROWS:
+        step = (length - 1) / (SAMPLE_ROWS - 1)
+        for i in sorted({round(i * step) for i in range(SAMPLE_ROWS)}):
+            digest.update(_row_key(transactions[i]).encode('utf-8'))
+    elif hasattr(transactions, 'update_digest'):
+        transactions.update_digest(digest)
+    else:
+        for start in range(0, length, FINGERPRINT_CHUNK):
+            chunk = transactions[start:start + FINGERPRINT_CHUNK]
+            if all(type(t) is dict for t in chunk):
+                # pickle serialises plain dicts far faster than repr()
+                digest.update(pickle.dumps(chunk, protocol=pickle.HIGHEST_PROTOCOL))
+            else:
+                for t in chunk:
+                    digest.update(_row_key(t).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """LRU of pickled results with an optional disk tier and hit/miss stats."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES,
+                 disk_dir=None, max_disk_bytes=DEFAULT_MAX_DISK_BYTES, sample_fingerprint=False):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.sample_fingerprint = sample_fingerprint
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+
+    def key(self, func, transactions, args=(), kwargs=None, extra=None):
+        """Cache key for func(transactions, *args, **kwargs)."""
+        bound = inspect.signature(func).bind(transactions, *args, **(kwargs or {}))
+        bound.apply_defaults()
+        params = [(name, value) for name, value in bound.arguments.items()
+                  if value is not transactions]
+        raw = repr((func.__module__, func.__qualname__, params, extra,
+                    dataset_fingerprint(transactions, self.sample_fingerprint)))
+        return hashlib.blake2b(raw.encode('utf-8'), digest_size=16).hexdigest()
+
+    def call(self, func, transactions, args=(), kwargs=None, extra=None):
+        """Returns func(transactions, *args, **kwargs), from the cache when possible."""
+        aggregate = is_aggregate(transactions)
+        if not hasattr(transactions, '__getitem__') and not aggregate:
+            # A generator can only be consumed once; nothing to reuse
+            return func(transactions, *args, **(kwargs or {}))
+
+        key = self.key(func, transactions, args, kwargs, extra)
+        data = self._get(key, disk=not aggregate)
+        if data is not None:
+            return pickle.loads(data)
+
+        self.stats['misses'] += 1
+        result = func(transactions, *args, **(kwargs or {}))
+        self._put(key, pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL), disk=not aggregate)
+        return result
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key + RESULT_SUFFIX)
+
+    def _get(self, key, disk=True):
+        data = self.entries.get(key)
+        if data is not None:
+            self.entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return data
+
+        if self.disk_dir and disk:
+            path = self._disk_path(key)
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except OSError:
+                return None
+            os.utime(path)
+            self.stats['disk_hits'] += 1
+            self._remember(key, data)
+            return data
+        return None
+
+    def _remember(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        self.entries[key] = data
+        self.nbytes += len(data)
+        while len(self.entries) > self.max_entries or self.nbytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.nbytes -= len(evicted)
+            self.stats['evictions'] += 1
+
+    def _put(self, key, data, disk=True):
+        self._remember(key, data)
+        if self.disk_dir and disk:
+            try:
+                path = self._disk_path(key)
+                with atomic_write(path, 'wb') as f:
+                    f.write(data)
+                evict_cache(self.disk_dir, self.max_disk_bytes, keep=path, suffix=RESULT_SUFFIX)
+            except OSError as e:
+                print(f"Could not write result cache file: {e}")
+
+    def invalidate(self):
+        """Drops every cached result, in memory and on disk."""
+        self.entries.clear()
+        self.nbytes = 0
+        if self.disk_dir and os.path.isdir(self.disk_dir):
+            for name in os.listdir(self.disk_dir):
+                if name.endswith(RESULT_SUFFIX):
+                    os.remove(os.path.join(self.disk_dir, name))
+
+    def hit_rate(self):
+        hits = self.stats['hits'] + self.stats['disk_hits']
+        total = hits + self.stats['misses']
+        return hits / total if total else 0.0
@@ -0,0 +1,159 @@
+"""
+utils/rolling.py
+Rolling-window revenue metrics kept in ring buffers.
+
+RollingMetrics holds one slot (revenue, transaction count) per calendar day
+for the last `capacity` days, indexed by the day's ordinal modulo capacity,
+plus a running (revenue, count) sum per configured window size. Adding a
+transaction touches one slot and each running sum. When a later day arrives,
+only the days it skips over are evicted from the sums and cleared, so the
+work is O(1) per transaction and per new day. Any window up to capacity can
+be queried: configured ones come from the running sums, others are summed
+from the ring.
+
+Transactions may arrive in any date order. A row for a day that has already
+fallen out of the ring (older than capacity days before the latest date)
+cannot belong to any window and is only counted in late_rows; it is also
+missing from the running peak.
+"""
+from datetime import date as _date
+
+DEFAULT_WINDOWS = (7, 30)
+# Two weeks are always kept, for week-over-week growth
+MIN_CAPACITY = 14
+
+
+class RollingMetrics:
+    """Trailing-window revenue, counts and moving averages ending at the latest date."""
+
+    def __init__(self, windows=DEFAULT_WINDOWS, capacity=None):
+        self.windows = tuple(sorted(set(windows)))
+        if not self.windows or self.windows[0] < 1:
+            raise ValueError("Window sizes must be positive numbers of days")
+        self.capacity = max(capacity or 0, self.windows[-1], MIN_CAPACITY)
+        self.revenue = [0.0] * self.capacity
+        self.counts = [0] * self.capacity
+        # window size -> [revenue, transaction_count] over its last days
+        self.sums = {w: [0.0, 0] for w in self.windows}
+        self.head = None
+        self.peak = None
+        self.late_rows = 0
+        self._ordinals = {}
+
+    @classmethod
+    def from_days(cls, days, windows=DEFAULT_WINDOWS, capacity=None):
+        """Builds from (date, revenue, transaction_count) per day, in any order."""
+        rolling = cls(windows, capacity)
+        for date, revenue, count in sorted(days):
+            rolling.add(date, revenue, count)
+        return rolling
+
+    @classmethod
+    def from_trend(cls, trend, windows=DEFAULT_WINDOWS, capacity=None):
+        """Builds from the output of daily_sales_trend()."""
+        return cls.from_days(((d, v['revenue'], v['transaction_count']) for d, v in trend.items()),
+                             windows, capacity)
+
+    def _ordinal(self, date):
+        ordinal = self._ordinals.get(date)
+        if ordinal is None:
+            if len(self._ordinals) > 4 * self.capacity:
+                self._ordinals.clear()
+            ordinal = self._ordinals[date] = _date.fromisoformat(date).toordinal()
+        return ordinal
+
+    def add(self, date, revenue, count=1):
+        """Adds revenue and count to a YYYY-MM-DD date."""
+        ordinal = self._ordinal(date)
+        head = self.head
+        if head is None or ordinal > head:
+            self._advance(ordinal)
+            head = ordinal
+        elif ordinal <= head - self.capacity:
+            self.late_rows += count
+            return
+
+        slot = ordinal % self.capacity
+        self.revenue[slot] += revenue
+        self.counts[slot] += count
+        for window, sums in self.sums.items():
+            if ordinal > head - window:
+                sums[0] += revenue
+                sums[1] += count
+
+        if self.peak is None or self.revenue[slot] > self.peak[1]:
+            self.peak = (date, self.revenue[slot])
+
+    def _advance(self, ordinal):
+        """Moves the latest date forward, evicting the days that leave each window."""
+        capacity = self.capacity
+        if self.head is None or ordinal - self.head >= capacity:
+            self.revenue = [0.0] * capacity
+            self.counts = [0] * capacity
+            for sums in self.sums.values():
+                sums[0], sums[1] = 0.0, 0
+        else:
+            revenue, counts = self.revenue, self.counts
+            for day in range(self.head + 1, ordinal + 1):
+                for window, sums in self.sums.items():
+                    evicted = (day - window) % capacity
+                    sums[0] -= revenue[evicted]
+                    sums[1] -= counts[evicted]
+                slot = day % capacity
+                revenue[slot] = 0.0
+                counts[slot] = 0
+        self.head = ordinal
+
+    @property
+    def latest_date(self):
+        return _date.fromordinal(self.head).isoformat() if self.head is not None else None
+
+    def _ring_sum(self, first, last):
+        """(revenue, count) for the ordinals first..last, all inside the ring."""
+        revenue = count = 0
+        for day in range(first, last + 1):
+            revenue += self.revenue[day % self.capacity]
+            count += self.counts[day % self.capacity]
+        return revenue, count
+
+    def window(self, days=7):
+        """
+        Revenue, transaction count and moving average (revenue per calendar
+        day) over the `days` days ending at the latest date.
+        """
+        if not 1 <= days <= self.capacity:
+            raise ValueError(f"Window must be between 1 and {self.capacity} days")
+        if self.head is None:
+            return None
+        if days in self.sums:
+            revenue, count = self.sums[days]
+        else:
+            revenue, count = self._ring_sum(self.head - days + 1, self.head)
+        return {
+            'days': days,
+            'start': _date.fromordinal(self.head - days + 1).isoformat(),
+            'end': self.latest_date,
+            'revenue': round(revenue, 2),
+            'transaction_count': count,
+            'moving_average': round(revenue / days, 2)
+        }
+
+    def week_over_week(self):
+        """Growth of the last 7 days' revenue over the 7 before, or None."""
+        if self.head is None:
+            return None
+        this_week = self._ring_sum(self.head - 6, self.head)[0]
+        last_week = self._ring_sum(self.head - 13, self.head - 7)[0]
+        if not last_week:
+            return None
+        return round(this_week / last_week - 1, 4)
+
+    def summary(self):
+        """The configured windows, week-over-week growth and peak as a dict."""
+        return {
+            'latest_date': self.latest_date,
+            'windows': {w: self.window(w) for w in self.windows},
+            'week_over_week': self.week_over_week(),
+            'peak_day': (self.peak[0], round(self.peak[1], 2)) if self.peak else None,
+            'late_rows': self.late_rows
+        }
@@ -0,0 +1,251 @@
+"""
+utils/sketches.py
+Bounded-memory summaries used by the aggregators.
+
+- top_n: exact top-n selection with a heap instead of a full sort.
+- SpaceSaving: weighted Space-Saving heavy-hitters sketch (Metwally et al.)
+  with the mergeable-summaries merge rule (Agarwal et al.), so per-chunk
+  sketches from parallel or incremental runs can be combined.
+- HyperLogLog: distinct-count sketch with sparse registers for small sets,
+  mergeable across chunks and across days.
+"""
+import hashlib
+import heapq
+import math
+
+
+def top_n(items, n, key):
+    """
+    The n largest items by key, in descending order.
+    Same result as sorted(items, key=key, reverse=True)[:n] (ties keep their
+    input order) but O(len(items) log n) and without sorting everything.
+    """
+    if n is None:
+        return sorted(items, key=key, reverse=True)
+    return heapq.nlargest(n, items, key=key)
+
+
+class SpaceSaving:
+    """
+    Weighted Space-Saving sketch keeping at most `capacity` counters.
+
+    For every monitored item, `count` overestimates its true total weight by
+    at most `error`, and error <= total / capacity. Any item whose true
+    weight exceeds total / capacity is guaranteed to be monitored. Each
+    counter can also carry an auxiliary sum (e.g. revenue next to quantity)
+    that only covers the time the item has been monitored.
+    """
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("SpaceSaving capacity must be at least 1")
+        self.capacity = capacity
+        self.total = 0
+        # item -> [count, error, aux]
+        self.counters = {}
+        # Min-heap of (count, item); entries whose count is no longer the
+        # item's current count are stale and skipped lazily.
+        self._heap = []
+
+    def update(self, item, weight=1, aux=0):
+        """Adds `weight` to item (weights must be non-negative)."""
+        self.total += weight
+        entry = self.counters.get(item)
+
+        if entry is not None:
+            entry[0] += weight
+            entry[2] += aux
+        elif len(self.counters) < self.capacity:
+            entry = self.counters[item] = [weight, 0, aux]
+        else:
+            evicted, min_count = self._pop_min()
+            del self.counters[evicted]
+            entry = self.counters[item] = [min_count + weight, min_count, aux]
+
+        heapq.heappush(self._heap, (entry[0], item))
+        if len(self._heap) > 4 * self.capacity + 64:
+            self._rebuild_heap()
+
+    def _pop_min(self):
+        while True:
+            count, item = heapq.heappop(self._heap)
+            entry = self.counters.get(item)
+            if entry is not None and entry[0] == count:
+                return item, count
+
+    def _rebuild_heap(self):
+        self._heap = [(entry[0], item) for item, entry in self.counters.items()]
+        heapq.heapify(self._heap)
+
+    def min_count(self):
+        """Smallest monitored count once the sketch is full, else 0."""
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(entry[0] for entry in self.counters.values())
+
+    def error_bound(self):
+        """Upper bound on the overestimate of any count: total / capacity."""
+        return self.total / self.capacity
+
+    def top(self, n=None):
+        """
+        Heaviest monitored items as (item, count, error, aux), descending by
+        count. The true weight of each item lies in [count - error, count].
+        """
+        ranked = top_n(self.counters.items(), n, key=lambda x: x[1][0])
+        return [(item, count, error, aux) for item, (count, error, aux) in ranked]
+
+    def merge(self, other):
+        """
+        Folds another sketch in. Items missing from a full sketch are
+        credited with its minimum count (as error), then only the heaviest
+        `capacity` counters are kept. Returns self.
+        """
+        mine = self.min_count()
+        theirs = other.min_count()
+
+        combined = {}
+        for item in list(self.counters) + [i for i in other.counters if i not in self.counters]:
+            a = self.counters.get(item)
+            b = other.counters.get(item)
+            combined[item] = [
+                (a[0] if a else mine) + (b[0] if b else theirs),
+                (a[1] if a else mine) + (b[1] if b else theirs),
+                (a[2] if a else 0) + (b[2] if b else 0)
+            ]
+
+        kept = top_n(combined.items(), self.capacity, key=lambda x: x[1][0])
+        self.counters = dict(kept)
+        self.total += other.total
+        self._rebuild_heap()
+        return self
+
+    def to_state(self):
+        """JSON-serialisable state."""
+        return {
+            'capacity': self.capacity,
+            'total': self.total,
+            'counters': [[item] + entry for item, entry in self.counters.items()]
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls(state['capacity'])
+        sketch.total = state['total']
+        sketch.counters = {row[0]: list(row[1:]) for row in state['counters']}
+        sketch._rebuild_heap()
+        return sketch
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter with 2**precision registers.
+
+    The relative standard error is about 1.04 / sqrt(2**precision), e.g.
+    ~1.6% at the default precision of 12 (4 KB dense). Registers start in a
+    sparse dict (index -> rank) and switch to a dense bytearray once that
+    would be smaller, so the many small sets (a customer's products, one
+    day's customers) cost only a few entries each. Items are hashed with
+    BLAKE2, which is stable across processes, so sketches built by workers
+    or saved in checkpoints merge correctly.
+    """
+
+    MIN_PRECISION = 4
+    MAX_PRECISION = 16
+
+    def __init__(self, precision=12):
+        if not self.MIN_PRECISION <= precision <= self.MAX_PRECISION:
+            raise ValueError(
+                f"HyperLogLog precision must be between {self.MIN_PRECISION} and {self.MAX_PRECISION}"
+            )
+        self.precision = precision
+        self.m = 1 << precision
+        self.sparse = {}
+        self.dense = None
+
+    def add(self, item):
+        """Adds one item (any value with a stable str())."""
+        x = int.from_bytes(
+            hashlib.blake2b(str(item).encode('utf-8'), digest_size=8).digest(), 'big'
+        )
+        index = x >> (64 - self.precision)
+        rest = x & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        self._set(index, rank)
+
+    def _set(self, index, rank):
+        if self.dense is not None:
+            if rank > self.dense[index]:
+                self.dense[index] = rank
+            return
+        if rank > self.sparse.get(index, 0):
+            self.sparse[index] = rank
+            # A dict entry costs far more than a byte; go dense at m/16 entries
+            if len(self.sparse) > self.m >> 4:
+                self._densify()
+
+    def _densify(self):
+        self.dense = bytearray(self.m)
+        for index, rank in self.sparse.items():
+            self.dense[index] = rank
+        self.sparse = {}
+
+    def _registers(self):
+        """(index, rank) pairs of all non-zero registers."""
+        if self.dense is None:
+            return self.sparse.items()
+        return ((i, r) for i, r in enumerate(self.dense) if r)
+
+    def __len__(self):
+        """Estimated number of distinct items, rounded."""
+        return round(self.estimate())
+
+    def estimate(self):
+        m = self.m
+        if self.dense is None:
+            zeros = m - len(self.sparse)
+            harmonic = zeros + sum(2.0 ** -r for r in self.sparse.values())
+        else:
+            zeros = self.dense.count(0)
+            harmonic = sum(2.0 ** -r for r in self.dense)
+
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        raw = alpha * m * m / harmonic
+        # Small-range correction: linear counting while registers are empty
+        if raw <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)
+        return raw
+
+    def merge(self, other):
+        """Register-wise max with another sketch of the same precision. Returns self."""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        if self.dense is None and other.dense is not None:
+            self._densify()
+        if self.dense is not None and other.dense is not None:
+            self.dense = bytearray(map(max, self.dense, other.dense))
+        else:
+            for index, rank in other._registers():
+                self._set(index, rank)
+        return self
+
+    def copy(self):
+        sketch = HyperLogLog(self.precision)
+        sketch.sparse = dict(self.sparse)
+        sketch.dense = bytearray(self.dense) if self.dense is not None else None
+        return sketch
+
+    def to_state(self):
+        """JSON-serialisable state (sparse pairs or hex-encoded dense registers)."""
+        if self.dense is None:
+            return {'precision': self.precision, 'sparse': sorted(self.sparse.items())}
+        return {'precision': self.precision, 'dense': self.dense.hex()}
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls(state['precision'])
+        if 'dense' in state:
+            sketch.dense = bytearray.fromhex(state['dense'])
+        else:
+            sketch.sparse = {index: rank for index, rank in state['sparse']}
+        return sketch
@@ -0,0 +1,263 @@
+"""
+utils/sqlite_backend.py
+Optional SQLite backend for the analytics in utils/data_processor.py.
+
+Valid transactions are bulk-loaded into a local SQLite database (executemany
+in large batches inside one transaction, indexes on Date, Region, ProductID
+and CustomerID built after the load), so datasets larger than memory can be
+analysed and the loaded data persists between runs. Every group-by runs as
+an SQL aggregate; only the per-group results come back to Python, where they
+are rounded and ordered exactly like SalesAggregator (ties keep first
+appearance, via MIN(id)).
+
+Whole-table totals are read with NOT INDEXED: one sequential scan into a
+temporary B-tree is about twice as fast as walking a secondary index with a
+table lookup per row. The (Date, CustomerID) and (CustomerID, ProductName)
+indexes are covering for the distinct-customer and products-bought queries.
+
+Sums are accumulated by SQLite in scan order, so unrounded totals can differ
+from the Python backend in the last few bits; rounded values are unaffected.
+"""
+import os
+import sqlite3
+
+from utils.aggregator import period_key
+from utils.rolling import DEFAULT_WINDOWS, RollingMetrics
+from utils.sketches import top_n
+
+DEFAULT_DB_PATH = 'data/.sales_cache/sales.sqlite'
+LOAD_BATCH_ROWS = 50000
+
+_SCHEMA = """
+CREATE TABLE transactions (
+    id INTEGER PRIMARY KEY,
+    transaction_id TEXT,
+    date TEXT,
+    product_id TEXT,
+    product_name TEXT,
+    quantity INTEGER,
+    unit_price REAL,
+    customer_id TEXT,
+    region TEXT
+)
+"""
+
+_INDEXES = {
+    'idx_transactions_date': 'date, customer_id',
+    'idx_transactions_region': 'region',
+    'idx_transactions_product_id': 'product_id',
+    'idx_transactions_customer_id': 'customer_id, product_name',
+}
+
+_COLUMNS = ('TransactionID', 'Date', 'ProductID', 'ProductName',
+            'Quantity', 'UnitPrice', 'CustomerID', 'Region')
+
+
+class SQLiteSales:
+    """
+    A loaded transactions table plus the same view methods as
+    SalesAggregator (region_wise_sales, top_selling_products, ...).
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    @classmethod
+    def from_transactions(cls, transactions, db_path=DEFAULT_DB_PATH):
+        """
+        (Re)creates the database at db_path and loads any iterable of
+        transactions into it. Use ':memory:' for a throwaway database.
+        """
+        if db_path != ':memory:':
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if os.path.exists(db_path):
+                os.remove(db_path)
+
+        connection = sqlite3.connect(db_path)
+        # The file is rebuilt from the source on failure, so durability
+        # during the load is not needed
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        with connection:
+            connection.execute(_SCHEMA)
+            insert = "INSERT INTO transactions VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, ?)"
+            batch = []
+            for t in transactions:
+                batch.append(tuple(t[c] for c in _COLUMNS))
+                if len(batch) >= LOAD_BATCH_ROWS:
+                    connection.executemany(insert, batch)
+                    batch = []
+            if batch:
+                connection.executemany(insert, batch)
+            for name, column in _INDEXES.items():
+                connection.execute(f"CREATE INDEX {name} ON transactions ({column})")
+            connection.execute("ANALYZE")
+        return cls(connection)
+
+    @classmethod
+    def open(cls, db_path=DEFAULT_DB_PATH):
+        """Opens a database loaded by an earlier run without reloading it."""
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f"No SQLite sales database at {db_path}")
+        return cls(sqlite3.connect(db_path))
+
+    def close(self):
+        self.connection.close()
+
+    def _query(self, sql, params=()):
+        return self.connection.execute(sql, params).fetchall()
+
+    # ------------------------------------------------------------------
+    # Totals
+    # ------------------------------------------------------------------
+
+    @property
+    def count(self):
+        return self._query("SELECT COUNT(*) FROM transactions")[0][0]
+
+    @property
+    def total_revenue(self):
+        return self._query("SELECT TOTAL(quantity * unit_price) FROM transactions")[0][0]
+
+    @property
+    def min_date(self):
+        return self._query("SELECT MIN(date) FROM transactions")[0][0]
+
+    @property
+    def max_date(self):
+        return self._query("SELECT MAX(date) FROM transactions")[0][0]
+
+    # ------------------------------------------------------------------
+    # Views (same shapes as the data_processor functions)
+    # ------------------------------------------------------------------
+
+    def region_wise_sales(self):
+        """Sales by region, sorted by total_sales descending."""
+        total = self.total_revenue
+        rows = self._query("""
+            SELECT region, TOTAL(quantity * unit_price) AS sales, COUNT(*)
+            FROM transactions NOT INDEXED
+            GROUP BY region
+            ORDER BY sales DESC, MIN(id)
+        """)
+        return {
+            region: {
+                'total_sales': sales,
+                'transaction_count': count,
+                'percentage': round((sales / total) * 100, 2)
+            }
+            for region, sales, count in rows
+        }
+
+    def _product_totals(self, having="", params=(), order="MIN(id)", limit=None):
+        sql = f"""
+            SELECT product_name, SUM(quantity) AS qty, TOTAL(quantity * unit_price)
+            FROM transactions NOT INDEXED
+            GROUP BY product_name
+            {having}
+            ORDER BY {order}
+        """
+        if limit is not None:
+            sql += " LIMIT ?"
+            params = tuple(params) + (limit,)
+        return [tuple(row) for row in self._query(sql, params)]
+
+    def top_selling_products(self, n=5):
+        """Top n products by total quantity sold as (name, qty, rev)."""
+        return self._product_totals(order="qty DESC, MIN(id)", limit=n)
+
+    def customer_analysis(self, n=None):
+        """
+        Customer spending and unique products, sorted by total_spent.
+        With n, only the top n customers are selected.
+        """
+        totals = self._query("""
+            SELECT customer_id, TOTAL(quantity * unit_price), COUNT(*)
+            FROM transactions NOT INDEXED
+            GROUP BY customer_id
+            ORDER BY MIN(id)
+        """)
+        ranked = top_n(totals, n, key=lambda row: round(row[1], 2))
+
+        products = {}
+        if n is None:
+            rows = self._query("""
+                SELECT DISTINCT customer_id, product_name FROM transactions
+                ORDER BY customer_id, product_name
+            """)
+        else:
+            ids = [row[0] for row in ranked]
+            marks = ','.join('?' * len(ids))
+            rows = self._query(f"""
+                SELECT DISTINCT customer_id, product_name FROM transactions
+                WHERE customer_id IN ({marks})
+                ORDER BY customer_id, product_name
+            """, ids) if ids else []
+        for c_id, name in rows:
+            products.setdefault(c_id, []).append(name)
+
+        result = {}
+        for c_id, total_spent, count in ranked:
+            result[c_id] = {
+                'total_spent': round(total_spent, 2),
+                'purchase_count': count,
+                'avg_order_value': round(total_spent / count, 2),
+                'products_bought': products.get(c_id, [])
+            }
+        return result
+
+    def _daily_totals(self):
+        return self._query("""
+            SELECT date, TOTAL(quantity * unit_price), COUNT(*)
+            FROM transactions NOT INDEXED
+            GROUP BY date
+            ORDER BY date
+        """)
+
+    def daily_sales_trend(self):
+        """Revenue, transaction count and unique customers per date."""
+        customers = dict(self._query("""
+            SELECT date, COUNT(DISTINCT customer_id) FROM transactions GROUP BY date
+        """))
+        return {
+            day: {
+                'revenue': round(revenue, 2),
+                'transaction_count': count,
+                'unique_customers': customers[day]
+            }
+            for day, revenue, count in self._daily_totals()
+        }
+
+    def unique_customers_by_period(self, period='week'):
+        """Unique customers per 'day', 'week' (ISO) or 'month'."""
+        dates = [row[0] for row in self._query("SELECT DISTINCT date FROM transactions")]
+        mapping = [(d, period_key(d, period)) for d in dates]
+        with self.connection:
+            self.connection.execute("DROP TABLE IF EXISTS temp.periods")
+            self.connection.execute("CREATE TEMP TABLE periods (date TEXT PRIMARY KEY, period TEXT)")
+            self.connection.executemany("INSERT INTO periods VALUES (?, ?)", mapping)
+        rows = self._query("""
+            SELECT p.period, COUNT(DISTINCT t.customer_id)
+            FROM transactions t JOIN temp.periods p ON p.date = t.date
+            GROUP BY p.period
+            ORDER BY p.period
+        """)
+        return dict(rows)
+
+    def rolling_metrics(self, windows=DEFAULT_WINDOWS):
+        """RollingMetrics built from the per-date SQL totals."""
+        return RollingMetrics.from_days(self._daily_totals(), windows)
+
+    def find_peak_sales_day(self):
+        """(date, revenue, count) for the highest revenue day, or None."""
+        days = self._daily_totals()
+        if not days: return None
+        peak_date, revenue, count = max(days, key=lambda row: round(row[1], 2))
+        return (peak_date, round(revenue, 2), count)
+
+    def low_performing_products(self, threshold=10):
+        """Products with total quantity < threshold, sorted by quantity."""
+        return self._product_totals(having="HAVING qty < ?", params=(threshold,),
+                                    order="qty, MIN(id)")
@@ -0,0 +1,321 @@
+"""
+utils/transaction_table.py
+Compact columnar storage for parsed transactions.
+
+Each column is a typed array. Low-cardinality string columns (Date, ProductID,
+ProductName, CustomerID, Region) are dictionary-encoded as integer codes and
+TransactionID is packed into one shared byte buffer. Rows are exposed as
+lightweight dict-like views, so code written against the list-of-dicts
+transactions (data_processor, api_handler) keeps working unchanged.
+"""
+import json
+import struct
+import sys
+from array import array
+from collections.abc import MutableMapping
+
+from utils.file_handler import atomic_write
+
+COLUMNS = [
+    'TransactionID', 'Date', 'ProductID', 'ProductName',
+    'Quantity', 'UnitPrice', 'CustomerID', 'Region'
+]
+
+ENCODED_COLUMNS = ('Date', 'ProductID', 'ProductName', 'CustomerID', 'Region')
+
+# Binary file layout: MAGIC, a 4-byte little-endian header length, a JSON
+# header (row count, column layout, dictionary values, metadata) and then
+# the raw bytes of every column array back to back.
+MAGIC = b'SATBL1\n'
+
+
+class _EncodedColumn:
+    """Dictionary-encoded column: one 32-bit code per row plus a value table."""
+    __slots__ = ('codes', 'values', 'lookup')
+
+    def __init__(self):
+        self.codes = array('I')
+        self.values = []
+        self.lookup = {}
+
+    def encode(self, value):
+        code = self.lookup.get(value)
+        if code is None:
+            code = self.lookup[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def append(self, value):
+        self.codes.append(self.encode(value))
+
+    def get(self, i):
+        return self.values[self.codes[i]]
+
+    def set(self, i, value):
+        self.codes[i] = self.encode(value)
+
+    def nbytes(self):
+        return self.codes.itemsize * len(self.codes)
+
+
+class _NumericColumn:
+    """Plain typed array column ('q' for Quantity, 'd' for UnitPrice)."""
+    __slots__ = ('data',)
+
+    def __init__(self, typecode):
+        self.data = array(typecode)
+
+    def append(self, value):
+        self.data.append(value)
+
+    def get(self, i):
+        return self.data[i]
+
+    def set(self, i, value):
+        self.data[i] = value
+
+    def nbytes(self):
+        return self.data.itemsize * len(self.data)
+
+
+class _StringColumn:
+    """Unique strings packed into one UTF-8 buffer with an offsets array."""
+    __slots__ = ('buffer', 'offsets')
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.offsets = array('Q', [0])
+
+    def append(self, value):
+        self.buffer += value.encode('utf-8')
+        self.offsets.append(len(self.buffer))
+
+    def get(self, i):
+        return self.buffer[self.offsets[i]:self.offsets[i + 1]].decode('utf-8')
+
+    def set(self, i, value):
+        raise TypeError("TransactionID values are read-only in a TransactionTable")
+
+    def nbytes(self):
+        return len(self.buffer) + self.offsets.itemsize * len(self.offsets)
+
+
+class TransactionRow(MutableMapping):
+    """Dict-like view of one row of a TransactionTable."""
+    __slots__ = ('_table', '_index')
+
+    def __init__(self, table, index):
+        self._table = table
+        self._index = index
+
+    def __getitem__(self, key):
+        column = self._table._columns.get(key)
+        if column is None:
+            raise KeyError(key)
+        return column.get(self._index)
+
+    def __setitem__(self, key, value):
+        self._table._set(self._index, key, value)
+
+    def __delitem__(self, key):
+        raise TypeError("Columns cannot be removed from a TransactionTable row")
+
+    def __iter__(self):
+        return iter(self._table._columns)
+
+    def __len__(self):
+        return len(self._table._columns)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class TransactionTable:
+    """
+    Columnar, dictionary-encoded replacement for a list of transaction dicts.
+    Supports len(), indexing and iteration, all of which yield TransactionRow
+    views. Assigning an unknown key on a row (e.g. the API_* enrichment
+    fields) adds a new dictionary-encoded column to the whole table.
+
+    source_fingerprint is the content hash of the file the rows were parsed
+    from (set by parse_cache); appending or assigning a value clears it.
+    """
+
+    def __init__(self):
+        self._columns = {}
+        for name in COLUMNS:
+            if name == 'TransactionID':
+                self._columns[name] = _StringColumn()
+            elif name == 'Quantity':
+                self._columns[name] = _NumericColumn('q')
+            elif name == 'UnitPrice':
+                self._columns[name] = _NumericColumn('d')
+            else:
+                self._columns[name] = _EncodedColumn()
+        self._length = 0
+        self.source_fingerprint = None
+
+    @classmethod
+    def from_transactions(cls, transactions):
+        """Builds a table from an iterable of transaction dicts."""
+        table = cls()
+        table.extend(transactions)
+        return table
+
+    def append(self, t):
+        """Appends one transaction dict (only the base columns are kept)."""
+        self.source_fingerprint = None
+        for name in COLUMNS:
+            self._columns[name].append(t[name])
+        for name in self._columns:
+            if name not in COLUMNS:
+                self._columns[name].append(t.get(name))
+        self._length += 1
+
+    def extend(self, transactions):
+        for t in transactions:
+            self.append(t)
+
+    def column(self, name):
+        """
+        Raw storage for a column: the typed array for Quantity/UnitPrice,
+        (codes, values) for dictionary-encoded columns, or a list of strings
+        for TransactionID.
+        """
+        column = self._columns[name]
+        if isinstance(column, _NumericColumn):
+            return column.data
+        if isinstance(column, _EncodedColumn):
+            return column.codes, column.values
+        return [column.get(i) for i in range(self._length)]
+
+    def nbytes(self):
+        """Approximate bytes used by the column storage."""
+        total = 0
+        for column in self._columns.values():
+            total += column.nbytes()
+        return total
+
+    def update_digest(self, digest):
+        """Feeds every column's raw storage into a hashlib digest (for result_cache)."""
+        for name, column in self._columns.items():
+            digest.update(name.encode('utf-8'))
+            if isinstance(column, _StringColumn):
+                digest.update(column.offsets)
+                digest.update(column.buffer)
+            elif isinstance(column, _NumericColumn):
+                digest.update(column.data)
+            else:
+                digest.update(repr(column.values).encode('utf-8'))
+                digest.update(column.codes)
+
+    def save(self, filename, metadata=None):
+        """
+        Writes the table (atomically) in a compact binary columnar format.
+        metadata: optional JSON-serialisable dict stored in the header.
+        """
+        layout = []
+        blobs = []
+        for name, column in self._columns.items():
+            if isinstance(column, _StringColumn):
+                parts = [('offsets', column.offsets), ('buffer', column.buffer)]
+                layout.append({'name': name, 'kind': 'string'})
+            elif isinstance(column, _NumericColumn):
+                parts = [('data', column.data)]
+                layout.append({'name': name, 'kind': 'numeric', 'typecode': column.data.typecode})
+            else:
+                parts = [('codes', column.codes)]
+                layout.append({'name': name, 'kind': 'encoded', 'values': column.values})
+            layout[-1]['sizes'] = {}
+            for part, data in parts:
+                data = memoryview(data).cast('B')
+                layout[-1]['sizes'][part] = len(data)
+                blobs.append(data)
+
+        header = json.dumps({
+            'byteorder': sys.byteorder,
+            'rows': self._length,
+            'columns': layout,
+            'metadata': metadata or {}
+        }).encode('utf-8')
+
+        with atomic_write(filename, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<I', len(header)))
+            f.write(header)
+            for blob in blobs:
+                f.write(blob)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Reads a table written by save() with one bulk read.
+        Returns (table, metadata). Raises ValueError if the file is not a
+        valid table file.
+        """
+        with open(filename, 'rb') as f:
+            data = memoryview(f.read())
+
+        if bytes(data[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{filename} is not a transaction table file")
+        position = len(MAGIC)
+
+        def take(size):
+            nonlocal position
+            chunk = data[position:position + size]
+            if len(chunk) != size:
+                raise ValueError(f"{filename} is truncated")
+            position += size
+            return chunk
+
+        (header_size,) = struct.unpack('<I', take(4))
+        header = json.loads(bytes(take(header_size)))
+        if header['byteorder'] != sys.byteorder:
+            raise ValueError(f"{filename} was written on a {header['byteorder']}-endian machine")
+
+        table = cls()
+        table._columns = {}
+        for spec in header['columns']:
+            sizes = spec['sizes']
+            if spec['kind'] == 'string':
+                column = _StringColumn()
+                column.offsets = array('Q')
+                column.offsets.frombytes(take(sizes['offsets']))
+                column.buffer = bytearray(take(sizes['buffer']))
+            elif spec['kind'] == 'numeric':
+                column = _NumericColumn(spec['typecode'])
+                column.data.frombytes(take(sizes['data']))
+            else:
+                column = _EncodedColumn()
+                column.codes.frombytes(take(sizes['codes']))
+                column.values = spec['values']
+                column.lookup = {value: code for code, value in enumerate(column.values)}
+            table._columns[spec['name']] = column
+        table._length = header['rows']
+
+        return table, header['metadata']
+
+    def _set(self, index, key, value):
+        self.source_fingerprint = None
+        column = self._columns.get(key)
+        if column is None:
+            column = _EncodedColumn()
+            column.codes = array('I', [column.encode(None)]) * self._length
+            self._columns[key] = column
+        column.set(index, value)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [TransactionRow(self, i) for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("TransactionTable index out of range")
+        return TransactionRow(self, index)
+
+    def __iter__(self):
+        for i in range(self._length):
+            yield TransactionRow(self, i)
@@ -0,0 +1,273 @@
+"""
+utils/vectorized.py
+Optional NumPy backend for the analytics in utils/data_processor.py.
+
+Revenue is computed with one array multiply and every group-by runs through
+np.unique/np.bincount over integer-coded columns. np.bincount accumulates each
+bin in row order, so the sums are bit-for-bit the same as the per-row Python
+loops and the views below return exactly what SalesAggregator returns.
+"""
+from array import array
+from functools import cached_property
+
+from utils.aggregator import peak_sales_day, period_key
+from utils.rolling import DEFAULT_WINDOWS, RollingMetrics
+from utils.sketches import top_n
+from utils.transaction_table import TransactionTable
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; only this backend needs it
+    np = None
+
+
+# Above this many possible (outer, inner) pairs, distinct counting falls back
+# from a dense bitmap to np.unique.
+DENSE_PAIR_LIMIT = 1 << 27
+
+# ufunc.at only got its fast path in NumPy 1.25; before that np.minimum.at
+# runs unbuffered, one Python-level step per row, and sorting is far faster
+FAST_UFUNC_AT = np is not None and tuple(
+    int(part) for part in np.__version__.split('.')[:2]) >= (1, 25)
+
+
+def _encode(values, lookup, value):
+    code = lookup.get(value)
+    if code is None:
+        code = lookup[value] = len(values)
+        values.append(value)
+    return code
+
+
+class VectorizedSales:
+    """
+    Column arrays for a set of transactions plus the same view methods as
+    SalesAggregator (region_wise_sales, top_selling_products, ...).
+    """
+
+    def __init__(self, quantity, unit_price, columns):
+        """
+        quantity / unit_price: numeric sequences of equal length.
+        columns: {'Date'|'ProductName'|'CustomerID'|'Region': (codes, values)}
+        """
+        if np is None:
+            raise ImportError("numpy is required for the vectorized backend")
+
+        self.quantity = np.asarray(quantity, dtype=np.int64)
+        self.unit_price = np.asarray(unit_price, dtype=np.float64)
+        self.revenue = self.quantity * self.unit_price
+        self.count = len(self.revenue)
+
+        self._columns = {}
+        for name, (codes, values) in columns.items():
+            self._columns[name] = (np.asarray(codes, dtype=np.intp), list(values))
+
+    @classmethod
+    def from_transactions(cls, transactions):
+        """Builds the column arrays from a TransactionTable or any iterable of dicts."""
+        names = ('Date', 'ProductName', 'CustomerID', 'Region')
+
+        if isinstance(transactions, TransactionTable):
+            columns = {name: transactions.column(name) for name in names}
+            return cls(transactions.column('Quantity'), transactions.column('UnitPrice'), columns)
+
+        quantity = array('q')
+        unit_price = array('d')
+        codes = {name: array('I') for name in names}
+        values = {name: [] for name in names}
+        lookups = {name: {} for name in names}
+
+        for t in transactions:
+            quantity.append(t['Quantity'])
+            unit_price.append(t['UnitPrice'])
+            for name in names:
+                codes[name].append(_encode(values[name], lookups[name], t[name]))
+
+        columns = {name: (codes[name], values[name]) for name in names}
+        return cls(quantity, unit_price, columns)
+
+    # ------------------------------------------------------------------
+    # Kernels
+    # ------------------------------------------------------------------
+
+    def _group(self, name):
+        """
+        Groups rows by a coded column.
+        Returns (codes present in first-appearance order, row counts).
+        """
+        codes, values = self._columns[name]
+        if FAST_UFUNC_AT:
+            counts = np.bincount(codes, minlength=len(values))
+            first = np.full(len(values), self.count, dtype=np.intp)
+            np.minimum.at(first, codes, np.arange(self.count, dtype=np.intp))
+            present = np.flatnonzero(counts)
+            first, counts = first[present], counts[present]
+        else:
+            present, first, counts = np.unique(codes, return_index=True, return_counts=True)
+        order = np.argsort(first, kind='stable')
+        return present[order], counts[order]
+
+    def _sum_by(self, name, weights):
+        codes, values = self._columns[name]
+        return np.bincount(codes, weights=weights, minlength=len(values))
+
+    def _distinct_pairs(self, outer, inner, inner_rank=None):
+        """
+        Unique (outer code, inner key) pairs sorted by outer code, then inner
+        key. The inner key is the inner code, or inner_rank[code] if given.
+        Small key spaces use a dense bitmap instead of sorting every row.
+        """
+        outer_codes = self._columns[outer][0]
+        inner_codes = self._columns[inner][0]
+        if inner_rank is not None:
+            inner_codes = inner_rank[inner_codes]
+        width = max(len(self._columns[inner][1]), 1)
+        space = len(self._columns[outer][1]) * width
+        keys = outer_codes.astype(np.int64) * width + inner_codes
+
+        if space <= DENSE_PAIR_LIMIT:
+            seen = np.zeros(space, dtype=bool)
+            seen[keys] = True
+            pairs = np.flatnonzero(seen)
+        else:
+            pairs = np.unique(keys)
+        return pairs // width, pairs % width
+
+    @cached_property
+    def total_revenue(self):
+        if not self.count:
+            return 0
+        return np.bincount(np.zeros(self.count, dtype=np.intp), weights=self.revenue)[0].item()
+
+    @cached_property
+    def _dates_present(self):
+        keys, _ = self._group('Date')
+        values = self._columns['Date'][1]
+        return [values[k] for k in keys.tolist()]
+
+    @property
+    def min_date(self):
+        return min(self._dates_present) if self.count else None
+
+    @property
+    def max_date(self):
+        return max(self._dates_present) if self.count else None
+
+    @cached_property
+    def _product_totals(self):
+        keys, _ = self._group('ProductName')
+        qty = self._sum_by('ProductName', self.quantity)[keys]
+        rev = self._sum_by('ProductName', self.revenue)[keys]
+        values = self._columns['ProductName'][1]
+        return [
+            (values[k], int(q), r)
+            for k, q, r in zip(keys.tolist(), qty.tolist(), rev.tolist())
+        ]
+
+    # ------------------------------------------------------------------
+    # Views (same shapes as the data_processor functions)
+    # ------------------------------------------------------------------
+
+    def region_wise_sales(self):
+        """Sales by region, sorted by total_sales descending."""
+        keys, counts = self._group('Region')
+        sales = self._sum_by('Region', self.revenue)[keys]
+        values = self._columns['Region'][1]
+        total_rev = self.total_revenue
+
+        regions = {}
+        for k, total_sales, count in zip(keys.tolist(), sales.tolist(), counts.tolist()):
+            regions[values[k]] = {
+                'total_sales': total_sales,
+                'transaction_count': count,
+                'percentage': round((total_sales / total_rev) * 100, 2)
+            }
+        return dict(sorted(regions.items(), key=lambda x: x[1]['total_sales'], reverse=True))
+
+    def top_selling_products(self, n=5):
+        """Top n products by total quantity sold as (name, qty, rev)."""
+        return top_n(self._product_totals, n, key=lambda x: x[1])
+
+    def customer_analysis(self, n=None):
+        """
+        Customer spending and unique products, sorted by total_spent.
+        With n, only the top n customers are selected and built.
+        """
+        keys, counts = self._group('CustomerID')
+        spent = self._sum_by('CustomerID', self.revenue)[keys]
+
+        rounded = [round(x, 2) for x in spent.tolist()]
+        order = np.asarray(top_n(range(len(rounded)), n, key=rounded.__getitem__), dtype=np.intp)
+        keys, counts, spent = keys[order], counts[order], spent[order]
+        customer_values = self._columns['CustomerID'][1]
+        product_values = self._columns['ProductName'][1]
+
+        # Rank product names alphabetically so each customer's distinct
+        # products come out of _distinct_pairs already sorted by name.
+        by_name = sorted(range(len(product_values)), key=product_values.__getitem__)
+        rank = np.empty(len(product_values), dtype=np.intp)
+        rank[by_name] = np.arange(len(product_values), dtype=np.intp)
+        sorted_names = np.array([product_values[i] for i in by_name] or [''], dtype=object)
+
+        cust_codes, name_ranks = self._distinct_pairs('CustomerID', 'ProductName', rank)
+        starts = np.searchsorted(cust_codes, keys)
+        ends = np.searchsorted(cust_codes, keys, side='right')
+        names = sorted_names[name_ranks]
+
+        result = {}
+        for k, total_spent, count, start, end in zip(keys.tolist(), spent.tolist(), counts.tolist(),
+                                                     starts.tolist(), ends.tolist()):
+            result[customer_values[k]] = {
+                'total_spent': round(total_spent, 2),
+                'purchase_count': count,
+                'avg_order_value': round(total_spent / count, 2),
+                'products_bought': names[start:end].tolist()
+            }
+        return result
+
+    def daily_sales_trend(self):
+        """Revenue, transaction count and unique customers per date."""
+        keys, counts = self._group('Date')
+        revenue = self._sum_by('Date', self.revenue)[keys]
+        values = self._columns['Date'][1]
+
+        date_codes, _ = self._distinct_pairs('Date', 'CustomerID')
+        customers = np.bincount(date_codes, minlength=len(values))[keys]
+
+        rows = {}
+        for k, rev, count, cust in zip(keys.tolist(), revenue.tolist(), counts.tolist(), customers.tolist()):
+            rows[values[k]] = {
+                'revenue': round(rev, 2),
+                'transaction_count': count,
+                'unique_customers': cust
+            }
+        return {date: rows[date] for date in sorted(rows)}
+
+    def unique_customers_by_period(self, period='week'):
+        """Unique customers per 'day', 'week' (ISO) or 'month' (exact)."""
+        date_codes, dates = self._columns['Date']
+        lookup = {}
+        keys = []
+        period_of_date = np.array([_encode(keys, lookup, period_key(d, period)) for d in dates],
+                                  dtype=np.int64)
+        width = max(len(self._columns['CustomerID'][1]), 1)
+        pairs = np.unique(period_of_date[date_codes] * width + self._columns['CustomerID'][0])
+        customers = np.bincount(pairs // width, minlength=len(keys)).tolist()
+        return {key: customers[lookup[key]] for key in sorted(keys) if customers[lookup[key]]}
+
+    def rolling_metrics(self, windows=DEFAULT_WINDOWS):
+        """RollingMetrics built from the per-date revenue and counts."""
+        keys, counts = self._group('Date')
+        revenue = self._sum_by('Date', self.revenue)[keys]
+        values = self._columns['Date'][1]
+        days = zip((values[k] for k in keys.tolist()), revenue.tolist(), counts.tolist())
+        return RollingMetrics.from_days(days, windows)
+
+    def find_peak_sales_day(self):
+        """(date, revenue, count) for the highest revenue day, or None."""
+        return peak_sales_day(self.daily_sales_trend())
+
+    def low_performing_products(self, threshold=10):
+        """Products with total quantity < threshold, sorted by quantity."""
+        low_perf = [p for p in self._product_totals if p[1] < threshold]
+        return sorted(low_perf, key=lambda x: x[1])
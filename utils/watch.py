@@ -0,0 +1,340 @@
+"""
+utils/watch.py
+Long-running watch mode: keeps the sales aggregates hot and serves them.
+
+The watcher polls a data directory (or a single file or glob) for new and
+appended sales files. Only the bytes added since the last poll are read,
+parsed, validated and folded into one in-memory SalesAggregator, in the
+same way as an --incremental run. A last line without a newline waits
+until the file has not changed for `tail_settle` seconds, so a line that
+is still being written is not split, while a file that simply ends
+without a newline is still read in full. A file that shrank, was rewritten or disappeared triggers a
+rebuild from scratch. The text report is regenerated once the data has
+been quiet for the debounce interval, and a local HTTP endpoint serves the
+current metrics as JSON:
+
+    GET /metrics   totals, regions, top products/customers, daily trend,
+                   rolling windows, validation summary and watcher stats
+    GET /health    liveness check
+
+The watcher stats include the ingest lag (how long appended data has been
+waiting, or took, to be folded in) and the processing rate. Enrichment
+uses the cached product catalog; rows are not re-enriched or written out.
+"""
+import json
+import os
+import signal
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.aggregator import SalesAggregator
+from utils.api_handler import create_product_mapping, iter_enriched
+from utils.checkpoint import fingerprint, settled_end, DEFAULT_TAIL_SETTLE
+from utils.data_processor import generate_sales_report
+from utils.file_handler import iter_sales_data, iter_ingest, INGEST_SUMMARY_KEYS
+from utils.partitions import discover_partitions
+
+DEFAULT_SOURCE = 'data'
+DEFAULT_PORT = 8770
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_DEBOUNCE = 5.0
+
+
+def _source_files(source):
+    """Sales files of a file, directory or glob, without the pipeline's own outputs."""
+    return [p['path'] for p in discover_partitions(source)]
+
+
+class SalesWatcher:
+    """
+    Folds new rows of the watched files into a SalesAggregator. poll() does
+    one scan; run() polls until stopped. All state is guarded by one lock so
+    the HTTP handler can read a consistent snapshot.
+    """
+
+    def __init__(self, source=DEFAULT_SOURCE, report_file='output/sales_report.txt',
+                 debounce=DEFAULT_DEBOUNCE, poll_interval=DEFAULT_POLL_INTERVAL,
+                 aggregator_options=None, catalog=None, tail_settle=DEFAULT_TAIL_SETTLE):
+        self.source = source
+        self.report_file = report_file
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.tail_settle = tail_settle
+        self.aggregator_options = dict(aggregator_options or {})
+        self.aggregator_options.setdefault('rolling_windows', (7, 30))
+        self.catalog = catalog
+
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        # Bumped on every change, so clients can tell when to refetch
+        self.version = 0
+        self.started = time.time()
+        self.stats = {
+            'polls': 0, 'rebuilds': 0, 'reports_written': 0, 'rows_folded': 0,
+            'fold_seconds': 0.0, 'last_fold_rows': 0, 'last_fold_rows_per_s': None,
+            'last_fold_lag_s': None, 'last_report': None, 'report_error': None
+        }
+        self._reset()
+
+    def _reset(self):
+        self.aggregate = SalesAggregator(**self.aggregator_options)
+        self.summary = dict.fromkeys(INGEST_SUMMARY_KEYS, 0)
+        # path -> {'offset', 'fingerprint', 'size', 'mtime_ns'}
+        self.files = {}
+        # ProductID -> valid rows, for the enrichment figures of the report
+        self.product_rows = {}
+        # mtime of the oldest data not folded in yet, for the lag
+        self.pending_since = None
+        self.dirty_since = None
+        self._snapshot = None
+
+    # ------------------------------------------------------------------
+    # Ingest
+    # ------------------------------------------------------------------
+
+    def _is_unchanged_prefix(self, path, state, stat):
+        if stat.st_size < state['offset']:
+            return False
+        return fingerprint(path, state['offset']) == state['fingerprint']
+
+    def _fold(self, path, start, end):
+        """Folds the complete lines of path[start:end] in. Returns valid rows added."""
+        delta = {}
+        products = self.product_rows
+        aggregate = self.aggregate
+        rows = 0
+        for t in iter_ingest(iter_sales_data(path, start, end), summary=delta):
+            aggregate.add(t)
+            products[t['ProductID']] = products.get(t['ProductID'], 0) + 1
+            rows += 1
+        for key, value in delta.items():
+            self.summary[key] = self.summary.get(key, 0) + value
+        return rows
+
+    def poll(self):
+        """Scans the source once and folds in what was appended. Returns rows added."""
+        paths = _source_files(self.source)
+        with self.lock:
+            self.stats['polls'] += 1
+            rebuild = any(path not in paths for path in self.files)
+            changed = []
+            for path in paths:
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                state = self.files.get(path)
+                if state is not None and (stat.st_size, stat.st_mtime_ns) == \
+                        (state['size'], state['mtime_ns']):
+                    continue
+                if state is not None and not self._is_unchanged_prefix(path, state, stat):
+                    rebuild = True
+                changed.append((path, stat))
+
+            if rebuild:
+                print("Watched data was rewritten or removed; rebuilding aggregates.")
+                self._reset()
+                self.stats['rebuilds'] += 1
+                changed = [(p, os.stat(p)) for p in paths if os.path.exists(p)]
+
+            started = time.perf_counter()
+            rows = 0
+            oldest_pending = None
+            folded_mtime = None
+            for path, stat in changed:
+                state = self.files.get(path, {'offset': 0})
+                end = settled_end(path, self.tail_settle, stat)
+                if end > state['offset']:
+                    rows += self._fold(path, state['offset'], end)
+                    folded_mtime = max(folded_mtime or 0, stat.st_mtime)
+                self.files[path] = {
+                    'offset': max(end, state['offset']),
+                    'fingerprint': fingerprint(path, max(end, state['offset'])),
+                    'size': stat.st_size,
+                    'mtime_ns': stat.st_mtime_ns
+                }
+                if stat.st_size > end:
+                    oldest_pending = min(oldest_pending or stat.st_mtime, stat.st_mtime)
+                    # Look again next poll, once the line is finished
+                    self.files[path]['size'] = -1
+            elapsed = time.perf_counter() - started
+            self.pending_since = oldest_pending
+
+            if folded_mtime is not None or rebuild:
+                self.version += 1
+                self._snapshot = None
+                self.dirty_since = time.time()
+                self.stats['rows_folded'] += rows
+                self.stats['fold_seconds'] += elapsed
+                self.stats['last_fold_rows'] = rows
+                self.stats['last_fold_rows_per_s'] = round(rows / elapsed) if elapsed else None
+                if folded_mtime is not None:
+                    self.stats['last_fold_lag_s'] = round(max(0.0, time.time() - folded_mtime), 3)
+            return rows
+
+    # ------------------------------------------------------------------
+    # Report and snapshot
+    # ------------------------------------------------------------------
+
+    def _enrichment(self, products):
+        """{'matched', 'failed_products'} for the report, from the catalog."""
+        if not products:
+            return []
+        mapping = create_product_mapping(products)
+        product_ids = list(self.product_rows)
+        matched = 0
+        failed = []
+        rows = iter_enriched(({'ProductID': pid} for pid in product_ids), mapping)
+        for product_id, row in zip(product_ids, rows):
+            if row['API_Match']:
+                matched += self.product_rows[product_id]
+            else:
+                failed.append(product_id)
+        return {'matched': matched, 'failed_products': failed}
+
+    def write_report(self):
+        """Regenerates the text report from the in-memory aggregate."""
+        # May wait on the network when the catalog cache is empty, so it is
+        # read before taking the lock
+        products = self.catalog.get_products() if self.catalog is not None else None
+        with self.lock:
+            if not self.aggregate.count:
+                return False
+            try:
+                generate_sales_report(self.aggregate, self._enrichment(products), self.report_file)
+                self.stats['report_error'] = None
+            except Exception as e:
+                self.stats['report_error'] = str(e)
+                print(f"Error regenerating report: {e}")
+                return False
+            self.stats['reports_written'] += 1
+            self.stats['last_report'] = datetime.now().isoformat(timespec='seconds')
+            self.dirty_since = None
+            return True
+
+    def _watcher_stats(self):
+        now = time.time()
+        stats = dict(self.stats)
+        stats['files'] = len(self.files)
+        stats['uptime_s'] = round(now - self.started, 1)
+        stats['avg_rows_per_s'] = round(stats['rows_folded'] / stats['fold_seconds']) \
+            if stats['fold_seconds'] else None
+        stats['fold_seconds'] = round(stats['fold_seconds'], 4)
+        # Appended data still waiting counts from its write, else the last fold
+        stats['ingest_lag_s'] = round(now - self.pending_since, 3) \
+            if self.pending_since is not None else stats['last_fold_lag_s']
+        stats['report_pending'] = self.dirty_since is not None
+        return stats
+
+    def snapshot(self):
+        """The current metrics as a JSON-serialisable dict."""
+        with self.lock:
+            if self._snapshot is None:
+                aggregate = self.aggregate
+                self._snapshot = {
+                    'source': self.source,
+                    'version': self.version,
+                    'total_revenue': round(aggregate.total_revenue, 2),
+                    'transactions': aggregate.count,
+                    'date_range': [aggregate.min_date, aggregate.max_date],
+                    'regions': aggregate.region_wise_sales(),
+                    'top_products': aggregate.top_selling_products(5),
+                    'top_customers': aggregate.customer_analysis(5),
+                    'daily_trend': aggregate.daily_sales_trend(),
+                    'peak_day': aggregate.find_peak_sales_day(),
+                    'rolling': aggregate.rolling_metrics().summary() if aggregate.count else None,
+                    'validation': dict(self.summary)
+                }
+            snapshot = dict(self._snapshot)
+            snapshot['watcher'] = self._watcher_stats()
+            snapshot['generated'] = datetime.now().isoformat(timespec='seconds')
+            return snapshot
+
+    # ------------------------------------------------------------------
+    # Loop
+    # ------------------------------------------------------------------
+
+    def tick(self, now=None):
+        """
+        One cycle of run(): a poll, then the report if the data has been
+        quiet for `debounce` seconds as of `now` (default: the current time).
+        Returns True if the report was written.
+        """
+        try:
+            self.poll()
+        except Exception as e:
+            print(f"Error while polling {self.source}: {e}")
+        now = time.time() if now is None else now
+        if self.dirty_since is not None and now - self.dirty_since >= self.debounce:
+            return self.write_report()
+        return False
+
+    def run(self):
+        """Polls until stop(); writes the report after `debounce` quiet seconds."""
+        while not self.stopped.is_set():
+            self.tick()
+            self.stopped.wait(self.poll_interval)
+        if self.dirty_since is not None:
+            self.write_report()
+
+    def stop(self):
+        self.stopped.set()
+
+
+def _handler(watcher):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split('?', 1)[0].rstrip('/')
+            if path == '/metrics':
+                self._send(200, watcher.snapshot())
+            elif path == '/health':
+                self._send(200, {'status': 'ok', 'version': watcher.version})
+            else:
+                self._send(404, {'error': f"Unknown path {self.path}"})
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MetricsHandler
+
+
+def metrics_server(watcher, host='127.0.0.1', port=DEFAULT_PORT):
+    """HTTP server for the watcher's /metrics and /health; port 0 picks a free one."""
+    server = ThreadingHTTPServer((host, port), _handler(watcher))
+    server.daemon_threads = True
+    return server
+
+
+def serve(watcher, host='127.0.0.1', port=DEFAULT_PORT):
+    """
+    Runs the watcher with the metrics endpoint until interrupted (Ctrl+C or
+    SIGTERM); pending changes are written to the report before exiting.
+    The HTTP server answers from its own threads.
+    """
+    server = metrics_server(watcher, host, port)
+    if threading.current_thread() is threading.main_thread():
+        # A service manager stops the daemon with SIGTERM
+        signal.signal(signal.SIGTERM, lambda signum, frame: watcher.stop())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    print(f"Watching {watcher.source}; metrics at http://{host}:{server.server_address[1]}/metrics")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        print("\nStopping watcher...")
+        watcher.stop()
+        if watcher.dirty_since is not None:
+            watcher.write_report()
+    finally:
+        server.shutdown()
+        server.server_close()